@@ -61,6 +61,7 @@ dependencies {
     implementation("com.squareup.retrofit2:retrofit:2.9.0")
     implementation("com.squareup.retrofit2:converter-gson:2.9.0")
     implementation("com.squareup.okhttp3:logging-interceptor:4.12.0")
+    implementation("org.msgpack:msgpack-core:0.9.8")
 
     // Firebase
     implementation(platform("com.google.firebase:firebase-bom:32.7.2"))
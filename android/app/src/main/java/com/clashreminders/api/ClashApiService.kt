@@ -1,6 +1,7 @@
 package com.clashreminders.api
 
 import com.clashreminders.model.*
+import okhttp3.ResponseBody
 import retrofit2.Response
 import retrofit2.http.*
 
@@ -16,6 +17,13 @@ interface ClashApiService {
         @Body data: FcmTokenUpdate
     ): Response<MessageResponse>
 
+    // ====== Bootstrap (app start: accounts, clans, reminders, status) ======
+    @GET("api/v1/users/{user_id}/bootstrap")
+    suspend fun getBootstrap(
+        @Path("user_id") userId: String,
+        @Header("If-None-Match") etag: String? = null
+    ): Response<BootstrapResponse>
+
     // ====== Accounts ======
     @POST("api/v1/users/{user_id}/accounts")
     suspend fun addAccount(
@@ -85,4 +93,9 @@ interface ClashApiService {
 
     @GET("api/v1/users/{user_id}/status/summary")
     suspend fun getStatusSummary(@Path("user_id") userId: String): Response<StatusSummaryResponse>
+
+    // Compact MessagePack encoding of the summary (decoded by widget.CompactSummary)
+    @GET("api/v1/users/{user_id}/status/summary")
+    @Headers("Accept: application/msgpack, application/json;q=0.5")
+    suspend fun getStatusSummaryCompact(@Path("user_id") userId: String): Response<ResponseBody>
 }
@@ -4,6 +4,9 @@ import android.content.Context
 import android.content.SharedPreferences
 import com.clashreminders.api.ClashApiService
 import com.clashreminders.model.*
+import com.clashreminders.widget.CompactSummary
+import com.clashreminders.widget.WidgetSummary
+import com.google.gson.Gson
 import kotlinx.coroutines.Dispatchers
 import kotlinx.coroutines.withContext
 
@@ -16,6 +19,10 @@ class UserRepository(private val context: Context, private val apiService: Clash
         private const val KEY_USER_ID = "user_id"
     }
 
+    // Last bootstrap payload and its ETag, for conditional requests
+    private var bootstrapCache: BootstrapResponse? = null
+    private var bootstrapEtag: String? = null
+
     fun getUserId(): String? = prefs.getString(KEY_USER_ID, null)
 
     fun saveUserId(userId: String) {
@@ -51,6 +58,26 @@ class UserRepository(private val context: Context, private val apiService: Clash
         }
     }
 
+    // ====== BOOTSTRAP ======
+
+    suspend fun getBootstrap(): BootstrapResponse? = withContext(Dispatchers.IO) {
+        val userId = getUserId() ?: return@withContext null
+        try {
+            val response = apiService.getBootstrap(userId, bootstrapEtag.takeIf { bootstrapCache != null })
+            when {
+                response.code() == 304 -> bootstrapCache
+                response.isSuccessful -> response.body()?.also {
+                    bootstrapCache = it
+                    bootstrapEtag = response.headers()["ETag"]
+                }
+                else -> null
+            }
+        } catch (e: Exception) {
+            e.printStackTrace()
+            null
+        }
+    }
+
     // ====== ACCOUNTS ======
 
     suspend fun addAccount(tag: String): PlayerAccountResponse? = withContext(Dispatchers.IO) {
@@ -204,4 +231,24 @@ class UserRepository(private val context: Context, private val apiService: Clash
             null
         }
     }
+
+    /** Summary for the widget: compact MessagePack if the server supports it, JSON otherwise. */
+    suspend fun getWidgetSummary(): WidgetSummary? = withContext(Dispatchers.IO) {
+        val userId = getUserId() ?: return@withContext null
+        try {
+            val response = apiService.getStatusSummaryCompact(userId)
+            if (!response.isSuccessful) return@withContext null
+            val body = response.body() ?: return@withContext null
+            val contentType = body.contentType()?.toString().orEmpty()
+            if (contentType.startsWith("application/msgpack")) {
+                CompactSummary.decode(body.bytes())
+            } else {
+                val summary = Gson().fromJson(body.charStream(), StatusSummaryResponse::class.java)
+                CompactSummary.fromJson(summary)
+            }
+        } catch (e: Exception) {
+            e.printStackTrace()
+            null
+        }
+    }
 }
@@ -136,6 +136,15 @@ data class EventTypeCount(
     val accounts: Int
 )
 
+// ============ BOOTSTRAP ============
+
+data class BootstrapResponse(
+    val accounts: List<PlayerAccountResponse>,
+    val clans: List<TrackedClanResponse>,
+    val reminders: List<ReminderConfigResponse>,
+    val status: StatusResponse
+)
+
 // ============ GENERIC ============
 
 data class MessageResponse(
@@ -74,10 +74,7 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
 
     init {
         if (_isOnboarded.value) {
-            startAutoRefresh()
-            loadAccounts()
-            loadClans()
-            loadReminders()
+            loadBootstrap()
         }
     }
 
@@ -103,10 +100,7 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
                     val account = repository.addAccount(_tagInput.value)
                     if (account != null) {
                         _isOnboarded.value = true
-                        startAutoRefresh()
-                        loadAccounts()
-                        loadClans()
-                        loadReminders()
+                        loadBootstrap()
                     } else {
                         _onboardingError.value = "Account konnte nicht hinzugefügt werden. Tag prüfen."
                     }
@@ -121,11 +115,51 @@ class MainViewModel(application: Application) : AndroidViewModel(application) {
         }
     }
 
+    // ====== BOOTSTRAP ======
+
+    /** Loads accounts, clans, reminders and status in one request; falls back to the single endpoints. */
+    fun loadBootstrap() {
+        viewModelScope.launch {
+            _statusLoading.value = true
+            _accountsLoading.value = true
+            _clansLoading.value = true
+            _remindersLoading.value = true
+            _statusError.value = null
+
+            val response = try {
+                repository.getBootstrap()
+            } catch (e: Exception) {
+                null
+            }
+            _statusLoading.value = false
+            _accountsLoading.value = false
+            _clansLoading.value = false
+            _remindersLoading.value = false
+
+            if (response != null) {
+                _accounts.value = response.accounts
+                _clans.value = response.clans
+                _reminders.value = response.reminders
+                _statusResponse.value = response.status
+                // Status is fresh — next refresh after one interval
+                startAutoRefresh(refreshNow = false)
+            } else {
+                startAutoRefresh()
+                loadAccounts()
+                loadClans()
+                loadReminders()
+            }
+        }
+    }
+
     // ====== AUTO-REFRESH (MISSING HITS) ======
 
-    fun startAutoRefresh() {
+    fun startAutoRefresh(refreshNow: Boolean = true) {
         autoRefreshJob?.cancel()
         autoRefreshJob = viewModelScope.launch {
+            if (!refreshNow) {
+                delay(AUTO_REFRESH_INTERVAL_MS)
+            }
             while (isActive) {
                 refreshStatus()
                 delay(AUTO_REFRESH_INTERVAL_MS)
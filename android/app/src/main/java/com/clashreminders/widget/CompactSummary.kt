@@ -0,0 +1,106 @@
+package com.clashreminders.widget
+
+import com.clashreminders.model.StatusSummaryResponse
+import org.msgpack.core.MessagePack
+import org.msgpack.core.MessageUnpacker
+import java.time.LocalDateTime
+import java.time.ZoneOffset
+
+/**
+ * Widget data decoded from the compact (MessagePack) /status/summary encoding.
+ * Time remaining is computed on the device from [endTimeEpoch], so it stays current between refreshes.
+ */
+data class WidgetItem(
+    val eventLabel: String,
+    val accountDisplay: String,
+    val attacksRemaining: Int,
+    val endTimeEpoch: Long?
+) {
+    fun timeRemainingFormatted(nowEpoch: Long = System.currentTimeMillis() / 1000): String {
+        val end = endTimeEpoch ?: return ""
+        return formatDuration(end - nowEpoch)
+    }
+}
+
+data class WidgetSummary(
+    val lastPolled: String?,
+    val totalMissing: Int,
+    val items: List<WidgetItem>
+)
+
+object CompactSummary {
+
+    // Must match EVENT_TYPE_CODES in backend/serializers.py
+    private val EVENT_LABELS = mapOf(1 to "Clan War", 2 to "CWL", 3 to "Raid Weekend")
+
+    /** Decodes {"v", "p", "n", "t", "i"} — see summary_compact() in backend/services/status_view.py. */
+    fun decode(bytes: ByteArray): WidgetSummary {
+        var lastPolled: String? = null
+        var totalMissing = 0
+        val items = mutableListOf<WidgetItem>()
+
+        MessagePack.newDefaultUnpacker(bytes).use { unpacker ->
+            repeat(unpacker.unpackMapHeader()) {
+                when (unpacker.unpackString()) {
+                    "p" -> lastPolled = unpacker.unpackLongOrNull()?.let { epochToIso(it) }
+                    "n" -> totalMissing = unpacker.unpackInt()
+                    "i" -> repeat(unpacker.unpackArrayHeader()) {
+                        unpacker.unpackArrayHeader()
+                        val accountTag = unpacker.unpackString()
+                        val accountName = unpacker.unpackStringOrNull()
+                        unpacker.unpackStringOrNull()  // clan_tag
+                        unpacker.unpackStringOrNull()  // clan_name
+                        val type = unpacker.unpackInt()
+                        val cwlDay = unpacker.unpackInt()
+                        val remaining = unpacker.unpackInt()
+                        val end = unpacker.unpackLongOrNull()
+
+                        var label = EVENT_LABELS[type] ?: "Event"
+                        if (cwlDay > 0) label = "$label Tag $cwlDay"
+                        items.add(WidgetItem(label, "${accountName ?: "Unknown"} ($accountTag)", remaining, end))
+                    }
+                    else -> unpacker.skipValue()
+                }
+            }
+        }
+        return WidgetSummary(lastPolled, totalMissing, items)
+    }
+
+    /** JSON fallback (server without MessagePack support). */
+    fun fromJson(summary: StatusSummaryResponse): WidgetSummary = WidgetSummary(
+        lastPolled = summary.last_polled,
+        totalMissing = summary.total_missing,
+        items = summary.items.map {
+            WidgetItem(
+                eventLabel = it.event_label,
+                accountDisplay = it.account_display,
+                attacksRemaining = it.attacks_remaining,
+                endTimeEpoch = it.end_time_iso?.let { iso ->
+                    LocalDateTime.parse(iso.removeSuffix("Z")).toEpochSecond(ZoneOffset.UTC)
+                }
+            )
+        }
+    )
+
+    private fun epochToIso(epoch: Long): String =
+        LocalDateTime.ofEpochSecond(epoch, 0, ZoneOffset.UTC).toString()
+
+    private fun MessageUnpacker.unpackStringOrNull(): String? =
+        if (tryUnpackNil()) null else unpackString()
+
+    private fun MessageUnpacker.unpackLongOrNull(): Long? =
+        if (tryUnpackNil()) null else unpackLong()
+}
+
+/** Same format as the backend's format_duration: "1d 2h 3m". */
+fun formatDuration(seconds: Long): String {
+    if (seconds <= 0) return "0m"
+    val days = seconds / 86400
+    val hours = (seconds % 86400) / 3600
+    val minutes = (seconds % 3600) / 60
+    val parts = mutableListOf<String>()
+    if (days > 0) parts.add("${days}d")
+    if (hours > 0) parts.add("${hours}h")
+    if (minutes > 0 || parts.isEmpty()) parts.add("${minutes}m")
+    return parts.joinToString(" ")
+}
@@ -2,8 +2,6 @@ package com.clashreminders.widget
 
 import android.content.Context
 import android.content.SharedPreferences
-import com.clashreminders.model.StatusSummaryItem
-import com.clashreminders.model.StatusSummaryResponse
 import com.google.gson.Gson
 import com.google.gson.reflect.TypeToken
 
@@ -13,7 +11,7 @@ import com.google.gson.reflect.TypeToken
 object WidgetDataStore {
 
     private const val PREFS_NAME = "widget_data"
-    private const val KEY_ITEMS = "items_json"
+    private const val KEY_ITEMS = "widget_items_json"
     private const val KEY_TOTAL = "total_missing"
     private const val KEY_LAST_UPDATED = "last_updated"
 
@@ -22,19 +20,19 @@ object WidgetDataStore {
 
     private val gson = Gson()
 
-    fun save(context: Context, summary: StatusSummaryResponse) {
+    fun save(context: Context, summary: WidgetSummary) {
         val json = gson.toJson(summary.items)
         prefs(context).edit()
             .putString(KEY_ITEMS, json)
-            .putInt(KEY_TOTAL, summary.total_missing)
-            .putString(KEY_LAST_UPDATED, summary.last_polled ?: "")
+            .putInt(KEY_TOTAL, summary.totalMissing)
+            .putString(KEY_LAST_UPDATED, summary.lastPolled ?: "")
             .apply()
     }
 
-    fun getItems(context: Context): List<StatusSummaryItem> {
+    fun getItems(context: Context): List<WidgetItem> {
         val json = prefs(context).getString(KEY_ITEMS, null) ?: return emptyList()
         return try {
-            val type = object : TypeToken<List<StatusSummaryItem>>() {}.type
+            val type = object : TypeToken<List<WidgetItem>>() {}.type
             gson.fromJson(json, type) ?: emptyList()
         } catch (e: Exception) {
             emptyList()
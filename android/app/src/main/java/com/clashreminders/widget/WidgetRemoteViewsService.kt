@@ -5,7 +5,6 @@ import android.content.Intent
 import android.widget.RemoteViews
 import android.widget.RemoteViewsService
 import com.clashreminders.R
-import com.clashreminders.model.StatusSummaryItem
 
 class WidgetRemoteViewsService : RemoteViewsService() {
     override fun onGetViewFactory(intent: Intent): RemoteViewsFactory {
@@ -15,7 +14,7 @@ class WidgetRemoteViewsService : RemoteViewsService() {
 
 class WidgetRemoteViewsFactory(private val context: Context) : RemoteViewsService.RemoteViewsFactory {
 
-    private var items: List<StatusSummaryItem> = emptyList()
+    private var items: List<WidgetItem> = emptyList()
 
     override fun onCreate() {}
 
@@ -35,19 +34,16 @@ class WidgetRemoteViewsFactory(private val context: Context) : RemoteViewsServic
         if (position < items.size) {
             val item = items[position]
 
-            views.setTextViewText(R.id.item_event_label, item.event_label)
-            views.setTextViewText(R.id.item_account_display, item.account_display)
+            views.setTextViewText(R.id.item_event_label, item.eventLabel)
+            views.setTextViewText(R.id.item_account_display, item.accountDisplay)
             views.setTextViewText(
                 R.id.item_time_remaining,
-                item.end_time_formatted ?: ""
+                item.timeRemainingFormatted()
             )
             views.setTextViewText(
                 R.id.item_attacks_remaining,
-                "${item.attacks_remaining} Angriff(e) übrig"
+                "${item.attacksRemaining} Angriff(e) übrig"
             )
-
-            // Color based on urgency — simplified for RemoteViews
-            // (cannot easily parse ISO time in RemoteViews, use server-provided formatted string)
         }
 
         return views
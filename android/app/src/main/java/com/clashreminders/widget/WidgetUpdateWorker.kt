@@ -22,7 +22,7 @@ class WidgetUpdateWorker(
                 return Result.success()
             }
 
-            val summary = repository.getStatusSummary()
+            val summary = repository.getWidgetSummary()
             if (summary != null) {
                 WidgetDataStore.save(applicationContext, summary)
                 MissingHitsWidgetProvider.updateAllWidgets(applicationContext)
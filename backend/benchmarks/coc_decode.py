@@ -0,0 +1,75 @@
+"""
+Benchmark: CPU spent decoding a poll cycle's CoC responses, before and after projected decoding.
+
+Each clan's cycle is one current war (30v30 with attack details), one CWL war (15v15) and
+one raid season (50 members), decoded from JSON bytes and turned into the poller's event
+records. "before" is response.json() (stdlib) plus the strptime-based timestamp parser;
+"after" is coc_decode.decode() (msgspec projection if installed, else orjson) plus the
+sliced fast path of parse_coc_timestamp().
+
+    cd backend && python -m benchmarks.coc_decode [clans]
+"""
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.poll_memory import _raid, _war
+from services import coc_decode, data_poller
+from services.data_poller import RaidRecord, WarRecord
+
+
+def strptime_timestamp(ts: str) -> datetime:
+    """parse_coc_timestamp() before the fast path."""
+    if not ts:
+        return None
+    try:
+        return datetime.strptime(ts, "%Y%m%dT%H%M%S.%fZ").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return datetime.strptime(ts, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+
+
+def run(clans: int, bodies: tuple[bytes, bytes, bytes], fast: bool) -> float:
+    cw, cwl, raid = bodies
+    fast_parse = data_poller.parse_coc_timestamp
+    data_poller.parse_coc_timestamp = fast_parse if fast else strptime_timestamp
+    try:
+        start = time.process_time()
+        for _ in range(clans):
+            if fast:
+                war = coc_decode.decode("war", cw)
+                league_war = coc_decode.decode("war", cwl)
+                seasons = coc_decode.decode("raid_seasons", raid)
+            else:
+                war, league_war, seasons = json.loads(cw), json.loads(cwl), json.loads(raid)
+            WarRecord.from_api(war, "#CLAN")
+            WarRecord.from_api(league_war, "#CLAN", 1)
+            RaidRecord.from_api(seasons["items"][0])
+        return time.process_time() - start
+    finally:
+        data_poller.parse_coc_timestamp = fast_parse
+
+
+def main():
+    clans = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    bodies = (_war("#CLAN", 30, 2), _war("#CLAN", 15, 1), b'{"items":[' + _raid(50) + b"]}")
+    backend = "msgspec projection" if coc_decode.msgspec else ("orjson" if coc_decode.orjson else "stdlib json")
+    before = run(clans, bodies, fast=False)
+    after = run(clans, bodies, fast=True)
+    print(f"{clans} clans, {sum(map(len, bodies)) / 1024:.0f} KiB of JSON per clan, fast decoder: {backend}")
+    print(f"  before: {before:6.2f} s CPU per cycle")
+    print(f"  after:  {after:6.2f} s CPU per cycle  ({before / after:.1f}x faster)")
+
+    start = time.process_time()
+    for _ in range(100_000):
+        strptime_timestamp("20260209T143000.000Z")
+    slow = time.process_time() - start
+    start = time.process_time()
+    for _ in range(100_000):
+        data_poller.parse_coc_timestamp("20260209T143000.000Z")
+    fast = time.process_time() - start
+    print(f"  parse_coc_timestamp: {slow / 100_000 * 1e6:.2f} us -> {fast / 100_000 * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark: onboarding latency (POST /accounts, POST /clans) with and without the CoC entity cache.
+
+The CoC client is replaced by one that answers after a fixed latency (default 400 ms, a
+typical live lookup). "before" clears the entity cache for every request, i.e. always a
+live call as the endpoints used to make; "after" runs with the clans/players already
+fetched by a poll cycle. Reports p50 / max request latency.
+
+    cd backend && python -m benchmarks.onboarding [requests] [api_latency_ms]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from services import coc_api  # noqa: E402
+
+
+class SlowClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def get_player(self, tag):
+        await asyncio.sleep(self.latency)
+        return {"tag": tag, "name": "Chief", "clan": {"tag": "#CLAN", "name": "Clan"}}
+
+    async def get_clan_info(self, clan_tag):
+        await asyncio.sleep(self.latency)
+        return {"tag": clan_tag, "name": "Clan"}
+
+
+def onboard(client: TestClient, count: int, warm: bool) -> list[float]:
+    latencies = []
+    for i in range(count):
+        user_id = client.post("/api/v1/users/register", json={}).json()["id"]
+        coc_api.entity_cache.clear()
+        if warm:
+            asyncio.run(coc_api.get_player(f"#P{i}"))
+            asyncio.run(coc_api.get_clan_info(f"#C{i}"))
+        for path, body in (("accounts", {"tag": f"#P{i}"}), ("clans", {"clan_tag": f"#C{i}"})):
+            start = time.perf_counter()
+            response = client.post(f"/api/v1/users/{user_id}/{path}", json=body)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+    return latencies
+
+
+def report(name: str, latencies: list[float]):
+    print(f"{name:>7}: p50 {statistics.median(latencies) * 1000:7.1f} ms   max {max(latencies) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 400
+    asyncio.run(main.init_db())
+    coc_api._coc_client = SlowClient(latency_ms / 1000)
+    client = TestClient(main.app)
+
+    print(f"{count} users x (account + clan), CoC API latency {latency_ms:.0f} ms")
+    report("before", onboard(client, count, warm=False))
+    report("after", onboard(client, count, warm=True))
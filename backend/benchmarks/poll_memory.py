@@ -0,0 +1,93 @@
+"""
+Benchmark: memory held by a poll cycle's fetched clan data — raw decoded JSON vs event records.
+
+Builds API-shaped responses for N clans (a 30v30 war with attack details, a CWL round and a
+raid season with 50 members each), decodes them from JSON bytes like the HTTP client does,
+and measures with tracemalloc what stays alive when every clan's result is kept for the
+cycle: "before" keeps the decoded dicts (the old clan_data_cache), "after" the ClanEvents
+records fetch_clan_events() builds from them.
+
+    cd backend && python -m benchmarks.poll_memory [clans]
+"""
+import json
+import sys
+import tracemalloc
+
+from services.data_poller import ClanEvents, RaidRecord, WarRecord
+
+END = "20260209T143000.000Z"
+
+
+def _members(prefix: str, count: int, attacks: int) -> list[dict]:
+    return [
+        {
+            "tag": f"#{prefix}{i:04d}", "name": f"Player {i}", "townhallLevel": 15, "mapPosition": i + 1,
+            "opponentAttacks": 1,
+            "attacks": [
+                {"attackerTag": f"#{prefix}{i:04d}", "defenderTag": f"#D{j:04d}", "stars": 2,
+                 "destructionPercentage": 87, "order": i * 2 + j, "duration": 150}
+                for j in range(attacks)
+            ],
+            "bestOpponentAttack": {"attackerTag": "#X", "defenderTag": f"#{prefix}{i:04d}", "stars": 1,
+                                   "destructionPercentage": 55, "order": 3, "duration": 170},
+        }
+        for i in range(count)
+    ]
+
+
+def _war(clan_tag: str, size: int, attacks_per_member: int) -> bytes:
+    side = {"badgeUrls": {"small": "https://example.invalid/s.png", "large": "https://example.invalid/l.png"},
+            "clanLevel": 20, "attacks": 40, "stars": 70, "destructionPercentage": 80.5}
+    return json.dumps({
+        "state": "inWar", "teamSize": size, "attacksPerMember": attacks_per_member,
+        "preparationStartTime": END, "startTime": END, "endTime": END,
+        "clan": {"tag": clan_tag, "name": "Clan", **side, "members": _members("A", size, attacks_per_member)},
+        "opponent": {"tag": "#OPP", "name": "Opponent", **side, "members": _members("B", size, attacks_per_member)},
+    }).encode()
+
+
+def _raid(members: int) -> bytes:
+    return json.dumps({
+        "state": "ongoing", "startTime": END, "endTime": END, "capitalTotalLoot": 100000,
+        "members": [
+            {"tag": f"#R{i:04d}", "name": f"Player {i}", "attacks": 5, "attackLimit": 5,
+             "bonusAttackLimit": 1, "capitalResourcesLooted": 20000}
+            for i in range(members)
+        ],
+        "attackLog": [{"defender": {"tag": f"#C{i}", "name": "Defender", "level": 10},
+                       "attackCount": 20, "districtCount": 9, "districtsDestroyed": 9} for i in range(6)],
+    }).encode()
+
+
+def measure(clans: int, slim: bool) -> int:
+    cw, cwl, raid = _war("#CLAN", 30, 2), _war("#CLAN", 15, 1), _raid(50)
+    tracemalloc.start()
+    kept = []
+    for _ in range(clans):
+        cw_data, cwl_war, raid_data = json.loads(cw), json.loads(cwl), json.loads(raid)
+        if slim:
+            kept.append(ClanEvents(
+                cw=WarRecord.from_api(cw_data, "#CLAN"),
+                cwl=[WarRecord.from_api(cwl_war, "#CLAN", 1)],
+                raid=RaidRecord.from_api(raid_data),
+                clan_name="Clan",
+            ))
+        else:
+            kept.append({"cw": cw_data, "cwl": [cwl_war], "raid": raid_data, "clan_name": "Clan"})
+        del cw_data, cwl_war, raid_data
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    clans = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    before = measure(clans, slim=False)
+    after = measure(clans, slim=True)
+    print(f"{clans} clans")
+    print(f"  before (decoded JSON): {before / 2**20:8.1f} MiB peak")
+    print(f"  after  (records):      {after / 2**20:8.1f} MiB peak  ({before / after:.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
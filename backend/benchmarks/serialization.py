@@ -0,0 +1,120 @@
+"""
+Benchmark: response serialization, Pydantic response models vs the serializers fast path.
+
+Serves the same rows through two routes per endpoint on an in-process FastAPI app — the
+"before" route returns ORM rows / Pydantic models and lets response_model validate and
+encode them, the "after" route returns serializers.dumps() bytes — and reports requests/s.
+Rows are loaded once, so only serialization differs between the two.
+
+    cd backend && python -m benchmarks.serialization [events] [seconds]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import Response  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+import serializers  # noqa: E402
+from services import status_view  # noqa: E402
+
+
+def make_rows(event_count: int):
+    now = datetime.now(timezone.utc)
+    accounts = [
+        models.PlayerAccount(id=f"a{i}", tag=f"#P{i}", name=f"Player {i}", user_id="u", current_clan_tag="#C",
+                             current_clan_name="Clan", last_synced_at=now)
+        for i in range(10)
+    ]
+    configs = [
+        models.ReminderConfig(id=f"c{et}", user_id="u", event_type=et, enabled=True, times=[
+            models.ReminderTime(id=f"t{et}{m}", minutes_before_end=m, label=f"{m}m", enabled=True)
+            for m in (30, 60, 240)
+        ])
+        for et in ("cw", "cwl", "raid")
+    ]
+    snapshots = [
+        models.EventSnapshot(
+            id=f"s{i}", user_id="u", account_tag=f"#P{i % 10}", account_name=f"Player {i % 10}",
+            clan_tag="#C", clan_name="Clan", event_type=("cw", "cwl", "raid")[i % 3],
+            event_subtype="day_2" if i % 3 == 1 else None, state="inWar", attacks_used=i % 2, attacks_max=2,
+            end_time=now + timedelta(hours=i), start_time=now - timedelta(hours=20), polled_at=now,
+            opponent_name="Opp", opponent_tag="#O", war_size=15, is_active=True,
+        )
+        for i in range(event_count)
+    ]
+    row = models.UserStatus(user_id="u", **status_view.build_status_values(snapshots))
+    return accounts, configs, row
+
+
+def build_app(accounts, configs, row) -> FastAPI:
+    app = FastAPI()
+    now = lambda: datetime.now(timezone.utc)  # noqa: E731
+
+    @app.get("/before/accounts", response_model=List[schemas.PlayerAccountResponse])
+    async def accounts_before():
+        return accounts
+
+    @app.get("/after/accounts")
+    async def accounts_after():
+        return Response(serializers.dumps([serializers.account_payload(a) for a in accounts]),
+                        media_type="application/json")
+
+    @app.get("/before/reminders", response_model=schemas.RemindersResponse)
+    async def reminders_before():
+        return schemas.RemindersResponse(reminders=configs)
+
+    @app.get("/after/reminders")
+    async def reminders_after():
+        payload = {"reminders": [serializers.reminder_config_payload(c) for c in configs]}
+        return Response(serializers.dumps(payload), media_type="application/json")
+
+    @app.get("/before/status", response_model=schemas.StatusResponse)
+    async def status_before():
+        return schemas.StatusResponse(last_polled=row.last_polled,
+                                      events=[status_view.render_event(item, now()) for item in row.items])
+
+    @app.get("/after/status")
+    async def status_after():
+        return Response(serializers.dumps(status_view.status_payload(row, now())), media_type="application/json")
+
+    @app.get("/before/summary", response_model=schemas.StatusSummaryResponse)
+    async def summary_before():
+        return schemas.StatusSummaryResponse.model_validate(status_view.summary_payload(row, now()))
+
+    @app.get("/after/summary")
+    async def summary_after():
+        return Response(serializers.dumps(status_view.summary_payload(row, now())), media_type="application/json")
+
+    return app
+
+
+def requests_per_second(client: TestClient, path: str, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        client.get(path)
+        count += 1
+    return count / seconds
+
+
+if __name__ == "__main__":
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    client = TestClient(build_app(*make_rows(event_count)))
+    encoder = "orjson" if serializers.orjson else "stdlib json"
+
+    print(f"{event_count} status events, encoder: {encoder}")
+    for name in ("accounts", "reminders", "status", "summary"):
+        assert client.get(f"/before/{name}").content == client.get(f"/after/{name}").content
+        before = requests_per_second(client, f"/before/{name}", seconds)
+        after = requests_per_second(client, f"/after/{name}", seconds)
+        print(f"{name:>10}: {before:8.0f} req/s -> {after:8.0f} req/s  ({after / before:4.2f}x)")
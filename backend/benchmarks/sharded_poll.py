@@ -0,0 +1,98 @@
+"""
+Benchmark: poll cycle wall time with 1, 2, 4, ... poller shards running in parallel processes.
+
+Seeds users with tracked clans into a throwaway SQLite database, replaces the CoC client
+with one that answers after a fixed latency, and runs one poll_all_users() cycle per shard
+in separate processes. Reports the cycle time and speedup over a single poller.
+
+    cd backend && python -m benchmarks.sharded_poll [clans] [api_latency_ms] [max_shards]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+
+import logging  # noqa: E402
+
+import models  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from services import coc_api, data_poller  # noqa: E402
+
+
+def install_fake_api(latency: float):
+    end = (datetime.now(timezone.utc) + timedelta(hours=2)).strftime("%Y%m%dT%H%M%S.000Z")
+
+    async def fetch_clan_events(clan_tag):
+        await asyncio.sleep(latency)
+        war = {
+            "state": "inWar", "attacksPerMember": 2, "teamSize": 5, "endTime": end,
+            "clan": {"tag": clan_tag, "name": clan_tag, "members": [{"tag": "#P1", "name": "P", "attacks": []}]},
+            "opponent": {"tag": "#OPP", "members": []},
+        }
+        return data_poller.ClanEvents(cw=data_poller.WarRecord.from_api(war, clan_tag), clan_name=clan_tag, member_tags={"#P1"})
+
+    async def get_player(tag):
+        await asyncio.sleep(latency)
+        return None
+
+    data_poller.fetch_clan_events = fetch_clan_events
+    coc_api.get_player = get_player
+
+
+async def seed(clan_count: int):
+    from database import engine
+    from main import init_db
+    await init_db()
+    async with SessionLocal() as db:
+        for u in range(clan_count // 10):
+            user = models.User(id=f"u{u}")
+            db.add(user)
+            db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P"))
+            for c in range(10):
+                db.add(models.TrackedClan(user_id=user.id, clan_tag=f"#C{u}X{c}", clan_name="Clan"))
+        await db.commit()
+    await engine.dispose()
+
+
+def run_shard(shard, latency: float):
+    logging.disable(logging.INFO)
+    install_fake_api(latency)
+
+    async def once():
+        async with SessionLocal() as db:
+            await data_poller.poll_all_users(db, shard=shard)
+    asyncio.run(once())
+
+
+def cycle_time(count: int, latency: float) -> float:
+    # spawn: each poller gets its own interpreter and connections, like `python poller.py`
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_shard, args=((i, count), latency)) for i in range(count)]
+    start = time.perf_counter()
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    clan_count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    max_shards = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 4
+    logging.disable(logging.INFO)
+    asyncio.run(seed(clan_count))
+
+    print(f"{clan_count} clans, CoC API latency {latency_ms:.0f} ms")
+    base = None
+    shards = 1
+    while shards <= max_shards:
+        elapsed = cycle_time(shards, latency_ms / 1000)
+        base = base or elapsed
+        print(f"{shards:>3} shard(s): {elapsed:6.2f} s  ({base / elapsed:4.2f}x)")
+        shards *= 2
@@ -0,0 +1,80 @@
+"""
+Benchmark: concurrent /status/stream subscribers on one worker.
+
+Opens N idle streams (one per user, against a throwaway SQLite database), reports the memory
+held per idle stream, then publishes a change for every user and measures how long it takes
+until every stream has emitted its delta.
+
+    cd backend && python -m benchmarks.status_stream 1000 5000
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+
+import models  # noqa: E402
+from core.config import settings  # noqa: E402
+from database import engine  # noqa: E402
+from services.status_events import StatusBroker, status_stream  # noqa: E402
+
+
+async def setup(user_count: int) -> list[str]:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+        user_ids = [f"user-{i}" for i in range(user_count)]
+        await conn.execute(models.User.__table__.insert(), [{"id": u} for u in user_ids])
+        await conn.execute(models.UserStatus.__table__.insert(), [
+            {"user_id": u, "version": 1, "floor_version": 0, "items": [], "by_event_type": {}, "total_missing": 0}
+            for u in user_ids
+        ])
+    return user_ids
+
+
+async def consume(user_id: str, broker: StatusBroker, ready: asyncio.Event, done: list):
+    stream = status_stream(user_id, 1, broker)
+    await anext(stream)  # retry: frame, subscribed from here on
+    ready.set()
+    async for frame in stream:
+        if frame.startswith("id:"):
+            done.append(time.perf_counter())
+            break
+    await stream.aclose()
+
+
+async def run(user_count: int):
+    settings.STATUS_STREAM_HEARTBEAT_SECONDS = 3600
+    user_ids = await setup(user_count)
+    broker = StatusBroker(max_per_user=1)
+    done = []
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    tasks = []
+    for user_id in user_ids:
+        ready = asyncio.Event()
+        tasks.append(asyncio.create_task(consume(user_id, broker, ready, done)))
+        await ready.wait()
+    await asyncio.sleep(0.1)  # let every stream reach its idle wait
+    idle = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+    tracemalloc.stop()
+
+    async with engine.begin() as conn:
+        await conn.execute(models.UserStatus.__table__.update().values(version=2))
+    start = time.perf_counter()
+    broker.publish({user_id: 2 for user_id in user_ids})
+    await asyncio.gather(*tasks)
+    elapsed = max(done) - start
+
+    print(f"{user_count:>7} streams | idle memory {idle / user_count / 1024:6.1f} KiB/stream | "
+          f"fan-out to all {elapsed * 1000:8.1f} ms ({user_count / elapsed:8.0f} deltas/s)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    for count in [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]:
+        asyncio.run(run(count))
@@ -0,0 +1,86 @@
+"""
+Shared pytest fixtures — points the app at a throwaway SQLite database before it is imported.
+
+The app runs on the async engine; tests seed and inspect the same database file through a
+plain sync engine, and drive coroutines that need an AsyncSession with run_async().
+"""
+import asyncio
+import os
+import tempfile
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+_test_db_dir = tempfile.mkdtemp(prefix="clash_reminders_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_test_db_dir}/test.db"
+
+import main  # noqa: E402
+import models  # noqa: E402
+from database import Base, SessionLocal  # noqa: E402
+
+asyncio.run(main.init_db())
+
+sync_engine = create_engine(os.environ["DATABASE_URL"])
+SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+
+
+def run_async(fn, *args, **kwargs):
+    """Run `fn(session, *args)` with a fresh AsyncSession on a new event loop."""
+    async def runner():
+        async with SessionLocal() as session:
+            return await fn(session, *args, **kwargs)
+    return asyncio.run(runner())
+
+
+@pytest.fixture
+def db():
+    session = SyncSession()
+    try:
+        yield session
+    finally:
+        session.close()
+        # Wipe all rows so every test starts from an empty schema
+        with sync_engine.begin() as conn:
+            for table in reversed(Base.metadata.sorted_tables):
+                if table.name != "schema_migrations":
+                    conn.execute(table.delete())
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    return TestClient(main.app)
+
+
+def make_user(db, fcm_token: str = "token", **kwargs) -> models.User:
+    user = models.User(fcm_token=fcm_token, **kwargs)
+    db.add(user)
+    db.flush()
+    return user
+
+
+def make_snapshot(db, user_id: str, **kwargs) -> models.EventSnapshot:
+    now = datetime.now(timezone.utc)
+    values = dict(
+        user_id=user_id,
+        account_tag=f"#{uuid.uuid4().hex[:8].upper()}",
+        account_name="Player",
+        clan_tag="#CLAN",
+        clan_name="Clan",
+        event_type="cw",
+        event_subtype=None,
+        state="inWar",
+        attacks_used=0,
+        attacks_max=2,
+        end_time=now + timedelta(hours=2),
+        start_time=now - timedelta(hours=22),
+        is_active=True,
+        polled_at=now,
+    )
+    values.update(kwargs)
+    snapshot = models.EventSnapshot(**values)
+    db.add(snapshot)
+    return snapshot
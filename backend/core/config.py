@@ -7,8 +7,69 @@ class Settings:
     PROJECT_NAME: str = "ClashReminders"
     COC_API_KEY: str = os.getenv("COC_API_KEY", "")
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./clash_reminders.db")
+
+    # PostgreSQL connection pool (ignored for SQLite)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT_SECONDS: int = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+
+    # SQLite tuning (ignored for PostgreSQL)
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE_BYTES: int = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", "268435456"))
+
     FIREBASE_CREDENTIALS_PATH: str = os.getenv("FIREBASE_CREDENTIALS_PATH", "firebase-service-account.json")
     POLL_INTERVAL_SECONDS: int = int(os.getenv("POLL_INTERVAL_SECONDS", "60"))
     REMINDER_CHECK_INTERVAL_SECONDS: int = int(os.getenv("REMINDER_CHECK_INTERVAL_SECONDS", "60"))
+    CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("CLEANUP_INTERVAL_SECONDS", os.getenv("POLL_INTERVAL_SECONDS", "60")))
+    # Share of the poll interval after which a running poll sheds low-priority work (clans
+    # without active events, player name refresh) so clans near a deadline aren't delayed
+    POLL_BUDGET_FRACTION: float = float(os.getenv("POLL_BUDGET_FRACTION", "0.8"))
+    # With several API workers only the leader runs the scheduler. The lease is renewed every
+    # LEADER_RENEW_SECONDS; a standby takes over within LEADER_LEASE_TTL_SECONDS of the leader dying
+    LEADER_LEASE_TTL_SECONDS: int = int(os.getenv("LEADER_LEASE_TTL_SECONDS", "15"))
+    LEADER_RENEW_SECONDS: int = int(os.getenv("LEADER_RENEW_SECONDS", "5"))
+    # Per-user /status response cache (entries also expire after the TTL, default one poll interval)
+    STATUS_CACHE_TTL_SECONDS: int = int(os.getenv("STATUS_CACHE_TTL_SECONDS", os.getenv("POLL_INTERVAL_SECONDS", "60")))
+    STATUS_CACHE_MAX_USERS: int = int(os.getenv("STATUS_CACHE_MAX_USERS", "10000"))
+    # /status/stream (server-sent events): heartbeat comment interval, which is also how often
+    # versions committed by other workers are picked up; open streams per user and worker
+    STATUS_STREAM_HEARTBEAT_SECONDS: int = int(os.getenv("STATUS_STREAM_HEARTBEAT_SECONDS", "15"))
+    STATUS_STREAM_MAX_PER_USER: int = int(os.getenv("STATUS_STREAM_MAX_PER_USER", "5"))
+    # Linked players' names/clans are refreshed by their own job, each tag about once per
+    # PLAYER_REFRESH_INTERVAL_SECONDS, with at most PLAYER_REFRESH_CONCURRENCY requests in flight
+    PLAYER_REFRESH_INTERVAL_SECONDS: int = int(os.getenv("PLAYER_REFRESH_INTERVAL_SECONDS", "21600"))
+    PLAYER_REFRESH_CONCURRENCY: int = int(os.getenv("PLAYER_REFRESH_CONCURRENCY", "8"))
+    # Users processed (and committed) per chunk of a poll cycle
+    POLL_CHUNK_SIZE: int = int(os.getenv("POLL_CHUNK_SIZE", "500"))
+    # Sharded polling: clans are polled by dedicated `python poller.py` processes (one per core)
+    # instead of the scheduler; each polls the clans whose tag hashes to its shard
+    POLL_SHARDED: bool = os.getenv("POLL_SHARDED", "false").lower() in ("1", "true", "yes")
+    # Targeted polls for newly added clans/accounts: queued jobs per worker, and how old a
+    # clan fetch from the poll cycle may be to be reused instead of fetched again
+    TARGETED_POLL_QUEUE_SIZE: int = int(os.getenv("TARGETED_POLL_QUEUE_SIZE", "1000"))
+    TARGETED_POLL_REUSE_SECONDS: int = int(os.getenv("TARGETED_POLL_REUSE_SECONDS", "30"))
+    # Players/clans fetched by the poller or the API are reused for account/clan validation
+    # for this long; live lookups on the request path give up after COC_LOOKUP_TIMEOUT_SECONDS
+    COC_ENTITY_CACHE_TTL_SECONDS: int = int(os.getenv("COC_ENTITY_CACHE_TTL_SECONDS", "300"))
+    COC_ENTITY_CACHE_MAX_ENTRIES: int = int(os.getenv("COC_ENTITY_CACHE_MAX_ENTRIES", "50000"))
+    COC_LOOKUP_TIMEOUT_SECONDS: float = float(os.getenv("COC_LOOKUP_TIMEOUT_SECONDS", "5"))
+    # Decode CoC API responses projected to the fields the app reads (needs msgspec)
+    COC_FAST_DECODE: bool = os.getenv("COC_FAST_DECODE", "true").lower() in ("1", "true", "yes")
+    # Reminders re-fetch the war/raid right before sending: at most this many CoC API requests per
+    # minute across all processes together (the poll cycle keeps the rest of the key's rate
+    # limit); fetches are shared for REMINDER_FRESHNESS_MAX_AGE_SECONDS. 0 disables the check.
+    REMINDER_FRESHNESS_CALLS_PER_MINUTE: int = int(os.getenv("REMINDER_FRESHNESS_CALLS_PER_MINUTE", "120"))
+    REMINDER_FRESHNESS_MAX_AGE_SECONDS: float = float(os.getenv("REMINDER_FRESHNESS_MAX_AGE_SECONDS", "5"))
+    # Rows per UPDATE/DELETE batch in cleanup_stale_snapshots (one transaction per batch)
+    CLEANUP_BATCH_SIZE: int = int(os.getenv("CLEANUP_BATCH_SIZE", "1000"))
+
+    # Notification log retention: rows are bucketed by "day" or "week"; the newest
+    # NOTIFICATION_LOG_HOT_BUCKETS buckets stay in notification_logs, older ones are
+    # compacted into notification_log_archive and dropped after the retention period.
+    NOTIFICATION_LOG_BUCKET: str = os.getenv("NOTIFICATION_LOG_BUCKET", "day")
+    NOTIFICATION_LOG_HOT_BUCKETS: int = int(os.getenv("NOTIFICATION_LOG_HOT_BUCKETS", "2"))
+    NOTIFICATION_ARCHIVE_RETENTION_DAYS: int = int(os.getenv("NOTIFICATION_ARCHIVE_RETENTION_DAYS", "90"))
 
 settings = Settings()
@@ -0,0 +1,59 @@
+"""
+In-process metrics registry — counters, gauges and timing aggregates, exposed via GET /metrics.
+"""
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """Thread-safe counters, gauges (current values) and timing aggregates (count / total / max)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._timings = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            entry = self._timings.get(name)
+            if entry is None:
+                self._timings[name] = {"count": 1, "total": value, "max": value}
+            else:
+                entry["count"] += 1
+                entry["total"] += value
+                entry["max"] = max(entry["max"], value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {
+                    name: {
+                        "count": t["count"],
+                        "total": round(t["total"], 6),
+                        "avg": round(t["total"] / t["count"], 6),
+                        "max": round(t["max"], 6),
+                    }
+                    for name, t in self._timings.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+
+
+# Singleton registry
+metrics = Metrics()
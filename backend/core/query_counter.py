@@ -0,0 +1,92 @@
+"""
+SQL query instrumentation — counts statements and DB time per HTTP request / scheduler phase.
+
+Listeners are attached to the engine once via install(). Every statement executed while a
+track_queries() scope is active is added to that scope (and to any enclosing scopes).
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from core.metrics import metrics
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+_active_scopes: ContextVar[tuple] = ContextVar("active_query_scopes", default=())
+
+
+@dataclass
+class QueryStats:
+    scope: str
+    count: int = 0
+    db_time: float = 0.0  # seconds
+    record: bool = False
+    statements: list = field(default_factory=list)
+
+    @property
+    def db_time_ms(self) -> float:
+        return round(self.db_time * 1000, 3)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    for stats in _active_scopes.get():
+        stats.count += 1
+        stats.db_time += elapsed
+        if stats.record:
+            stats.statements.append(statement)
+
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so it
+    # isn't taken for the next statement's on this connection
+    if context.connection is not None and context.execution_context is not None:
+        starts = context.connection.info.get("query_start_time")
+        if starts:
+            starts.pop()
+
+
+def install(engine):
+    """Attach the query counting listeners to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_queries(scope: str, record: bool = False, report: bool = True):
+    """Count queries executed inside the block. Reports to /metrics under the scope name."""
+    stats = QueryStats(scope=scope, record=record)
+    token = _active_scopes.set(_active_scopes.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_scopes.reset(token)
+        if report:
+            report_stats(stats)
+
+
+def report_stats(stats: QueryStats):
+    metrics.incr(f"db.queries.{stats.scope}", stats.count)
+    metrics.observe(f"db.time.{stats.scope}", stats.db_time)
+
+
+@contextmanager
+def assert_max_queries(budget: int, scope: str = "test"):
+    """Fail if the block executes more than `budget` statements (N+1 guard for tests)."""
+    with track_queries(scope, record=True, report=False) as stats:
+        yield stats
+    if stats.count > budget:
+        statements = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(stats.statements))
+        raise AssertionError(
+            f"{scope}: executed {stats.count} queries, budget is {budget}:\n{statements}"
+        )
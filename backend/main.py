@@ -1,21 +1,34 @@
 import logging
 import asyncio
+import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
 from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
-from fastapi.concurrency import run_in_threadpool
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import select, delete, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 
 import models
 import schemas
+import serializers
 from database import engine, get_db, SessionLocal
-from services import coc_api, fcm_service
-from services.data_poller import poll_all_users, cleanup_stale_snapshots, format_duration
+from migrations import run_migrations
+from services import (
+    coc_api, data_poller, fcm_service, leader_election, player_refresh, reminder_engine, scheduler, status_view,
+    status_events, targeted_poll,
+)
+from services.data_poller import poll_all_users, cleanup_stale_snapshots
 from services.reminder_engine import check_reminders
+from services.notification_retention import compact_notification_logs
+from services.status_cache import status_cache, CachedResponse
 from core.config import settings
+from core import query_counter
+from core.metrics import metrics
 
 # Configure Logging
 logging.basicConfig(
@@ -24,58 +37,77 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-try:
-    models.Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully.")
-except Exception as e:
-    logger.error(f"Error creating database tables: {e}")
+# Count queries / DB time per request and scheduler phase
+query_counter.install(engine.sync_engine)
+
+
+async def init_db():
+    """Create database tables and apply pending migrations."""
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        logger.info("Database tables created successfully.")
+        await run_migrations(engine)
+    except Exception as e:
+        logger.error(f"Error creating database tables: {e}")
 
 
 # ============ SCHEDULER ============
 
 _scheduler_task = None
+_stream_sync_task = None
+_targeted_poll_task = None
 
-async def scheduler_loop():
-    """Background scheduler loop — polls data and checks reminders."""
-    poll_interval = settings.POLL_INTERVAL_SECONDS
-    logger.info(f"Scheduler started: polling every {poll_interval}s")
+async def run_poll(deadline: float):
+    async with SessionLocal() as db:
+        await poll_all_users(db, deadline=deadline)
 
-    while True:
-        try:
-            db = SessionLocal()
-            try:
-                # Poll data
-                await poll_all_users(db)
-                # Cleanup stale snapshots
-                await cleanup_stale_snapshots(db)
-            finally:
-                db.close()
 
-            # Wait half interval, then check reminders
-            await asyncio.sleep(poll_interval // 2)
+async def run_cleanup(deadline: float):
+    async with SessionLocal() as db:
+        # Not while this process's poll/targeted poll transaction is writing snapshots
+        async with data_poller.write_lock:
+            await cleanup_stale_snapshots(db)
+        # Archive old notification log buckets
+        with query_counter.track_queries("scheduler.retention"):
+            await compact_notification_logs(db)
 
-            db = SessionLocal()
-            try:
-                await check_reminders(db)
-            finally:
-                db.close()
 
-            # Wait remaining half
-            await asyncio.sleep(poll_interval - (poll_interval // 2))
+async def run_player_refresh(deadline: float):
+    async with SessionLocal() as db:
+        await player_refresh.refresh_players(db, run_interval=settings.POLL_INTERVAL_SECONDS)
+
+
+async def run_reminders(deadline: float):
+    async with SessionLocal() as db:
+        await check_reminders(db)
+
+
+async def scheduler_loop():
+    """Background scheduler — polling, player refresh, reminders and cleanup as independent fixed-rate jobs."""
+    poll_interval = settings.POLL_INTERVAL_SECONDS
+    jobs = [
+        # Reminders half an interval after the poll, as before, so they see fresh snapshots
+        scheduler.FixedRateJob("reminders", settings.REMINDER_CHECK_INTERVAL_SECONDS, run_reminders,
+                               offset=poll_interval / 2),
+        scheduler.FixedRateJob("cleanup", settings.CLEANUP_INTERVAL_SECONDS, run_cleanup),
+        scheduler.FixedRateJob("players", poll_interval, run_player_refresh),
+    ]
+    # Dedicated poller processes do this in sharded mode
+    if not settings.POLL_SHARDED:
+        jobs.append(scheduler.FixedRateJob("poll", poll_interval, run_poll))
+    logger.info("Scheduler started: " + ", ".join(f"{job.name} every {job.interval}s" for job in jobs))
 
-        except asyncio.CancelledError:
-            logger.info("Scheduler loop cancelled.")
-            break
-        except Exception as e:
-            logger.error(f"Scheduler error: {e}", exc_info=True)
-            await asyncio.sleep(poll_interval)
+    try:
+        await scheduler.run_jobs(jobs)
+    except asyncio.CancelledError:
+        logger.info("Scheduler loop cancelled.")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan — start/stop background tasks."""
-    global _scheduler_task
+    global _scheduler_task, _stream_sync_task, _targeted_poll_task
 
     # Startup
     if not settings.COC_API_KEY:
@@ -83,23 +115,33 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("COC_API_KEY loaded successfully.")
 
+    # Create tables / run migrations
+    await init_db()
+
     # Initialize Firebase
     fcm_service.init_firebase()
 
-    # Start scheduler
-    _scheduler_task = asyncio.create_task(scheduler_loop())
-    logger.info("Background scheduler started.")
+    # Start scheduler — only in the worker holding the leader lease
+    election = leader_election.make_election(engine, "scheduler")
+    _scheduler_task = asyncio.create_task(leader_election.run_while_leader(election, scheduler_loop))
+    logger.info("Background scheduler started (waiting for leadership).")
+    # Wake /status/stream connections for changes committed by other workers
+    _stream_sync_task = asyncio.create_task(status_events.sync_loop())
+    # Poll newly added clans/accounts right away
+    _targeted_poll_task = asyncio.create_task(targeted_poll.worker())
 
     yield
 
     # Shutdown
-    if _scheduler_task:
-        _scheduler_task.cancel()
-        try:
-            await _scheduler_task
-        except asyncio.CancelledError:
-            pass
+    for task in (_scheduler_task, _stream_sync_task, _targeted_poll_task):
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
     logger.info("Background scheduler stopped.")
+    await engine.dispose()
 
 
 # ============ APP ============
@@ -120,6 +162,21 @@ async def global_exception_handler(request: Request, exc: Exception):
     return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
 
 
+@app.middleware("http")
+async def query_count_middleware(request: Request, call_next):
+    """Expose per-request query count and DB time as headers and metrics."""
+    with query_counter.track_queries("http", report=False) as stats:
+        response = await call_next(request)
+
+    route = request.scope.get("route")
+    stats.scope = f"http.{request.method} {route.path if route else 'unmatched'}"
+    query_counter.report_stats(stats)
+
+    response.headers[query_counter.QUERY_COUNT_HEADER] = str(stats.count)
+    response.headers[query_counter.QUERY_TIME_HEADER] = f"{stats.db_time_ms:.3f}"
+    return response
+
+
 # ============ GENERAL ============
 
 @app.get("/", tags=["General"])
@@ -130,17 +187,86 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", tags=["General"])
+async def get_metrics():
+    """In-process counters and timings (query counts, DB time per request/phase)."""
+    return metrics.snapshot()
+
 
 # ============ HELPERS ============
 
-def get_user_or_404(db: Session, user_id: str) -> models.User:
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user_or_404(db: AsyncSession, user_id: str) -> models.User:
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-def create_default_reminders(db: Session, user_id: str):
+async def get_user_status(db: AsyncSession, user_id: str) -> models.UserStatus:
+    """Materialized status row (single PK read). Built on first read for users the poller hasn't written yet."""
+    row = await db.get(models.UserStatus, user_id)
+    if row is None:
+        await get_user_or_404(db, user_id)
+        try:
+            # changed: stamps any snapshots not yet carrying a version
+            row = (await status_view.refresh_user_status(db, (), changed=[user_id]))[user_id]
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request materialized it first
+            await db.rollback()
+            row = await db.get(models.UserStatus, user_id)
+    return row
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 prescribes for this header)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def conditional_response(
+    request: Request, cached: CachedResponse, media_type: str = "application/json", headers: dict | None = None
+) -> Response:
+    """Serve a cached body, or 304 Not Modified if the client already has it."""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request, cached.etag):
+        metrics.incr("status_cache.not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type=media_type, headers=headers)
+
+
+async def status_view_response(request: Request, db: AsyncSession, user_id: str, kind: str, payload, compact) -> Response:
+    """Cached /status-style response: JSON, or MessagePack for clients that accept it.
+
+    `payload(row, now)` builds the JSON body, `compact(row)` the MessagePack one.
+    """
+    encoding = "json"
+    media_type = "application/json"
+    if serializers.accepts_msgpack(request.headers.get("accept")):
+        encoding, media_type = "msgpack", serializers.MSGPACK_MEDIA_TYPE
+    cache_kind = f"{kind}.{encoding}"
+
+    cached = status_cache.get(user_id, cache_kind)
+    if cached is None:
+        generation = status_cache.generation(user_id)
+        row = await get_user_status(db, user_id)
+        if encoding == "msgpack":
+            body = serializers.dumps_msgpack(compact(row))
+        else:
+            body = serializers.dumps(payload(row, datetime.now(timezone.utc)))
+        cached = status_cache.put(user_id, cache_kind, body, generation)
+    return conditional_response(request, cached, media_type, headers={"Vary": "Accept"})
+
+
+def fast_json_response(payload) -> Response:
+    """JSON body built by serializers — bypasses response_model validation and re-encoding."""
+    return Response(content=serializers.dumps(payload), media_type="application/json")
+
+
+def create_default_reminders(db: AsyncSession, user_id: str):
     """Create default reminder configs for a new user."""
     defaults = [
         {"event_type": "cw", "times": [60, 240]},
@@ -148,18 +274,111 @@ def create_default_reminders(db: Session, user_id: str):
         {"event_type": "raid", "times": [120, 480]},
     ]
     for d in defaults:
-        config = models.ReminderConfig(user_id=user_id, event_type=d["event_type"], enabled=True)
+        config = models.ReminderConfig(
+            user_id=user_id,
+            event_type=d["event_type"],
+            enabled=True,
+            times=[
+                models.ReminderTime(minutes_before_end=mins, label=format_minutes_label(mins), enabled=True)
+                for mins in d["times"]
+            ],
+        )
         db.add(config)
-        db.flush()
-        for mins in d["times"]:
-            label = format_minutes_label(mins)
-            time_entry = models.ReminderTime(
-                reminder_config_id=config.id,
-                minutes_before_end=mins,
-                label=label,
-                enabled=True,
-            )
-            db.add(time_entry)
+
+
+async def load_reminder_configs(db: AsyncSession, user_id: str) -> list[models.ReminderConfig]:
+    """All reminder configs of a user with their times eagerly loaded."""
+    result = await db.execute(
+        select(models.ReminderConfig)
+        .options(selectinload(models.ReminderConfig.times))
+        .where(models.ReminderConfig.user_id == user_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().all()
+
+
+async def reconcile_reminder_configs(
+    db: AsyncSession, user_id: str, reminders: list[schemas.ReminderConfigUpdate]
+) -> tuple[set[str], set[str]]:
+    """Bring a user's reminder configs in line with `reminders`, updating rows in place.
+
+    Configs are matched by event_type and times by minutes_before_end, so unchanged triggers
+    keep their ids (notification_logs dedupe on reminder_time_id). At most one statement per
+    insert/update/delete kind, whatever the number of rows. Returns the (added, removed)
+    trigger ids — new or re-enabled times, and deleted or disabled ones.
+    """
+    existing = {c.event_type: c for c in await load_reminder_configs(db, user_id)}
+
+    new_configs, config_updates, new_times, time_updates = [], [], [], []
+    removed_time_ids = []
+    added, removed = set(), set()
+
+    for rc in reminders:
+        config = existing.pop(rc.event_type, None)
+        current_times = {}
+        if config is None:
+            config_id = str(uuid.uuid4())
+            new_configs.append({"id": config_id, "user_id": user_id, "event_type": rc.event_type, "enabled": rc.enabled})
+            was_enabled = False
+        else:
+            config_id = config.id
+            was_enabled = config.enabled
+            if config.enabled != rc.enabled:
+                config_updates.append({"b_id": config.id, "b_enabled": rc.enabled})
+            for t in config.times:
+                if t.minutes_before_end in current_times:
+                    removed_time_ids.append(t.id)  # duplicate offset
+                else:
+                    current_times[t.minutes_before_end] = t
+
+        seen = set()
+        for t in rc.times:
+            if t.minutes_before_end in seen:
+                continue
+            seen.add(t.minutes_before_end)
+            label = t.label or format_minutes_label(t.minutes_before_end)
+            current = current_times.pop(t.minutes_before_end, None)
+            if current is None:
+                time_id = str(uuid.uuid4())
+                new_times.append({"id": time_id, "reminder_config_id": config_id,
+                                  "minutes_before_end": t.minutes_before_end, "label": label, "enabled": True})
+                if rc.enabled:
+                    added.add(time_id)
+                continue
+            if current.label != label or not current.enabled:
+                time_updates.append({"b_id": current.id, "b_label": label})
+            if rc.enabled and not (was_enabled and current.enabled):
+                added.add(current.id)
+            elif not rc.enabled and was_enabled and current.enabled:
+                removed.add(current.id)
+
+        removed_time_ids.extend(t.id for t in current_times.values())
+
+    # Configs not in the request (their times go with them via ON DELETE CASCADE)
+    removed_config_ids = [c.id for c in existing.values()]
+    removed.update(t.id for c in existing.values() for t in c.times)
+    removed.update(removed_time_ids)
+
+    config_table, time_table = models.ReminderConfig.__table__, models.ReminderTime.__table__
+    if removed_config_ids:
+        await db.execute(delete(config_table).where(config_table.c.id.in_(removed_config_ids)))
+    if removed_time_ids:
+        await db.execute(delete(time_table).where(time_table.c.id.in_(removed_time_ids)))
+    if new_configs:
+        await db.execute(insert(config_table), new_configs)
+    if config_updates:
+        await db.execute(
+            update(config_table).where(config_table.c.id == bindparam("b_id")).values(enabled=bindparam("b_enabled")),
+            config_updates,
+        )
+    if new_times:
+        await db.execute(insert(time_table), new_times)
+    if time_updates:
+        await db.execute(
+            update(time_table).where(time_table.c.id == bindparam("b_id")).values(label=bindparam("b_label"), enabled=True),
+            time_updates,
+        )
+    return added, removed
 
 
 def format_minutes_label(minutes: int) -> str:
@@ -178,99 +397,108 @@ def format_minutes_label(minutes: int) -> str:
 # ============ USER MANAGEMENT ============
 
 @app.post("/api/v1/users/register", response_model=schemas.UserResponse, tags=["Users"])
-def register_user(user_data: schemas.UserRegister, db: Session = Depends(get_db)):
+async def register_user(user_data: schemas.UserRegister, db: AsyncSession = Depends(get_db)):
     """Register a new user with optional FCM token."""
     try:
         new_user = models.User(fcm_token=user_data.fcm_token)
         db.add(new_user)
-        db.flush()
+        await db.flush()
 
         # Create default reminder configs
         create_default_reminders(db, new_user.id)
 
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         logger.info(f"New user registered: {new_user.id}")
         return new_user
     except Exception as e:
         logger.error(f"Error registering user: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to register user")
 
 
 @app.put("/api/v1/users/{user_id}/fcm", tags=["Users"])
-def update_fcm_token(user_id: str, data: schemas.FcmTokenUpdate, db: Session = Depends(get_db)):
+async def update_fcm_token(user_id: str, data: schemas.FcmTokenUpdate, db: AsyncSession = Depends(get_db)):
     """Update FCM token for a user."""
-    user = get_user_or_404(db, user_id)
+    user = await get_user_or_404(db, user_id)
     user.fcm_token = data.fcm_token
-    db.commit()
+    await db.commit()
     return {"message": "FCM token updated"}
 
 
 # ============ ACCOUNT MANAGEMENT ============
 
+async def lookup_or_503(lookup, tag: str):
+    try:
+        return await lookup(tag)
+    except coc_api.LookupTimeout:
+        raise HTTPException(status_code=503, detail="Clash of Clans API is not responding, please try again")
+
+
 @app.post("/api/v1/users/{user_id}/accounts", response_model=schemas.PlayerAccountResponse, tags=["Accounts"])
-async def add_account(user_id: str, account: schemas.PlayerAccountCreate, db: Session = Depends(get_db)):
+async def add_account(user_id: str, account: schemas.PlayerAccountCreate, db: AsyncSession = Depends(get_db)):
     """Link a CoC player account to a user."""
-    user = await run_in_threadpool(lambda: get_user_or_404(db, user_id))
+    await get_user_or_404(db, user_id)
 
     # Check duplicate
-    existing = await run_in_threadpool(lambda: db.query(models.PlayerAccount).filter(
+    existing = await db.scalar(select(models.PlayerAccount).where(
         models.PlayerAccount.tag == account.tag,
         models.PlayerAccount.user_id == user_id,
-    ).first())
+    ))
     if existing:
         raise HTTPException(status_code=400, detail="Account already linked")
 
-    # Verify with CoC API
-    player_data = await coc_api.get_player(account.tag)
+    # Verify with CoC API (or the poller's recent fetch)
+    player_data = await lookup_or_503(coc_api.lookup_player, account.tag)
     if not player_data:
         raise HTTPException(status_code=404, detail="Player tag not found in Clash of Clans")
 
-    def create():
-        new_acc = models.PlayerAccount(
-            tag=player_data["tag"],
-            name=player_data.get("name"),
-            user_id=user_id,
-            current_clan_tag=player_data.get("clan", {}).get("tag"),
-            current_clan_name=player_data.get("clan", {}).get("name"),
-            last_synced_at=datetime.now(timezone.utc),
-        )
-        db.add(new_acc)
-        db.commit()
-        db.refresh(new_acc)
-        return new_acc
-
-    new_account = await run_in_threadpool(create)
+    new_account = models.PlayerAccount(
+        tag=player_data["tag"],
+        name=player_data.get("name"),
+        user_id=user_id,
+        current_clan_tag=player_data.get("clan", {}).get("tag"),
+        current_clan_name=player_data.get("clan", {}).get("name"),
+        last_synced_at=datetime.now(timezone.utc),
+    )
+    db.add(new_account)
+    await db.commit()
+    status_cache.invalidate(user_id)
+    targeted_poll.poll_account_soon(user_id, new_account.tag)
+    await db.refresh(new_account)
     logger.info(f"Account linked: {new_account.tag} to user {user_id}")
     return new_account
 
 
 @app.get("/api/v1/users/{user_id}/accounts", response_model=List[schemas.PlayerAccountResponse], tags=["Accounts"])
-def list_accounts(user_id: str, db: Session = Depends(get_db)):
+async def list_accounts(user_id: str, db: AsyncSession = Depends(get_db)):
     """List all accounts linked to a user."""
-    get_user_or_404(db, user_id)
-    return db.query(models.PlayerAccount).filter(models.PlayerAccount.user_id == user_id).all()
+    await get_user_or_404(db, user_id)
+    result = await db.execute(select(models.PlayerAccount).where(models.PlayerAccount.user_id == user_id))
+    return fast_json_response([serializers.account_payload(a) for a in result.scalars()])
 
 
 @app.delete("/api/v1/users/{user_id}/accounts/{tag}", tags=["Accounts"])
-def delete_account(user_id: str, tag: str, db: Session = Depends(get_db)):
+async def delete_account(user_id: str, tag: str, db: AsyncSession = Depends(get_db)):
     """Remove a linked player account."""
-    account = db.query(models.PlayerAccount).filter(
+    account = await db.scalar(select(models.PlayerAccount).where(
         models.PlayerAccount.tag == tag,
         models.PlayerAccount.user_id == user_id,
-    ).first()
+    ))
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
     # Also clean up related snapshots
-    db.query(models.EventSnapshot).filter(
+    await db.execute(delete(models.EventSnapshot).where(
         models.EventSnapshot.user_id == user_id,
         models.EventSnapshot.account_tag == tag,
-    ).delete()
+    ))
 
-    db.delete(account)
-    db.commit()
+    await db.delete(account)
+    rows = await status_view.refresh_user_status(db, (), removed=[user_id])
+    await db.commit()
+    status_cache.invalidate(user_id)
+    status_events.status_broker.publish({user_id: rows[user_id].version})
     logger.info(f"Account removed: {tag} from user {user_id}")
     return {"message": "Account removed"}
 
@@ -278,64 +506,66 @@ def delete_account(user_id: str, tag: str, db: Session = Depends(get_db)):
 # ============ CLAN MANAGEMENT ============
 
 @app.get("/api/v1/users/{user_id}/clans", response_model=List[schemas.TrackedClanResponse], tags=["Clans"])
-def list_clans(user_id: str, db: Session = Depends(get_db)):
+async def list_clans(user_id: str, db: AsyncSession = Depends(get_db)):
     """List all tracked clans for a user."""
-    get_user_or_404(db, user_id)
-    return db.query(models.TrackedClan).filter(models.TrackedClan.user_id == user_id).all()
+    await get_user_or_404(db, user_id)
+    result = await db.execute(select(models.TrackedClan).where(models.TrackedClan.user_id == user_id))
+    return fast_json_response([serializers.clan_payload(c) for c in result.scalars()])
 
 
 @app.post("/api/v1/users/{user_id}/clans", response_model=schemas.TrackedClanResponse, tags=["Clans"])
-async def add_clan(user_id: str, data: schemas.ClanCreate, db: Session = Depends(get_db)):
+async def add_clan(user_id: str, data: schemas.ClanCreate, db: AsyncSession = Depends(get_db)):
     """Add a clan to track for a user."""
-    await run_in_threadpool(lambda: get_user_or_404(db, user_id))
+    await get_user_or_404(db, user_id)
 
     # Check duplicate
-    existing = await run_in_threadpool(lambda: db.query(models.TrackedClan).filter(
+    existing = await db.scalar(select(models.TrackedClan).where(
         models.TrackedClan.clan_tag == data.clan_tag,
         models.TrackedClan.user_id == user_id,
-    ).first())
+    ))
     if existing:
         raise HTTPException(status_code=400, detail="Clan already tracked")
 
-    # Verify with CoC API
-    clan_data = await coc_api.get_clan_info(data.clan_tag)
+    # Verify with CoC API (or the poller's recent fetch)
+    clan_data = await lookup_or_503(coc_api.lookup_clan, data.clan_tag)
     if not clan_data:
         raise HTTPException(status_code=404, detail="Clan tag not found in Clash of Clans")
 
-    def create():
-        new_clan = models.TrackedClan(
-            clan_tag=clan_data["tag"],
-            clan_name=clan_data.get("name"),
-            user_id=user_id,
-        )
-        db.add(new_clan)
-        db.commit()
-        db.refresh(new_clan)
-        return new_clan
-
-    result = await run_in_threadpool(create)
+    result = models.TrackedClan(
+        clan_tag=clan_data["tag"],
+        clan_name=clan_data.get("name"),
+        user_id=user_id,
+    )
+    db.add(result)
+    await db.commit()
+    status_cache.invalidate(user_id)
+    targeted_poll.poll_clan_soon(user_id, result.clan_tag)
+    await db.refresh(result)
     logger.info(f"Clan tracked: {result.clan_tag} for user {user_id}")
     return result
 
 
 @app.delete("/api/v1/users/{user_id}/clans/{clan_tag}", tags=["Clans"])
-def delete_clan(user_id: str, clan_tag: str, db: Session = Depends(get_db)):
+async def delete_clan(user_id: str, clan_tag: str, db: AsyncSession = Depends(get_db)):
     """Remove a tracked clan."""
-    clan = db.query(models.TrackedClan).filter(
+    clan = await db.scalar(select(models.TrackedClan).where(
         models.TrackedClan.clan_tag == clan_tag,
         models.TrackedClan.user_id == user_id,
-    ).first()
+    ))
     if not clan:
         raise HTTPException(status_code=404, detail="Tracked clan not found")
 
     # Clean up related snapshots
-    db.query(models.EventSnapshot).filter(
+    await db.execute(delete(models.EventSnapshot).where(
         models.EventSnapshot.user_id == user_id,
         models.EventSnapshot.clan_tag == clan_tag,
-    ).delete()
+    ))
 
-    db.delete(clan)
-    db.commit()
+    await db.delete(clan)
+    rows = await status_view.refresh_user_status(db, (), removed=[user_id])
+    await db.commit()
+    status_cache.invalidate(user_id)
+    status_events.status_broker.publish({user_id: rows[user_id].version})
     logger.info(f"Clan untracked: {clan_tag} from user {user_id}")
     return {"message": "Clan removed"}
 
@@ -343,89 +573,71 @@ def delete_clan(user_id: str, clan_tag: str, db: Session = Depends(get_db)):
 # ============ REMINDER CONFIGURATION ============
 
 @app.get("/api/v1/users/{user_id}/reminders", response_model=schemas.RemindersResponse, tags=["Reminders"])
-def get_reminders(user_id: str, db: Session = Depends(get_db)):
+async def get_reminders(user_id: str, db: AsyncSession = Depends(get_db)):
     """Get all reminder configurations for a user."""
-    get_user_or_404(db, user_id)
-    configs = db.query(models.ReminderConfig).filter(
-        models.ReminderConfig.user_id == user_id
-    ).all()
-    return schemas.RemindersResponse(reminders=configs)
+    await get_user_or_404(db, user_id)
+    configs = await load_reminder_configs(db, user_id)
+    return fast_json_response({"reminders": [serializers.reminder_config_payload(c) for c in configs]})
 
 
 @app.put("/api/v1/users/{user_id}/reminders", response_model=schemas.RemindersResponse, tags=["Reminders"])
-def update_reminders(user_id: str, data: schemas.RemindersUpdateRequest, db: Session = Depends(get_db)):
-    """Replace all reminder configurations for a user (bulk update)."""
-    get_user_or_404(db, user_id)
+async def update_reminders(user_id: str, data: schemas.RemindersUpdateRequest, db: AsyncSession = Depends(get_db)):
+    """Replace all reminder configurations for a user (bulk update).
 
-    # Delete existing configs (cascade deletes times)
-    db.query(models.ReminderConfig).filter(
-        models.ReminderConfig.user_id == user_id
-    ).delete()
-    db.flush()
-
-    # Create new configs
-    for rc in data.reminders:
-        if rc.event_type not in ("cw", "cwl", "raid"):
-            raise HTTPException(status_code=400, detail=f"Invalid event_type: {rc.event_type}")
-
-        config = models.ReminderConfig(
-            user_id=user_id,
-            event_type=rc.event_type,
-            enabled=rc.enabled,
-        )
-        db.add(config)
-        db.flush()
+    Unchanged configs and times keep their ids, so already sent reminders don't fire again.
+    """
+    await get_user_or_404(db, user_id)
 
-        for t in rc.times:
-            time_entry = models.ReminderTime(
-                reminder_config_id=config.id,
-                minutes_before_end=t.minutes_before_end,
-                label=t.label or format_minutes_label(t.minutes_before_end),
-                enabled=True,
-            )
-            db.add(time_entry)
+    event_types = [rc.event_type for rc in data.reminders]
+    for event_type in event_types:
+        if event_type not in ("cw", "cwl", "raid"):
+            raise HTTPException(status_code=400, detail=f"Invalid event_type: {event_type}")
+    if len(set(event_types)) != len(event_types):
+        raise HTTPException(status_code=400, detail="Duplicate event_type")
 
-    db.commit()
+    added, removed = await reconcile_reminder_configs(db, user_id, data.reminders)
+    await db.commit()
+    status_cache.invalidate(user_id)
+    reminder_engine.triggers_changed(user_id, added, removed)
 
     # Return updated
-    configs = db.query(models.ReminderConfig).filter(
-        models.ReminderConfig.user_id == user_id
-    ).all()
-    return schemas.RemindersResponse(reminders=configs)
+    configs = await load_reminder_configs(db, user_id)
+    return fast_json_response({"reminders": [serializers.reminder_config_payload(c) for c in configs]})
 
 
 @app.patch("/api/v1/users/{user_id}/reminders/{event_type}", tags=["Reminders"])
-def toggle_reminder(user_id: str, event_type: str, data: schemas.ReminderToggle, db: Session = Depends(get_db)):
+async def toggle_reminder(user_id: str, event_type: str, data: schemas.ReminderToggle, db: AsyncSession = Depends(get_db)):
     """Enable/disable reminders for an event type."""
-    get_user_or_404(db, user_id)
-    config = db.query(models.ReminderConfig).filter(
+    await get_user_or_404(db, user_id)
+    config = await db.scalar(select(models.ReminderConfig).where(
         models.ReminderConfig.user_id == user_id,
         models.ReminderConfig.event_type == event_type,
-    ).first()
+    ))
     if not config:
         raise HTTPException(status_code=404, detail="Reminder config not found")
 
     config.enabled = data.enabled
-    db.commit()
+    await db.commit()
+    status_cache.invalidate(user_id)
     return {"message": f"Reminder for {event_type} {'enabled' if data.enabled else 'disabled'}"}
 
 
 @app.post("/api/v1/users/{user_id}/reminders/{event_type}/times", tags=["Reminders"])
-def add_reminder_time(
-    user_id: str, event_type: str, data: schemas.ReminderTimeCreate, db: Session = Depends(get_db)
+async def add_reminder_time(
+    user_id: str, event_type: str, data: schemas.ReminderTimeCreate, db: AsyncSession = Depends(get_db)
 ):
     """Add a single reminder time to an event type config."""
-    get_user_or_404(db, user_id)
-    config = db.query(models.ReminderConfig).filter(
+    await get_user_or_404(db, user_id)
+    config = await db.scalar(select(models.ReminderConfig).where(
         models.ReminderConfig.user_id == user_id,
         models.ReminderConfig.event_type == event_type,
-    ).first()
+    ))
 
     if not config:
         # Auto-create config
         config = models.ReminderConfig(user_id=user_id, event_type=event_type, enabled=True)
         db.add(config)
-        db.flush()
+        await db.flush()
 
     time_entry = models.ReminderTime(
         reminder_config_id=config.id,
@@ -434,138 +646,112 @@ def add_reminder_time(
         enabled=True,
     )
     db.add(time_entry)
-    db.commit()
-    db.refresh(time_entry)
+    await db.commit()
+    status_cache.invalidate(user_id)
+    await db.refresh(time_entry)
 
     return schemas.ReminderTimeResponse.model_validate(time_entry)
 
 
 @app.delete("/api/v1/users/{user_id}/reminders/{event_type}/times/{time_id}", tags=["Reminders"])
-def delete_reminder_time(user_id: str, event_type: str, time_id: str, db: Session = Depends(get_db)):
+async def delete_reminder_time(user_id: str, event_type: str, time_id: str, db: AsyncSession = Depends(get_db)):
     """Remove a single reminder time."""
-    get_user_or_404(db, user_id)
-    time_entry = db.query(models.ReminderTime).filter(models.ReminderTime.id == time_id).first()
+    await get_user_or_404(db, user_id)
+    time_entry = await db.get(models.ReminderTime, time_id)
     if not time_entry:
         raise HTTPException(status_code=404, detail="Reminder time not found")
 
-    db.delete(time_entry)
-    db.commit()
+    await db.delete(time_entry)
+    await db.commit()
+    status_cache.invalidate(user_id)
     return {"message": "Reminder time removed"}
 
 
 # ============ EVENT STATUS (MISSING HITS) ============
 
 @app.get("/api/v1/users/{user_id}/status", response_model=schemas.StatusResponse, tags=["Status"])
-def get_status(user_id: str, db: Session = Depends(get_db)):
-    """Get all active event snapshots for a user (MissingHits data)."""
-    get_user_or_404(db, user_id)
+async def get_status(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get all active event snapshots for a user (MissingHits data).
+
+    Send `Accept: application/msgpack` for the compact encoding (see serializers).
+    """
+    return await status_view_response(
+        request, db, user_id, "status", status_view.status_payload, status_view.status_compact
+    )
+
+
+@app.get("/api/v1/users/{user_id}/status/delta", response_model=schemas.StatusDeltaResponse, tags=["Status"])
+async def get_status_delta(user_id: str, since: int | None = None, db: AsyncSession = Depends(get_db)):
+    """Events inserted, updated or deactivated after version `since`.
+
+    Send the `version` of the previous response as `since`. Without a cursor, or when it is
+    older than the server can replay, the response is a full resync (`full: true`).
+    """
+    row = await get_user_status(db, user_id)
+    return await status_view.build_status_delta(db, row, since, datetime.now(timezone.utc))
 
-    snapshots = db.query(models.EventSnapshot).filter(
-        models.EventSnapshot.user_id == user_id,
-        models.EventSnapshot.is_active == True,
-    ).order_by(models.EventSnapshot.end_time.asc()).all()
-
-    now = datetime.now(timezone.utc)
-    events = []
-    last_polled = None
-
-    for snap in snapshots:
-        if snap.polled_at:
-            if last_polled is None or snap.polled_at > last_polled:
-                last_polled = snap.polled_at
-
-        remaining_secs = 0
-        remaining_formatted = ""
-        if snap.end_time:
-            remaining_secs = max(0, int((snap.end_time - now).total_seconds()))
-            remaining_formatted = format_duration(remaining_secs)
-
-        events.append(schemas.EventSnapshotResponse(
-            id=snap.id,
-            account_tag=snap.account_tag,
-            account_name=snap.account_name,
-            clan_tag=snap.clan_tag,
-            clan_name=snap.clan_name,
-            event_type=snap.event_type,
-            event_subtype=snap.event_subtype,
-            state=snap.state,
-            attacks_used=snap.attacks_used,
-            attacks_max=snap.attacks_max,
-            attacks_remaining=snap.attacks_remaining,
-            end_time=snap.end_time,
-            start_time=snap.start_time,
-            time_remaining_seconds=remaining_secs,
-            time_remaining_formatted=remaining_formatted,
-            opponent_name=snap.opponent_name,
-            opponent_tag=snap.opponent_tag,
-            war_size=snap.war_size,
-        ))
-
-    return schemas.StatusResponse(last_polled=last_polled, events=events)
+
+@app.get("/api/v1/users/{user_id}/status/stream", tags=["Status"])
+async def stream_status(user_id: str, request: Request, since: int | None = None):
+    """Server-sent events: a /status/delta payload whenever the user's status changes.
+
+    Each event id is the version cursor; reconnecting clients resume from it via the
+    Last-Event-ID header (or `since`). Comment lines are sent as heartbeats.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    # Short-lived session: the stream must not keep a connection checked out while idle
+    async with SessionLocal() as db:
+        await get_user_status(db, user_id)
+    broker = status_events.status_broker
+    try:
+        subscriber = broker.subscribe(user_id, -1)
+    except status_events.TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many open status streams")
+
+    return StreamingResponse(
+        status_events.status_stream(subscriber, since, broker),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Releases the slot even if the client is gone before the body starts
+        background=BackgroundTask(broker.unsubscribe, subscriber),
+    )
 
 
 @app.get("/api/v1/users/{user_id}/status/summary", response_model=schemas.StatusSummaryResponse, tags=["Status"])
-def get_status_summary(user_id: str, db: Session = Depends(get_db)):
-    """Get compact status summary for widget display."""
-    get_user_or_404(db, user_id)
+async def get_status_summary(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get compact status summary for widget display.
 
-    snapshots = db.query(models.EventSnapshot).filter(
-        models.EventSnapshot.user_id == user_id,
-        models.EventSnapshot.is_active == True,
-    ).order_by(models.EventSnapshot.end_time.asc()).all()
-
-    now = datetime.now(timezone.utc)
-    items = []
-    by_type = {}
-    total_missing = 0
-    last_polled = None
-
-    event_labels = {"cw": "Clan War", "cwl": "CWL", "raid": "Raid Weekend"}
-
-    for snap in snapshots:
-        if snap.polled_at:
-            if last_polled is None or snap.polled_at > last_polled:
-                last_polled = snap.polled_at
-
-        remaining = snap.attacks_remaining
-        if remaining <= 0:
-            continue
-
-        total_missing += remaining
-
-        et = snap.event_type
-        if et not in by_type:
-            by_type[et] = {"count": 0, "account_tags": set()}
-        by_type[et]["count"] += remaining
-        by_type[et]["account_tags"].add(snap.account_tag)
-
-        remaining_secs = 0
-        remaining_formatted = ""
-        if snap.end_time:
-            remaining_secs = max(0, int((snap.end_time - now).total_seconds()))
-            remaining_formatted = format_duration(remaining_secs)
-
-        label = event_labels.get(et, et)
-        if snap.event_subtype:
-            day = snap.event_subtype.replace("day_", "")
-            label = f"{label} Tag {day}"
-
-        items.append(schemas.StatusSummaryItem(
-            account_display=f"{snap.account_name or 'Unknown'} ({snap.account_tag})",
-            clan_display=f"{snap.clan_name or 'Unknown'} ({snap.clan_tag})",
-            event_label=label,
-            attacks_remaining=remaining,
-            end_time_formatted=remaining_formatted,
-            end_time_iso=snap.end_time.isoformat() if snap.end_time else None,
-        ))
-
-    by_event_type = {}
-    for et, data in by_type.items():
-        by_event_type[et] = schemas.EventTypeCount(count=data["count"], accounts=len(data["account_tags"]))
-
-    return schemas.StatusSummaryResponse(
-        last_polled=last_polled,
-        total_missing=total_missing,
-        by_event_type=by_event_type,
-        items=items,
+    Send `Accept: application/msgpack` for the compact encoding (see serializers).
+    """
+    return await status_view_response(
+        request, db, user_id, "summary", status_view.summary_payload, status_view.summary_compact
     )
+
+
+# ============ BOOTSTRAP ============
+
+@app.get("/api/v1/users/{user_id}/bootstrap", response_model=schemas.BootstrapResponse, tags=["Bootstrap"])
+async def get_bootstrap(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Accounts, clans, reminders and status in one response for app startup (supports If-None-Match)."""
+    cached = status_cache.get(user_id, "bootstrap")
+    if cached is None:
+        generation = status_cache.generation(user_id)
+        payload = await build_bootstrap_payload(db, user_id)
+        cached = status_cache.put(user_id, "bootstrap", serializers.dumps(payload), generation)
+    return conditional_response(request, cached)
+
+
+async def build_bootstrap_payload(db: AsyncSession, user_id: str) -> dict:
+    # The status row doubles as the user check (it is only created for existing users)
+    row = await get_user_status(db, user_id)
+    accounts = await db.execute(select(models.PlayerAccount).where(models.PlayerAccount.user_id == user_id))
+    clans = await db.execute(select(models.TrackedClan).where(models.TrackedClan.user_id == user_id))
+    return {
+        "accounts": [serializers.account_payload(a) for a in accounts.scalars()],
+        "clans": [serializers.clan_payload(c) for c in clans.scalars()],
+        "reminders": [serializers.reminder_config_payload(c) for c in await load_reminder_configs(db, user_id)],
+        "status": status_view.status_payload(row, datetime.now(timezone.utc)),
+    }
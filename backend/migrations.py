@@ -0,0 +1,114 @@
+"""
+Schema migrations — ordered, idempotent steps applied at startup after create_all().
+
+create_all() only creates missing tables, so anything added to an existing table
+(indexes, columns) has to be shipped as a step here. Each step runs once and is
+recorded in schema_migrations. Steps receive a sync Connection (via run_sync).
+"""
+import logging
+
+from sqlalchemy import Column, Integer, bindparam, inspect, select
+
+import models
+from services.notification_retention import bucket_for
+
+logger = logging.getLogger(__name__)
+
+
+def _create_index(conn, name: str, table: str, *columns: str):
+    conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+
+def _add_column(conn, table: str, column: Column) -> bool:
+    """ALTER TABLE ... ADD COLUMN unless it already exists (fresh DBs get it from create_all)."""
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return False
+    column_type = column.type.compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}")
+    return True
+
+
+# Steps spell out their columns and indexes instead of reading them from models: they
+# must keep building the schema as it was at their point in the series.
+
+def _0001_hot_lookup_indexes(conn):
+    """Secondary indexes for the status, reminder, cleanup and per-user lookups."""
+    _create_index(conn, "ix_player_accounts_user_id", "player_accounts", "user_id")
+    _create_index(conn, "ix_tracked_clans_user_id", "tracked_clans", "user_id")
+    _create_index(conn, "ix_event_snapshots_user_active_end", "event_snapshots", "user_id", "is_active", "end_time")
+    _create_index(conn, "ix_event_snapshots_active_state_end", "event_snapshots", "is_active", "state", "end_time")
+    _create_index(conn, "ix_event_snapshots_active_polled", "event_snapshots", "is_active", "polled_at")
+    _create_index(conn, "ix_reminder_times_reminder_config_id", "reminder_times", "reminder_config_id")
+
+
+def _0002_notification_log_buckets(conn):
+    """Time bucket column on notification_logs, backfilled from sent_at."""
+    table = models.NotificationLog.__table__
+    if _add_column(conn, "notification_logs", Column("bucket", Integer)):
+        rows = conn.execute(select(table.c.id, table.c.sent_at).where(table.c.sent_at.isnot(None))).all()
+        if rows:
+            conn.execute(
+                table.update().where(table.c.id == bindparam("row_id")).values(bucket=bindparam("row_bucket")),
+                [{"row_id": row.id, "row_bucket": bucket_for(row.sent_at)} for row in rows],
+            )
+    _create_index(conn, "ix_notification_logs_bucket_snapshot", "notification_logs", "bucket", "event_snapshot_id")
+
+
+def _0003_status_versions(conn):
+    """Version cursors for /status/delta on event_snapshots and user_status."""
+    if _add_column(conn, "event_snapshots", Column("version", Integer)):
+        conn.exec_driver_sql("UPDATE event_snapshots SET version = 0")
+    for name in ("version", "floor_version"):
+        if _add_column(conn, "user_status", Column(name, Integer)):
+            conn.exec_driver_sql(f"UPDATE user_status SET {name} = 0")
+    _create_index(conn, "ix_event_snapshots_user_version", "event_snapshots", "user_id", "version")
+
+
+def _0004_poll_priority_index(conn):
+    """Covering index for the poll cycle's next-deadline-per-clan lookup."""
+    _create_index(conn, "ix_event_snapshots_end_clan", "event_snapshots", "end_time", "clan_tag")
+
+
+def _0005_snapshot_upsert_key(conn):
+    """Unique (user, account, clan, event, subtype) index with NULL subtypes equal — the upsert's conflict target."""
+    # uq_event_snapshot never matched NULL subtypes, so cw/raid rows may be duplicated:
+    # keep the most recently polled one (notification logs of the others cascade)
+    conn.exec_driver_sql("""
+        DELETE FROM event_snapshots WHERE id IN (
+            SELECT s.id FROM event_snapshots s JOIN event_snapshots t
+              ON t.user_id = s.user_id AND t.account_tag = s.account_tag AND t.clan_tag = s.clan_tag
+             AND t.event_type = s.event_type
+             AND COALESCE(t.event_subtype, '') = COALESCE(s.event_subtype, '')
+             AND (t.polled_at > s.polled_at OR (t.polled_at = s.polled_at AND t.id > s.id))
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_event_snapshot_key ON event_snapshots "
+        "(user_id, account_tag, clan_tag, event_type, COALESCE(event_subtype, ''))"
+    )
+
+
+MIGRATIONS = [
+    ("0001_hot_lookup_indexes", _0001_hot_lookup_indexes),
+    ("0002_notification_log_buckets", _0002_notification_log_buckets),
+    ("0003_status_versions", _0003_status_versions),
+    ("0004_poll_priority_index", _0004_poll_priority_index),
+    ("0005_snapshot_upsert_key", _0005_snapshot_upsert_key),
+]
+
+
+async def run_migrations(engine):
+    """Apply all pending migrations, each in its own transaction."""
+    migrations_table = models.SchemaMigration.__table__
+
+    async with engine.begin() as conn:
+        await conn.run_sync(migrations_table.create, checkfirst=True)
+        applied = set((await conn.execute(select(migrations_table.c.version))).scalars())
+
+    for version, step in MIGRATIONS:
+        if version in applied:
+            continue
+        async with engine.begin() as conn:
+            await conn.run_sync(step)
+            await conn.execute(migrations_table.insert().values(version=version))
+        logger.info(f"Applied migration {version}")
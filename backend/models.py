@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Boolean, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, Boolean, UniqueConstraint, Index, JSON, func, literal_column
 from sqlalchemy.orm import relationship
 import uuid
 import datetime
@@ -34,6 +34,7 @@ class PlayerAccount(Base):
 
     __table_args__ = (
         UniqueConstraint("tag", "user_id", name="uq_player_account_tag_user"),
+        Index("ix_player_accounts_user_id", "user_id"),
     )
 
     user = relationship("User", back_populates="accounts")
@@ -49,7 +50,9 @@ class TrackedClan(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     __table_args__ = (
+        # Also serves lookups by clan_tag alone (leading column)
         UniqueConstraint("clan_tag", "user_id", name="uq_tracked_clan_tag_user"),
+        Index("ix_tracked_clans_user_id", "user_id"),
     )
 
     user = relationship("User", back_populates="tracked_clans")
@@ -84,20 +87,46 @@ class EventSnapshot(Base):
     # Meta
     is_active = Column(Boolean, default=True)
     polled_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # user_status.version of the last real change; NULL until the writer stamps it
+    version = Column(Integer, nullable=True)
 
     __table_args__ = (
         UniqueConstraint("user_id", "account_tag", "clan_tag", "event_type", "event_subtype",
                          name="uq_event_snapshot"),
+        # /status and /status/summary: active events of a user, ordered by end_time
+        Index("ix_event_snapshots_user_active_end", "user_id", "is_active", "end_time"),
+        # Reminder engine: active events in inWar/ongoing state with an end_time
+        Index("ix_event_snapshots_active_state_end", "is_active", "state", "end_time"),
+        # Cleanup: inactive events polled before the cutoff (equality column first)
+        Index("ix_event_snapshots_active_polled", "is_active", "polled_at"),
+        # /status/delta: a user's snapshots changed since a version cursor
+        Index("ix_event_snapshots_user_version", "user_id", "version"),
+        # Poll priority: next end_time per clan among running/upcoming events (covering)
+        Index("ix_event_snapshots_end_clan", "end_time", "clan_tag"),
     )
 
     user = relationship("User", back_populates="event_snapshots")
-    notification_logs = relationship("NotificationLog", back_populates="event_snapshot", cascade="all, delete-orphan")
+    # Logs are removed by ON DELETE CASCADE in the database, not loaded and deleted in Python
+    notification_logs = relationship("NotificationLog", back_populates="event_snapshot",
+                                     cascade="all, delete-orphan", passive_deletes=True)
 
     @property
     def attacks_remaining(self):
         return max(0, self.attacks_max - self.attacks_used)
 
 
+# Conflict target of data_poller.upsert_event_snapshot: like uq_event_snapshot, but a NULL
+# subtype (cw, raid) counts as one value instead of never conflicting
+EVENT_SNAPSHOT_KEY = [
+    EventSnapshot.__table__.c.user_id,
+    EventSnapshot.__table__.c.account_tag,
+    EventSnapshot.__table__.c.clan_tag,
+    EventSnapshot.__table__.c.event_type,
+    func.coalesce(EventSnapshot.__table__.c.event_subtype, literal_column("''")),
+]
+Index("uq_event_snapshot_key", *EVENT_SNAPSHOT_KEY, unique=True)
+
+
 class ReminderConfig(Base):
     __tablename__ = "reminder_configs"
 
@@ -125,6 +154,10 @@ class ReminderTime(Base):
     enabled = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_reminder_times_reminder_config_id", "reminder_config_id"),
+    )
+
     config = relationship("ReminderConfig", back_populates="times")
 
 
@@ -138,9 +171,73 @@ class NotificationLog(Base):
     sent_at = Column(DateTime, default=datetime.datetime.utcnow)
     status = Column(String, default="sent")  # 'sent', 'failed', 'skipped'
     fcm_message_id = Column(String, nullable=True)
+    # Start date (ordinal) of the day/week this row belongs to — see notification_retention
+    bucket = Column(Integer, nullable=True)
 
     __table_args__ = (
         UniqueConstraint("event_snapshot_id", "reminder_time_id", name="uq_notification_log_snapshot_time"),
+        Index("ix_notification_logs_bucket_snapshot", "bucket", "event_snapshot_id"),
     )
 
     event_snapshot = relationship("EventSnapshot", back_populates="notification_logs")
+
+
+class UserStatus(Base):
+    """Precomputed /status aggregate per user, rewritten by the poller's write stage."""
+    __tablename__ = "user_status"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    last_polled = Column(DateTime, nullable=True)
+    total_missing = Column(Integer, default=0)
+    by_event_type = Column(JSON, default=dict)   # {event_type: {"count": n, "accounts": n}}
+    next_deadline = Column(DateTime, nullable=True)
+    items = Column(JSON, default=list)           # active snapshots ordered by end_time
+    version = Column(Integer, default=0)         # bumped on every real snapshot change
+    floor_version = Column(Integer, default=0)   # oldest cursor /status/delta can serve (hard deletes)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class NotificationLogArchive(Base):
+    """Compacted notification_logs: one row per bucket, user and status."""
+    __tablename__ = "notification_log_archive"
+
+    bucket = Column(Integer, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    first_sent_at = Column(DateTime, nullable=True)
+    last_sent_at = Column(DateTime, nullable=True)
+
+
+class SchedulerLease(Base):
+    """Leader lease for background jobs (SQLite; PostgreSQL uses an advisory lock instead)."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class ApiBudget(Base):
+    """CoC API call budget shared by all processes (token bucket, see coc_api.SharedRateBudget)."""
+    __tablename__ = "api_budgets"
+
+    name = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)   # epoch seconds of the last refill
+
+
+class PollerMember(Base):
+    """Live poller process in sharded mode; clans are split across the live members."""
+    __tablename__ = "poller_members"
+
+    member_id = Column(String, primary_key=True)
+    heartbeat_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(String, primary_key=True)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
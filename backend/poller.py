@@ -0,0 +1,30 @@
+"""
+Dedicated poller process for sharded polling (POLL_SHARDED=true) — run one per core:
+
+    python poller.py
+
+The API's scheduler then only runs cleanup, retention and reminders; clans are split across
+the running pollers (see services/poll_sharding.py).
+"""
+import asyncio
+import logging
+
+from main import init_db
+from core.config import settings
+from services import poll_sharding
+
+logger = logging.getLogger("poller")
+
+
+async def main():
+    if not settings.COC_API_KEY:
+        logger.warning("COC_API_KEY is not set! CoC features will fail.")
+    await init_db()
+    await poll_sharding.run_poller()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Poller stopped.")
@@ -148,6 +148,13 @@ class StatusResponse(BaseModel):
     last_polled: Optional[datetime] = None
     events: List[EventSnapshotResponse] = []
 
+class StatusDeltaResponse(BaseModel):
+    version: int = 0
+    full: bool = False                       # True: `events` replaces the client's list
+    last_polled: Optional[datetime] = None
+    events: List[EventSnapshotResponse] = []  # inserted / updated active events
+    removed: List[str] = []                   # ids of events that are no longer active
+
 class StatusSummaryItem(BaseModel):
     account_display: str
     clan_display: str
@@ -165,3 +172,12 @@ class StatusSummaryResponse(BaseModel):
     total_missing: int = 0
     by_event_type: dict[str, EventTypeCount] = {}
     items: List[StatusSummaryItem] = []
+
+
+# ============ BOOTSTRAP ============
+
+class BootstrapResponse(BaseModel):
+    accounts: List[PlayerAccountResponse] = []
+    clans: List[TrackedClanResponse] = []
+    reminders: List[ReminderConfigResponse] = []
+    status: StatusResponse
@@ -0,0 +1,109 @@
+"""
+Fast response serialization — ORM rows straight to JSON bytes for the high-volume endpoints.
+
+The payload builders emit exactly what the matching response model in schemas.py would
+(same keys, order and value formats), without constructing and revalidating Pydantic
+objects. Bodies are encoded with orjson when it is installed, else with the stdlib encoder
+configured to produce identical bytes.
+
+Clients that send `Accept: application/msgpack` get the compact MessagePack form of the
+status endpoints instead (when msgpack is installed): Unix timestamps and the integer codes
+below in place of preformatted strings.
+"""
+import json
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional compact encoding
+    msgpack = None
+
+import models
+
+
+def dumps(payload) -> bytes:
+    """Compact UTF-8 JSON, byte-identical to Pydantic's model_dump_json() for these payloads."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_msgpack(payload) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ACCEPT = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+
+def accepts_msgpack(accept: str | None) -> bool:
+    """True if the Accept header asks for MessagePack and the encoder is available."""
+    if msgpack is None or not accept:
+        return False
+    return any(media.split(";")[0].strip() in _MSGPACK_ACCEPT for media in accept.split(","))
+
+
+# Compact format codes (clients map them back to labels)
+EVENT_TYPE_CODES = {"cw": 1, "cwl": 2, "raid": 3}
+STATE_CODES = {"preparation": 1, "inWar": 2, "ongoing": 3, "warEnded": 4, "ended": 5}
+
+
+def timestamp(value: datetime | str | None) -> int | None:
+    """Unix seconds; naive datetimes and ISO strings are UTC (as stored)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def isoformat(dt: datetime | None) -> str | None:
+    """Datetime as Pydantic serializes it (UTC offset written as 'Z')."""
+    if dt is None:
+        return None
+    value = dt.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+# ============ PAYLOADS (field order of the schemas.*Response models) ============
+
+def account_payload(account: models.PlayerAccount) -> dict:
+    return {
+        "id": account.id,
+        "tag": account.tag,
+        "name": account.name,
+        "current_clan_tag": account.current_clan_tag,
+        "current_clan_name": account.current_clan_name,
+        "user_id": account.user_id,
+        "last_synced_at": isoformat(account.last_synced_at),
+        "display_name": f"{account.name or 'Unknown'} ({account.tag or ''})",
+    }
+
+
+def clan_payload(clan: models.TrackedClan) -> dict:
+    return {
+        "id": clan.id,
+        "clan_tag": clan.clan_tag,
+        "clan_name": clan.clan_name,
+        "user_id": clan.user_id,
+        "created_at": isoformat(clan.created_at),
+    }
+
+
+def reminder_config_payload(config: models.ReminderConfig) -> dict:
+    return {
+        "id": config.id,
+        "event_type": config.event_type,
+        "enabled": config.enabled,
+        "times": [
+            {"id": t.id, "minutes_before_end": t.minutes_before_end, "label": t.label, "enabled": t.enabled}
+            for t in config.times
+        ],
+    }
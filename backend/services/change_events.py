@@ -0,0 +1,118 @@
+"""
+Change Events — typed diffs between a snapshot's previous and new state, on an in-process bus.
+
+The poller compares each upserted snapshot with what was stored (see
+data_poller.upsert_event_snapshot) and, once the write is committed, publishes one event per
+change: an attack was made, an event started or ended, a player joined the raid. Consumers
+(reminders, the status cache, the status streams) subscribe and work on just the snapshots
+that changed instead of rescanning everything.
+
+The bus is per process. Changes committed by other processes still reach consumers through
+their periodic paths (the reminder check, the cache TTL, status_events.sync_loop).
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ATTACK_MADE = "attack_made"
+EVENT_STARTED = "event_started"
+EVENT_ENDED = "event_ended"
+PLAYER_JOINED_RAID = "player_joined_raid"
+# Any other stored change (opponent, end time, names, ...)
+SNAPSHOT_UPDATED = "snapshot_updated"
+# Removed by the cleanup (inactive for 48h)
+SNAPSHOT_DELETED = "snapshot_deleted"
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeEvent:
+    kind: str
+    user_id: str
+    snapshot_id: str
+    # Status version the change was committed with
+    version: int
+    event_type: str | None = None
+    account_tag: str | None = None
+    clan_tag: str | None = None
+    attacks_used: int = 0
+    attacks_max: int = 0
+    end_time: datetime | None = None
+
+    @property
+    def attacks_remaining(self) -> int:
+        return max(0, self.attacks_max - self.attacks_used)
+
+    @classmethod
+    def for_snapshot(cls, kind: str, snapshot, version: int) -> "ChangeEvent":
+        """Event for a snapshot (ORM object or row with its columns) committed with `version`."""
+        return cls(
+            kind=kind,
+            user_id=snapshot.user_id,
+            snapshot_id=snapshot.id,
+            version=version,
+            event_type=snapshot.event_type,
+            account_tag=snapshot.account_tag,
+            clan_tag=snapshot.clan_tag,
+            attacks_used=snapshot.attacks_used,
+            attacks_max=snapshot.attacks_max,
+            end_time=snapshot.end_time,
+        )
+
+
+def diff_snapshot(previous: dict | None, values: dict, event_type: str) -> list[str]:
+    """Change kinds between a snapshot's stored values (None if new) and its new values."""
+    if previous is None:
+        kinds = [EVENT_STARTED]
+        if event_type == "raid" and values["attacks_used"] > 0:
+            kinds.append(PLAYER_JOINED_RAID)
+        return kinds
+
+    kinds = []
+    if not previous["is_active"] and values["is_active"]:
+        kinds.append(EVENT_STARTED)
+    if values["attacks_used"] > previous["attacks_used"]:
+        if event_type == "raid" and previous["attacks_used"] == 0:
+            kinds.append(PLAYER_JOINED_RAID)
+        kinds.append(ATTACK_MADE)
+    if previous["is_active"] and not values["is_active"]:
+        kinds.append(EVENT_ENDED)
+    return kinds or [SNAPSHOT_UPDATED]
+
+
+Handler = Callable[[list[ChangeEvent]], None]
+
+
+class ChangeBus:
+    """Synchronous fan-out of committed change events; handlers must not block (schedule tasks instead)."""
+
+    def __init__(self):
+        self._handlers: list[Handler] = []
+
+    def subscribe(self, handler: Handler):
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def unsubscribe(self, handler: Handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def publish(self, events: Iterable[ChangeEvent]):
+        events = list(events)
+        if not events:
+            return
+        for event in events:
+            metrics.incr(f"change_events.{event.kind}")
+        for handler in list(self._handlers):
+            try:
+                handler(events)
+            except Exception as e:
+                logger.error(f"Change event handler {getattr(handler, '__qualname__', handler)} failed: {e}")
+
+
+# Singleton bus
+change_bus = ChangeBus()
@@ -1,8 +1,18 @@
 import httpx
+from sqlalchemy import select, update
+import database
+import models
 from core.config import settings
+from core.metrics import metrics
+from services import coc_decode
 import urllib.parse
 import logging
 import asyncio
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +25,16 @@ class CoCClient:
             "Accept": "application/json"
         }
 
-    async def _get(self, endpoint: str, retries: int = 3):
+    async def _get(self, endpoint: str, family: str, retries: int = 3):
         for attempt in range(retries):
+            budget = _call_budget.get()
+            if budget is not None and not budget.try_acquire():
+                raise OverBudget(endpoint)
             async with httpx.AsyncClient(timeout=15.0) as client:
                 try:
                     response = await client.get(f"{self.base_url}{endpoint}", headers=self.headers)
                     if response.status_code == 200:
-                        return response.json()
+                        return coc_decode.decode(family, response.content)
                     elif response.status_code == 404:
                         return None
                     elif response.status_code == 429:
@@ -51,32 +64,32 @@ class CoCClient:
     async def get_player(self, tag: str):
         """GET /players/{tag}"""
         safe_tag = urllib.parse.quote(tag)
-        return await self._get(f"/players/{safe_tag}")
+        return await self._get(f"/players/{safe_tag}", "player")
 
     async def get_clan_info(self, clan_tag: str):
         """GET /clans/{tag} — Basic clan info"""
         safe_tag = urllib.parse.quote(clan_tag)
-        return await self._get(f"/clans/{safe_tag}")
+        return await self._get(f"/clans/{safe_tag}", "clan")
 
     async def get_current_war(self, clan_tag: str):
         """GET /clans/{tag}/currentwar"""
         safe_tag = urllib.parse.quote(clan_tag)
-        return await self._get(f"/clans/{safe_tag}/currentwar")
+        return await self._get(f"/clans/{safe_tag}/currentwar", "war")
 
     async def get_cwl_group(self, clan_tag: str):
         """GET /clans/{tag}/currentwar/leaguegroup"""
         safe_tag = urllib.parse.quote(clan_tag)
-        return await self._get(f"/clans/{safe_tag}/currentwar/leaguegroup")
+        return await self._get(f"/clans/{safe_tag}/currentwar/leaguegroup", "cwl_group")
 
     async def get_cwl_war(self, war_tag: str):
         """GET /clanwarleagues/wars/{warTag}"""
         safe_tag = urllib.parse.quote(war_tag)
-        return await self._get(f"/clanwarleagues/wars/{safe_tag}")
+        return await self._get(f"/clanwarleagues/wars/{safe_tag}", "war")
 
     async def get_raid_seasons(self, clan_tag: str):
         """GET /clans/{tag}/capitalraidseasons?limit=1"""
         safe_tag = urllib.parse.quote(clan_tag)
-        return await self._get(f"/clans/{safe_tag}/capitalraidseasons?limit=1")
+        return await self._get(f"/clans/{safe_tag}/capitalraidseasons?limit=1", "raid_seasons")
 
 
 # Singleton client
@@ -88,12 +101,157 @@ def get_coc_client() -> CoCClient:
         _coc_client = CoCClient(settings.COC_API_KEY)
     return _coc_client
 
+class EntityCache:
+    """Recently fetched players and clans, shared by the poller and the API endpoints.
+
+    Every successful get_player()/get_clan_info() stores its result here, so a lookup
+    right after (or between) poll cycles doesn't have to go back to the CoC API.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def _key(kind: str, tag: str) -> tuple[str, str]:
+        return kind, tag.strip().upper()
+
+    def get(self, kind: str, tag: str) -> dict | None:
+        key = self._key(kind, tag)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                metrics.incr(f"coc_cache.{kind}.miss")
+                return None
+            self._entries.move_to_end(key)
+            metrics.incr(f"coc_cache.{kind}.hit")
+            return entry[1]
+
+    def put(self, kind: str, tag: str, data: dict):
+        key = self._key(kind, tag)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+entity_cache = EntityCache(
+    max_entries=settings.COC_ENTITY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.COC_ENTITY_CACHE_TTL_SECONDS,
+)
+
+
+class OverBudget(Exception):
+    """The budget this call is charged to (see charged_to()) has no calls left."""
+
+
+class SharedRateBudget:
+    """Token bucket for CoC API calls made outside the poll cycle, shared by every process using
+    the key: `per_minute` calls in total, in bursts of up to that many.
+
+    The bucket is a row in api_budgets. A process draws a batch of tokens with reserve() — one
+    short read and one compare-and-set UPDATE — and spends them locally with try_acquire(), so
+    API workers and pollers can't each spend the full budget and a request costs no database
+    round-trip. Tokens left over from a batch are kept for the next one.
+    """
+
+    def __init__(self, name: str, per_minute: int, engine=None):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.engine = engine
+        self._reserved = 0.0
+
+    async def reserve(self, calls: int) -> int:
+        """Make sure up to `calls` requests are reserved (fewer if the bucket runs dry); returns
+        how many the reserve covers now."""
+        needed = calls - self._reserved
+        if needed > 0 and self.capacity > 0:
+            self._reserved += await self._draw(needed)
+        return int(self._reserved)
+
+    def try_acquire(self) -> bool:
+        """Spend one reserved request."""
+        if self._reserved < 1:
+            return False
+        self._reserved -= 1
+        return True
+
+    async def _draw(self, tokens: float, attempts: int = 3) -> float:
+        table = models.ApiBudget.__table__
+        async with (self.engine or database.engine).connect() as conn:
+            for _ in range(attempts):
+                row = (await conn.execute(
+                    select(table.c.tokens, table.c.updated_at).where(table.c.name == self.name)
+                )).first()
+                await conn.commit()
+                now = time.time()
+                if row is None:
+                    # First draw under this name: start from a full bucket
+                    granted = min(tokens, self.capacity)
+                    stmt = (
+                        database.upsert_insert(conn)(table)
+                        .values(name=self.name, tokens=self.capacity - granted, updated_at=now)
+                        .on_conflict_do_nothing(index_elements=[table.c.name])
+                    )
+                else:
+                    available = min(self.capacity, row.tokens + max(0.0, now - row.updated_at) * self.rate)
+                    granted = min(tokens, available)
+                    # Applies only if no other process drew since the read; otherwise read again
+                    stmt = update(table).where(
+                        table.c.name == self.name,
+                        table.c.tokens == row.tokens,
+                        table.c.updated_at == row.updated_at,
+                    ).values(tokens=available - granted, updated_at=now)
+                result = await conn.execute(stmt)
+                await conn.commit()
+                if result.rowcount:
+                    return granted
+        metrics.incr(f"coc_budget.{self.name}.contended")
+        return 0.0
+
+
+# Pre-send freshness fetches of the reminder engine
+freshness_budget = SharedRateBudget("reminder_freshness", settings.REMINDER_FRESHNESS_CALLS_PER_MINUTE)
+
+# Budget the CoC calls of the current task are charged to (None: not budgeted, e.g. the poll cycle)
+_call_budget: ContextVar[SharedRateBudget | None] = ContextVar("coc_call_budget", default=None)
+
+
+@contextmanager
+def charged_to(budget: SharedRateBudget):
+    """Charge every HTTP request made inside the block (retries included) to `budget`'s
+    reserve; raises OverBudget at the first request it can't pay for."""
+    token = _call_budget.set(budget)
+    try:
+        yield
+    finally:
+        _call_budget.reset(token)
+
+
+class LookupTimeout(Exception):
+    """The CoC API did not answer within COC_LOOKUP_TIMEOUT_SECONDS."""
+
+
 # Function wrappers for convenience
 async def get_player(tag: str):
-    return await get_coc_client().get_player(tag)
+    data = await get_coc_client().get_player(tag)
+    if data:
+        entity_cache.put("player", tag, data)
+    return data
 
 async def get_clan_info(clan_tag: str):
-    return await get_coc_client().get_clan_info(clan_tag)
+    data = await get_coc_client().get_clan_info(clan_tag)
+    if data:
+        entity_cache.put("clan", clan_tag, data)
+    return data
 
 async def get_current_war(clan_tag: str):
     return await get_coc_client().get_current_war(clan_tag)
@@ -106,3 +264,26 @@ async def get_cwl_war(war_tag: str):
 
 async def get_raid_seasons(clan_tag: str):
     return await get_coc_client().get_raid_seasons(clan_tag)
+
+
+async def _lookup(kind: str, tag: str, fetch):
+    """Cached entity, else a live fetch capped at COC_LOOKUP_TIMEOUT_SECONDS (retries included)."""
+    cached = entity_cache.get(kind, tag)
+    if cached is not None:
+        return cached
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(fetch(tag), settings.COC_LOOKUP_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        metrics.incr(f"coc_lookup.{kind}.timeout")
+        raise LookupTimeout(tag)
+    finally:
+        metrics.observe(f"coc_lookup.{kind}", time.perf_counter() - start)
+
+async def lookup_player(tag: str):
+    """Player for request handlers: served from the entity cache when fresh. Raises LookupTimeout."""
+    return await _lookup("player", tag, get_player)
+
+async def lookup_clan(clan_tag: str):
+    """Clan for request handlers: served from the entity cache when fresh. Raises LookupTimeout."""
+    return await _lookup("clan", clan_tag, get_clan_info)
@@ -0,0 +1,128 @@
+"""
+CoC Decode — decodes CoC API responses, projected to the fields this app reads.
+
+With msgspec installed (and COC_FAST_DECODE on), each endpoint family is decoded against a
+TypedDict schema below: unknown fields (attack details, stars, destruction, map positions,
+badges, ...) are skipped by the parser instead of being built into Python objects, and the
+result is still plain dicts, so callers don't change. A response that doesn't fit its
+schema (e.g. an unexpected null) is decoded in full instead. Without msgspec, orjson (or
+the stdlib) decodes the whole body.
+"""
+import json
+from typing import TypedDict
+
+try:
+    import msgspec
+except ImportError:  # optional speedup
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+from core.config import settings
+from core.metrics import metrics
+
+
+# ============ PROJECTIONS ============
+# total=False: fields missing from a response are simply absent, as with a full decode.
+
+class _Attack(TypedDict, total=False):
+    """Only counted (len(member["attacks"])), so no fields are kept."""
+
+
+class _WarMember(TypedDict, total=False):
+    tag: str
+    name: str
+    attacks: list[_Attack]
+
+
+class _WarClan(TypedDict, total=False):
+    tag: str
+    name: str
+    members: list[_WarMember]
+
+
+class War(TypedDict, total=False):
+    state: str
+    attacksPerMember: int
+    teamSize: int
+    startTime: str
+    endTime: str
+    clan: _WarClan
+    opponent: _WarClan
+
+
+class _Round(TypedDict, total=False):
+    warTags: list[str]
+
+
+class CwlGroup(TypedDict, total=False):
+    state: str
+    rounds: list[_Round]
+
+
+class _RaidMember(TypedDict, total=False):
+    tag: str
+    name: str
+    attacks: int
+    attackLimit: int
+    bonusAttackLimit: int
+
+
+class _RaidSeason(TypedDict, total=False):
+    state: str
+    startTime: str
+    endTime: str
+    members: list[_RaidMember]
+
+
+class RaidSeasons(TypedDict, total=False):
+    items: list[_RaidSeason]
+
+
+class _ClanMember(TypedDict, total=False):
+    tag: str
+    name: str
+
+
+class Clan(TypedDict, total=False):
+    tag: str
+    name: str
+    memberList: list[_ClanMember]
+
+
+class _PlayerClan(TypedDict, total=False):
+    tag: str
+    name: str
+
+
+class Player(TypedDict, total=False):
+    tag: str
+    name: str
+    clan: _PlayerClan
+
+
+SCHEMAS = {"war": War, "cwl_group": CwlGroup, "raid_seasons": RaidSeasons, "clan": Clan, "player": Player}
+
+_decoders = {family: msgspec.json.Decoder(schema) for family, schema in SCHEMAS.items()} if msgspec else {}
+
+
+def loads(body: bytes):
+    """Full decode."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decode(family: str, body: bytes):
+    """Decode a response of an endpoint family ("war", "cwl_group", "raid_seasons", "clan", "player")."""
+    decoder = _decoders.get(family) if settings.COC_FAST_DECODE else None
+    if decoder is None:
+        return loads(body)
+    try:
+        return decoder.decode(body)
+    except msgspec.ValidationError:
+        metrics.incr(f"coc_decode.{family}.fallback")
+        return loads(body)
@@ -3,9 +3,15 @@ DataPoller Service — Polls CoC API every 60 seconds and updates event_snapshot
 """
 import logging
 import asyncio
+import time
+import uuid
 from datetime import datetime, timezone, timedelta
-from sqlalchemy.orm import Session
-from services import coc_api
+from sqlalchemy import case, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from services import coc_api, poll_sharding, status_view, change_events
+from core.config import settings
+from core.metrics import metrics
+from database import upsert_insert
 import models
 
 logger = logging.getLogger(__name__)
@@ -16,6 +22,16 @@ def parse_coc_timestamp(ts: str) -> datetime:
     """Parse CoC API timestamp format '20260209T143000.000Z' -> datetime (UTC)"""
     if not ts:
         return None
+    # Fast path: fixed-width fields sliced out directly, no strptime format parsing
+    if (len(ts) == 20 and ts[8] == "T" and ts[15] == "." and ts[19] == "Z"
+            and ts[:8].isdigit() and ts[9:15].isdigit() and ts[16:19].isdigit()):
+        try:
+            return datetime(
+                int(ts[0:4]), int(ts[4:6]), int(ts[6:8]), int(ts[9:11]), int(ts[11:13]), int(ts[13:15]),
+                int(ts[16:19]) * 1000, tzinfo=timezone.utc,
+            )
+        except ValueError:
+            pass
     try:
         return datetime.strptime(ts, "%Y%m%dT%H%M%S.%fZ").replace(tzinfo=timezone.utc)
     except ValueError:
@@ -28,9 +44,11 @@ def parse_coc_timestamp(ts: str) -> datetime:
 
 # ============ HELPERS ============
 
-def find_player_in_members(members: list, account_tag: str) -> dict | None:
-    """Find a player in a war/raid member list by tag."""
-    return next((m for m in members if m.get("tag") == account_tag), None)
+def as_utc(dt: datetime | None) -> datetime | None:
+    """SQLite returns naive datetimes — treat them as UTC so they compare with aware ones."""
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
 
 
 def format_duration(seconds: int) -> str:
@@ -50,17 +68,114 @@ def format_duration(seconds: int) -> str:
     return " ".join(parts)
 
 
+# ============ EVENT RECORDS ============
+# The fetch stage converts each API response right away into these records, keeping only
+# what the process_account_* passes read: the tag, name and attacks used of each member on
+# our side, as parallel tuples/bytes. Opponent members, attack details and everything else
+# are dropped with the response.
+
+class WarRecord:
+    """A clan war or CWL war from the fetched clan's side."""
+    __slots__ = ("state", "attacks_per_member", "team_size", "end_time", "start_time",
+                 "opponent_name", "opponent_tag", "round_index", "tags", "names", "attacks")
+
+    def __init__(self, state, attacks_per_member, team_size, end_time, start_time,
+                 opponent_name, opponent_tag, round_index, tags, names, attacks):
+        self.state = state
+        self.attacks_per_member = attacks_per_member
+        self.team_size = team_size
+        self.end_time = end_time
+        self.start_time = start_time
+        self.opponent_name = opponent_name
+        self.opponent_tag = opponent_tag
+        self.round_index = round_index
+        self.tags: tuple[str, ...] = tags
+        self.names: tuple[str | None, ...] = names
+        self.attacks: bytes = attacks
+
+    @classmethod
+    def from_api(cls, war: dict, clan_tag: str, round_index: int = 0) -> "WarRecord":
+        our_side = "clan" if war.get("clan", {}).get("tag") == clan_tag else "opponent"
+        other = war.get("opponent" if our_side == "clan" else "clan", {})
+        members = [m for m in war.get(our_side, {}).get("members", ()) if "tag" in m]
+        return cls(
+            state=war.get("state"),
+            attacks_per_member=war.get("attacksPerMember", 2),
+            team_size=war.get("teamSize"),
+            end_time=parse_coc_timestamp(war.get("endTime")),
+            start_time=parse_coc_timestamp(war.get("startTime")),
+            opponent_name=other.get("name"),
+            opponent_tag=other.get("tag"),
+            round_index=round_index,
+            tags=tuple(m["tag"] for m in members),
+            names=tuple(m.get("name") for m in members),
+            attacks=bytes(min(255, len(m.get("attacks", ()))) for m in members),
+        )
+
+    def player(self, tag: str) -> tuple[str | None, int] | None:
+        """(name, attacks used) of a member, None if not in the war."""
+        try:
+            i = self.tags.index(tag)
+        except ValueError:
+            return None
+        return self.names[i], self.attacks[i]
+
+
+class RaidRecord:
+    """A capital raid season."""
+    __slots__ = ("state", "end_time", "start_time", "tags", "names", "attacks", "limits")
+
+    def __init__(self, state, end_time, start_time, tags, names, attacks, limits):
+        self.state = state
+        self.end_time = end_time
+        self.start_time = start_time
+        self.tags: tuple[str, ...] = tags
+        self.names: tuple[str | None, ...] = names
+        self.attacks: bytes = attacks
+        # Attack limit including the bonus attack
+        self.limits: bytes = limits
+
+    @classmethod
+    def from_api(cls, raid: dict) -> "RaidRecord":
+        members = [m for m in raid.get("members", ()) if "tag" in m]
+        return cls(
+            state=raid.get("state"),
+            end_time=parse_coc_timestamp(raid.get("endTime")),
+            start_time=parse_coc_timestamp(raid.get("startTime")),
+            tags=tuple(m["tag"] for m in members),
+            names=tuple(m.get("name") for m in members),
+            attacks=bytes(min(255, m.get("attacks", 0)) for m in members),
+            limits=bytes(min(255, m.get("attackLimit", 5) + m.get("bonusAttackLimit", 1)) for m in members),
+        )
+
+    def player(self, tag: str) -> tuple[str | None, int, int] | None:
+        """(name, attacks used, attack limit) of a raid member, None if they haven't attacked."""
+        try:
+            i = self.tags.index(tag)
+        except ValueError:
+            return None
+        return self.names[i], self.attacks[i], self.limits[i]
+
+
+class ClanEvents:
+    """Everything one clan fetch produced."""
+    __slots__ = ("cw", "cwl", "raid", "clan_name", "member_tags")
+
+    def __init__(self, cw: WarRecord | None = None, cwl=(), raid: RaidRecord | None = None,
+                 clan_name: str | None = None, member_tags=()):
+        self.cw = cw
+        self.cwl: list[WarRecord] = list(cwl)
+        self.raid = raid
+        self.clan_name = clan_name
+        # Clan member tags for raid not-participating detection
+        self.member_tags = frozenset(member_tags)
+
+
 # ============ CLAN DATA FETCHING ============
 
-async def fetch_clan_events(clan_tag: str) -> dict:
+async def fetch_clan_events(clan_tag: str) -> ClanEvents:
     """Fetch all event data (CW, CWL, Raid) for a single clan."""
-    result = {
-        "cw": None,
-        "cwl": [],
-        "raid": None,
-        "clan_name": None,
-        "member_tags": set(),  # Clan member tags for raid not-participating detection
-    }
+    result = ClanEvents()
 
     # 1. Clan War (Normal)
     try:
@@ -70,8 +185,8 @@ async def fetch_clan_events(clan_tag: str) -> dict:
             attacks_per = cw_data.get("attacksPerMember", 2)
             if attacks_per >= 2:
                 # Normal CW
-                result["cw"] = cw_data
-                result["clan_name"] = cw_data.get("clan", {}).get("name")
+                result.cw = WarRecord.from_api(cw_data, clan_tag)
+                result.clan_name = cw_data.get("clan", {}).get("name")
             # If attacksPerMember == 1, this is CWL battle day — handle in CWL section
     except Exception as e:
         logger.error(f"Error fetching CW for {clan_tag}: {e}")
@@ -91,13 +206,12 @@ async def fetch_clan_events(clan_tag: str) -> dict:
                             clan_side = war.get("clan", {}).get("tag")
                             opp_side = war.get("opponent", {}).get("tag")
                             if clan_side == clan_tag or opp_side == clan_tag:
-                                war["_round_index"] = round_idx + 1
-                                result["cwl"].append(war)
-                                if not result["clan_name"]:
+                                result.cwl.append(WarRecord.from_api(war, clan_tag, round_idx + 1))
+                                if not result.clan_name:
                                     if clan_side == clan_tag:
-                                        result["clan_name"] = war.get("clan", {}).get("name")
+                                        result.clan_name = war.get("clan", {}).get("name")
                                     else:
-                                        result["clan_name"] = war.get("opponent", {}).get("name")
+                                        result.clan_name = war.get("opponent", {}).get("name")
                     except Exception as e:
                         logger.error(f"Error fetching CWL war {war_tag}: {e}")
     except Exception as e:
@@ -109,44 +223,87 @@ async def fetch_clan_events(clan_tag: str) -> dict:
         if raid_data and raid_data.get("items"):
             current_raid = raid_data["items"][0]
             if current_raid.get("state") == "ongoing":
-                result["raid"] = current_raid
-                if not result["clan_name"]:
+                result.raid = RaidRecord.from_api(current_raid)
+                if not result.clan_name:
                     # Try to get clan name and member list from clan info
                     clan_info = await coc_api.get_clan_info(clan_tag)
                     if clan_info:
-                        result["clan_name"] = clan_info.get("name")
-                        result["member_tags"] = {m["tag"] for m in clan_info.get("memberList", [])}
+                        result.clan_name = clan_info.get("name")
+                        result.member_tags = frozenset(m["tag"] for m in clan_info.get("memberList", []))
     except Exception as e:
         logger.error(f"Error fetching raid for {clan_tag}: {e}")
 
     # If we still don't have a clan name, fetch it
-    if not result["clan_name"]:
+    if not result.clan_name:
         try:
             clan_info = await coc_api.get_clan_info(clan_tag)
             if clan_info:
-                result["clan_name"] = clan_info.get("name")
-                result["member_tags"] = {m["tag"] for m in clan_info.get("memberList", [])}
+                result.clan_name = clan_info.get("name")
+                result.member_tags = frozenset(m["tag"] for m in clan_info.get("memberList", []))
         except Exception:
             pass
     
     # Ensure we have member tags for raid not-participating detection
-    if not result["member_tags"]:
+    if not result.member_tags:
         try:
             clan_info = await coc_api.get_clan_info(clan_tag)
             if clan_info:
-                result["member_tags"] = {m["tag"] for m in clan_info.get("memberList", [])}
-                if not result["clan_name"]:
-                    result["clan_name"] = clan_info.get("name")
+                result.member_tags = frozenset(m["tag"] for m in clan_info.get("memberList", []))
+                if not result.clan_name:
+                    result.clan_name = clan_info.get("name")
         except Exception:
             pass
 
     return result
 
 
+# ============ SHARED CLAN FETCHES ============
+# The poll cycle and targeted polls (services.targeted_poll) fetch clans through
+# fetch_clan_events_shared(): concurrent requests for a clan share one fetch, and a
+# targeted poll reuses a result the cycle got within the last `max_age` seconds.
+
+_clan_fetches: dict[str, tuple[float, asyncio.Future]] = {}
+
+# Serializes this process's snapshot write transactions (poll chunks, targeted polls,
+# cleanup), which keeps SQLite writers from queueing on the database lock. It does not
+# reach other processes: concurrent writers of the same rows are handled by the upsert
+# below and the user_status row lock in status_view.refresh_user_status.
+write_lock = asyncio.Lock()
+
+
+async def fetch_clan_events_shared(clan_tag: str, max_age: float = 0) -> ClanEvents:
+    entry = _clan_fetches.get(clan_tag)
+    if entry is not None:
+        started, future = entry
+        if not future.done() or (time.monotonic() - started <= max_age and not future.exception()):
+            return await asyncio.shield(future)
+
+    future = asyncio.ensure_future(fetch_clan_events(clan_tag))
+    _clan_fetches[clan_tag] = (time.monotonic(), future)
+    return await asyncio.shield(future)
+
+
+def prune_clan_fetches(max_age: float):
+    cutoff = time.monotonic() - max_age
+    for clan_tag, (started, future) in list(_clan_fetches.items()):
+        if future.done() and started < cutoff:
+            del _clan_fetches[clan_tag]
+
+
 # ============ UPSERT LOGIC ============
+# Snapshots are written with INSERT ... ON CONFLICT DO UPDATE on the uq_event_snapshot_key
+# index, so two processes writing the same (user, account, clan, event) row concurrently
+# (shard pollers, the leader's cycle, targeted polls in API workers) update it instead of
+# failing with an IntegrityError or inserting a duplicate.
+
+_SNAPSHOT_FIELDS = (
+    "account_name", "clan_name", "state", "attacks_used", "attacks_max", "end_time", "start_time",
+    "opponent_name", "opponent_tag", "war_size", "is_active",
+)
+
 
-def upsert_event_snapshot(
-    db: Session,
+async def upsert_event_snapshot(
+    db: AsyncSession,
     user_id: str,
     account_tag: str,
     account_name: str,
@@ -165,134 +322,161 @@ def upsert_event_snapshot(
     is_active: bool,
 ):
     """Insert or update an event snapshot."""
-    # Find existing
-    query = db.query(models.EventSnapshot).filter(
-        models.EventSnapshot.user_id == user_id,
-        models.EventSnapshot.account_tag == account_tag,
-        models.EventSnapshot.clan_tag == clan_tag,
-        models.EventSnapshot.event_type == event_type,
+    snap = models.EventSnapshot.__table__
+    # Previous state, for the change events only; the write below doesn't depend on it
+    state = db.info.setdefault("snapshot_state", {})
+    if user_id not in db.info.setdefault("snapshot_state_users", set()):
+        await load_snapshot_state(db, [user_id])
+    key = (user_id, account_tag, clan_tag, event_type, event_subtype or "")
+    previous = state.get(key)
+
+    values = dict(
+        account_name=account_name,
+        clan_name=clan_name,
+        state=state,
+        attacks_used=attacks_used,
+        attacks_max=attacks_max,
+        end_time=end_time,
+        start_time=start_time,
+        opponent_name=opponent_name,
+        opponent_tag=opponent_tag,
+        war_size=war_size,
+        is_active=is_active,
     )
-    if event_subtype:
-        query = query.filter(models.EventSnapshot.event_subtype == event_subtype)
-    else:
-        query = query.filter(models.EventSnapshot.event_subtype.is_(None))
-
-    existing = query.first()
-
-    now = datetime.now(timezone.utc)
-
-    if existing:
-        existing.account_name = account_name
-        existing.clan_name = clan_name
-        existing.state = state
-        existing.attacks_used = attacks_used
-        existing.attacks_max = attacks_max
-        existing.end_time = end_time
-        existing.start_time = start_time
-        existing.opponent_name = opponent_name
-        existing.opponent_tag = opponent_tag
-        existing.war_size = war_size
-        existing.is_active = is_active
-        existing.polled_at = now
-    else:
-        snapshot = models.EventSnapshot(
-            user_id=user_id,
-            account_tag=account_tag,
-            account_name=account_name,
-            clan_tag=clan_tag,
-            clan_name=clan_name,
-            event_type=event_type,
-            event_subtype=event_subtype,
-            state=state,
-            attacks_used=attacks_used,
-            attacks_max=attacks_max,
-            end_time=end_time,
-            start_time=start_time,
-            opponent_name=opponent_name,
-            opponent_tag=opponent_tag,
-            war_size=war_size,
-            is_active=is_active,
-            polled_at=now,
-        )
-        db.add(snapshot)
+    stmt = upsert_insert(db)(snap).values(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        account_tag=account_tag,
+        clan_tag=clan_tag,
+        event_type=event_type,
+        event_subtype=event_subtype,
+        polled_at=datetime.now(timezone.utc),
+        version=None,
+        **values,
+    )
+    changed = or_(*(snap.c[key].is_distinct_from(stmt.excluded[key]) for key in _SNAPSHOT_FIELDS))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=models.EVENT_SNAPSHOT_KEY,
+        set_={
+            **{key: stmt.excluded[key] for key in _SNAPSHOT_FIELDS},
+            "polled_at": stmt.excluded.polled_at,
+            # Stamped with the user's next status version in the write stage; polled_at-only
+            # refreshes are not a change
+            "version": case((changed, None), else_=snap.c.version),
+        },
+    ).returning(snap.c.id, snap.c.version)
+    row = (await db.execute(stmt)).one()
+
+    writes = db.info.setdefault("snapshot_writes", {})
+    writes[user_id] = writes.get(user_id, False) or row.version is None
+    state[key] = {"is_active": is_active, "attacks_used": attacks_used}
+    if row.version is None:
+        snapshot = models.EventSnapshot(id=row.id, user_id=user_id, account_tag=account_tag, clan_tag=clan_tag,
+                                        event_type=event_type, event_subtype=event_subtype, **values)
+        _record_changes(db, snapshot, change_events.diff_snapshot(previous, values, event_type))
+
+
+async def load_snapshot_state(db: AsyncSession, user_ids):
+    """Load the stored state the change events of the users' next snapshot writes are diffed
+    against — one query per chunk instead of a read before every upsert."""
+    snap = models.EventSnapshot.__table__
+    result = await db.execute(
+        select(snap.c.user_id, snap.c.account_tag, snap.c.clan_tag, snap.c.event_type, snap.c.event_subtype,
+               snap.c.is_active, snap.c.attacks_used)
+        .where(snap.c.user_id.in_(user_ids))
+    )
+    state = db.info.setdefault("snapshot_state", {})
+    for row in result:
+        key = (row.user_id, row.account_tag, row.clan_tag, row.event_type, row.event_subtype or "")
+        state[key] = {"is_active": row.is_active, "attacks_used": row.attacks_used}
+    db.info.setdefault("snapshot_state_users", set()).update(user_ids)
+
+
+def discard_snapshot_writes(db: AsyncSession):
+    """Forget the session's pending snapshot writes, changes and loaded state (after a rollback)."""
+    for key in ("snapshot_writes", "snapshot_changes", "snapshot_state", "snapshot_state_users"):
+        db.info.pop(key, None)
+
+
+def publish_changes(changes, rows: dict[str, models.UserStatus]):
+    """Publish (kind, snapshot) changes on the change bus once they are committed, each with its
+    user's new status version (`rows` from refresh_user_status)."""
+    change_events.change_bus.publish(
+        change_events.ChangeEvent.for_snapshot(kind, snapshot, rows[snapshot.user_id].version)
+        for kind, snapshot in changes
+        if snapshot.user_id in rows
+    )
+
+
+def _record_changes(db: AsyncSession, snapshot: models.EventSnapshot, kinds: list[str]):
+    """Queue change kinds on the session; commit_snapshot_writes() publishes them after the commit."""
+    db.info.setdefault("snapshot_changes", []).extend((kind, snapshot) for kind in kinds)
 
 
 # ============ PROCESS ACCOUNT IN CLAN ============
 
-def process_account_cw(db, user, account, clan_tag, clan_name, war_data):
+async def process_account_cw(db, user, account, clan_tag, clan_name, war: WarRecord):
     """Process a clan war for an account."""
-    # Determine which side is our clan
-    clan_side_tag = war_data.get("clan", {}).get("tag")
-    our_side = "clan" if clan_side_tag == clan_tag else "opponent"
-    other_side = "opponent" if our_side == "clan" else "clan"
-
-    members = war_data.get(our_side, {}).get("members", [])
-    player = find_player_in_members(members, account.tag)
+    player = war.player(account.tag)
 
     if player:
-        attacks_used = len(player.get("attacks", []))
-        attacks_max = war_data.get("attacksPerMember", 2)
-        is_active = (war_data["state"] == "inWar" and attacks_used < attacks_max)
+        name, attacks_used = player
+        attacks_max = war.attacks_per_member
+        is_active = (war.state == "inWar" and attacks_used < attacks_max)
 
-        upsert_event_snapshot(
+        await upsert_event_snapshot(
             db=db,
             user_id=user.id,
             account_tag=account.tag,
-            account_name=player.get("name", account.name),
+            account_name=name or account.name,
             clan_tag=clan_tag,
             clan_name=clan_name,
             event_type="cw",
             event_subtype=None,
-            state=war_data["state"],
+            state=war.state,
             attacks_used=attacks_used,
             attacks_max=attacks_max,
-            end_time=parse_coc_timestamp(war_data.get("endTime")),
-            start_time=parse_coc_timestamp(war_data.get("startTime")),
-            opponent_name=war_data.get(other_side, {}).get("name"),
-            opponent_tag=war_data.get(other_side, {}).get("tag"),
-            war_size=war_data.get("teamSize"),
+            end_time=war.end_time,
+            start_time=war.start_time,
+            opponent_name=war.opponent_name,
+            opponent_tag=war.opponent_tag,
+            war_size=war.team_size,
             is_active=is_active,
         )
 
 
-def process_account_cwl(db, user, account, clan_tag, clan_name, cwl_wars):
+async def process_account_cwl(db, user, account, clan_tag, clan_name, cwl_wars: list[WarRecord]):
     """Process CWL wars for an account."""
     for war in cwl_wars:
-        clan_side_tag = war.get("clan", {}).get("tag")
-        our_side = "clan" if clan_side_tag == clan_tag else "opponent"
-        other_side = "opponent" if our_side == "clan" else "clan"
-
-        members = war.get(our_side, {}).get("members", [])
-        player = find_player_in_members(members, account.tag)
+        player = war.player(account.tag)
 
         if player:
-            attacks_used = len(player.get("attacks", []))
+            name, attacks_used = player
             attacks_max = 1  # CWL always 1 attack
-            round_idx = war.get("_round_index", 0)
-            is_active = (war["state"] == "inWar" and attacks_used < attacks_max)
+            is_active = (war.state == "inWar" and attacks_used < attacks_max)
 
-            upsert_event_snapshot(
+            await upsert_event_snapshot(
                 db=db,
                 user_id=user.id,
                 account_tag=account.tag,
-                account_name=player.get("name", account.name),
+                account_name=name or account.name,
                 clan_tag=clan_tag,
                 clan_name=clan_name,
                 event_type="cwl",
-                event_subtype=f"day_{round_idx}",
-                state=war["state"],
+                event_subtype=f"day_{war.round_index}",
+                state=war.state,
                 attacks_used=attacks_used,
                 attacks_max=attacks_max,
-                end_time=parse_coc_timestamp(war.get("endTime")),
-                start_time=parse_coc_timestamp(war.get("startTime")),
-                opponent_name=war.get(other_side, {}).get("name"),
-                opponent_tag=war.get(other_side, {}).get("tag"),
-                war_size=war.get("teamSize"),
+                end_time=war.end_time,
+                start_time=war.start_time,
+                opponent_name=war.opponent_name,
+                opponent_tag=war.opponent_tag,
+                war_size=war.team_size,
                 is_active=is_active,
             )
 
 
-def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan_member_tags=None):
+async def process_account_raid(db, user, account, clan_tag, clan_name, raid: RaidRecord, clan_member_tags=None):
     """Process raid weekend for an account.
     
     Handles two cases:
@@ -300,21 +484,17 @@ def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan
     2. Player NOT in raid members but IS in clan → 0 attacks (not yet participating)
        This covers plan §12.3: players in the clan who haven't attacked yet.
     """
-    raid_members = raid_data.get("members", [])
-    player = find_player_in_members(raid_members, account.tag)
+    player = raid.player(account.tag)
 
     if player:
-        attacks_used = player.get("attacks", 0)
-        attack_limit = player.get("attackLimit", 5)
-        bonus = player.get("bonusAttackLimit", 1)
-        attacks_max = attack_limit + bonus
+        name, attacks_used, attacks_max = player
         is_active = (attacks_used < attacks_max)
 
-        upsert_event_snapshot(
+        await upsert_event_snapshot(
             db=db,
             user_id=user.id,
             account_tag=account.tag,
-            account_name=player.get("name", account.name),
+            account_name=name or account.name,
             clan_tag=clan_tag,
             clan_name=clan_name,
             event_type="raid",
@@ -322,8 +502,8 @@ def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan
             state="ongoing",
             attacks_used=attacks_used,
             attacks_max=attacks_max,
-            end_time=parse_coc_timestamp(raid_data.get("endTime")),
-            start_time=parse_coc_timestamp(raid_data.get("startTime")),
+            end_time=raid.end_time,
+            start_time=raid.start_time,
             opponent_name=None,
             opponent_tag=None,
             war_size=None,
@@ -340,7 +520,7 @@ def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan
 
         if in_clan:
             # Player is in the clan but hasn't attacked yet → 0/6 attacks
-            upsert_event_snapshot(
+            await upsert_event_snapshot(
                 db=db,
                 user_id=user.id,
                 account_tag=account.tag,
@@ -352,8 +532,8 @@ def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan
                 state="ongoing",
                 attacks_used=0,
                 attacks_max=6,  # Default: 5 base + 1 bonus
-                end_time=parse_coc_timestamp(raid_data.get("endTime")),
-                start_time=parse_coc_timestamp(raid_data.get("startTime")),
+                end_time=raid.end_time,
+                start_time=raid.start_time,
                 opponent_name=None,
                 opponent_tag=None,
                 war_size=None,
@@ -361,125 +541,271 @@ def process_account_raid(db, user, account, clan_tag, clan_name, raid_data, clan
             )
 
 
-# ============ MAIN POLL FUNCTION ============
+async def process_account_clans(db, user, account, tracked_clans, clan_data: dict[str, ClanEvents]):
+    """Run the process_account_* passes for one account against each tracked clan's fetched events."""
+    for tc in tracked_clans:
+        clan_tag = tc.clan_tag
+        events = clan_data.get(clan_tag)
+        if not events:
+            continue
 
-async def poll_all_users(db: Session):
-    """Main polling function — called every 60 seconds by the scheduler."""
-    logger.info("Starting poll cycle...")
+        clan_name = events.clan_name
 
-    try:
-        users = db.query(models.User).all()
-        if not users:
-            logger.info("No users to poll for.")
+        # Clan War
+        if events.cw:
+            await process_account_cw(db, user, account, clan_tag, clan_name, events.cw)
+
+        # CWL
+        if events.cwl:
+            await process_account_cwl(db, user, account, clan_tag, clan_name, events.cwl)
+
+        # Raid
+        if events.raid:
+            await process_account_raid(db, user, account, clan_tag, clan_name, events.raid,
+                                 clan_member_tags=events.member_tags)
+
+
+async def commit_snapshot_writes(db: AsyncSession) -> set[str]:
+    """Refresh user_status for the pending snapshot writes, commit, then publish the change events.
+
+    Caches and streams learn about the changes from the bus; writes that only refreshed
+    polled_at publish nothing (the cache TTL picks up the new last_polled).
+    """
+    writes = db.info.get("snapshot_writes", {})
+    written_users = set(writes)
+    changed_users = {user_id for user_id, changed in writes.items() if changed}
+    changes = db.info.get("snapshot_changes", [])
+    discard_snapshot_writes(db)
+    rows = await status_view.refresh_user_status(db, written_users, changed=changed_users)
+    await db.commit()
+    publish_changes(changes, rows)
+    return written_users
+
+
+# ============ LOAD SHEDDING ============
+# When a poll runs past its budget it drops clans without a running/upcoming event ("idle")
+# rather than delay a clan near a deadline.
+
+# Monotonic time each idle clan was last fetched — shed idle clans go first next cycle
+_idle_fetched_at: dict[str, float] = {}
+
+
+async def prioritize_clans(db: AsyncSession, clan_tags: set[str]) -> tuple[list[str], list[str]]:
+    """Split clans into (with a running/upcoming event, nearest end first) and idle (least recently fetched first)."""
+    snap = models.EventSnapshot
+    result = await db.execute(
+        select(snap.clan_tag, func.min(snap.end_time))
+        .where(snap.end_time > datetime.now(timezone.utc))
+        .group_by(snap.clan_tag)
+    )
+    next_end = {clan_tag: end_time for clan_tag, end_time in result.all() if clan_tag in clan_tags}
+    urgent = sorted(next_end, key=lambda tag: next_end[tag])
+    idle = sorted(clan_tags - next_end.keys(), key=lambda tag: _idle_fetched_at.get(tag, 0.0))
+    for tag in _idle_fetched_at.keys() - set(idle):
+        del _idle_fetched_at[tag]
+    return urgent, idle
+
+
+# ============ MAIN POLL FUNCTION ============
+
+async def iter_user_chunks(db: AsyncSession, chunk_size: int):
+    """Ids of users with tracked clans, in keyset-paginated chunks of at most `chunk_size`."""
+    after = ""
+    while True:
+        user_ids = (await db.execute(
+            select(models.TrackedClan.user_id).where(models.TrackedClan.user_id > after)
+            .group_by(models.TrackedClan.user_id)
+            .order_by(models.TrackedClan.user_id)
+            .limit(chunk_size)
+        )).scalars().all()
+        if not user_ids:
+            return
+        yield user_ids
+        if len(user_ids) < chunk_size:
             return
+        after = user_ids[-1]
 
-        # Collect all unique clan tags across all users
-        all_tracked_clans = db.query(models.TrackedClan).all()
-        unique_clan_tags = set()
-        clan_to_users = {}  # clan_tag -> list of user_ids
 
-        for tc in all_tracked_clans:
-            unique_clan_tags.add(tc.clan_tag)
-            if tc.clan_tag not in clan_to_users:
-                clan_to_users[tc.clan_tag] = []
-            clan_to_users[tc.clan_tag].append(tc.user_id)
+async def poll_all_users(db: AsyncSession, shard: tuple[int, int] | None = None, deadline: float | None = None):
+    """Main polling function — called every 60 seconds by the scheduler.
 
+    `shard` = (index, count): only poll the clans of that shard (see poll_sharding).
+    Player names and clans are refreshed by their own job (see player_refresh).
+    `deadline` (monotonic): when the next cycle is due. Past POLL_BUDGET_FRACTION of the time
+    until then, low-priority work is shed (see LOAD SHEDDING).
+
+    Clans are fetched first; users are then processed in chunks of POLL_CHUNK_SIZE, each
+    committed on its own and dropped from the session, so memory doesn't grow with the user
+    base and a failing chunk only loses its own writes.
+    """
+    started = time.monotonic()
+    shed_after = None if deadline is None else started + (deadline - started) * settings.POLL_BUDGET_FRACTION
+
+    def over_budget() -> bool:
+        return shed_after is not None and time.monotonic() > shed_after
+
+    logger.info("Starting poll cycle..." if shard is None else f"Starting poll cycle for shard {shard[0]}/{shard[1]}...")
+    prune_clan_fetches(settings.TARGETED_POLL_REUSE_SECONDS)
+
+    try:
+        # Collect all unique clan tags across all users
+        unique_clan_tags = set((await db.execute(select(models.TrackedClan.clan_tag).distinct())).scalars())
+        if shard is not None:
+            unique_clan_tags = {tag for tag in unique_clan_tags if poll_sharding.in_shard(tag, shard)}
         if not unique_clan_tags:
             logger.info("No clans being tracked.")
             return
 
-        # Fetch data for all unique clans (deduplicated)
+        # Fetch data for all unique clans (deduplicated), clans near a deadline first
         logger.info(f"Fetching data for {len(unique_clan_tags)} unique clans...")
+        urgent, idle = await prioritize_clans(db, unique_clan_tags)
+        idle_set = set(idle)
         clan_data_cache = {}
-        for clan_tag in unique_clan_tags:
+        for i, clan_tag in enumerate(urgent + idle):
+            if clan_tag in idle_set:
+                if over_budget():
+                    shed = len(urgent) + len(idle) - i
+                    logger.warning(f"Poll over budget, shedding {shed} idle clan(s)")
+                    metrics.incr("poll.shed.idle_clans", shed)
+                    break
+                _idle_fetched_at[clan_tag] = time.monotonic()
             try:
-                clan_data_cache[clan_tag] = await fetch_clan_events(clan_tag)
+                clan_data_cache[clan_tag] = await fetch_clan_events_shared(clan_tag)
             except Exception as e:
                 logger.error(f"Error fetching clan {clan_tag}: {e}")
                 continue
+    except Exception as e:
+        logger.error(f"Poll cycle failed: {e}", exc_info=True)
+        await db.rollback()
+        return
 
-        # Update tracked clan names
-        for tc in all_tracked_clans:
-            if tc.clan_tag in clan_data_cache:
-                name = clan_data_cache[tc.clan_tag].get("clan_name")
-                if name:
-                    tc.clan_name = name
+    # Process users chunk by chunk
+    failed_chunks = 0
+    try:
+        async for user_ids in iter_user_chunks(db, settings.POLL_CHUNK_SIZE):
+            try:
+                await _poll_user_chunk(db, user_ids, unique_clan_tags, clan_data_cache)
+            except Exception as e:
+                failed_chunks += 1
+                metrics.incr("poll.chunks_failed")
+                logger.error(f"Poll of {len(user_ids)} user(s) from {user_ids[0]} failed: {e}", exc_info=True)
+                discard_snapshot_writes(db)
+                await db.rollback()
+            finally:
+                db.expunge_all()
+    except Exception as e:
+        logger.error(f"Poll cycle failed: {e}", exc_info=True)
+        await db.rollback()
+        return
 
-        # Process each user
-        for user in users:
-            user_clans = [tc for tc in all_tracked_clans if tc.user_id == user.id]
-            user_accounts = db.query(models.PlayerAccount).filter(
-                models.PlayerAccount.user_id == user.id
-            ).all()
+    if failed_chunks:
+        logger.warning(f"Poll cycle completed with {failed_chunks} failed chunk(s).")
+    else:
+        logger.info("Poll cycle completed successfully.")
 
-            if not user_accounts or not user_clans:
-                continue
 
+async def _poll_user_chunk(db: AsyncSession, user_ids, clan_tags: set[str], clan_data: dict):
+    """Process, persist and commit one chunk of users."""
+    users = (await db.execute(select(models.User).where(models.User.id.in_(user_ids)))).scalars().all()
+    chunk_clans = (await db.execute(
+        select(models.TrackedClan).where(models.TrackedClan.user_id.in_(user_ids))
+    )).scalars().all()
+    accounts = (await db.execute(
+        select(models.PlayerAccount).where(models.PlayerAccount.user_id.in_(user_ids))
+    )).scalars().all()
+
+    clans_by_user, accounts_by_user = {}, {}
+    for tc in chunk_clans:
+        if tc.clan_tag not in clan_tags:
+            continue
+        clans_by_user.setdefault(tc.user_id, []).append(tc)
+        # Update tracked clan names
+        name = clan_data[tc.clan_tag].clan_name if tc.clan_tag in clan_data else None
+        if name:
+            tc.clan_name = name
+    for account in accounts:
+        accounts_by_user.setdefault(account.user_id, []).append(account)
+
+    await load_snapshot_state(db, user_ids)
+    async with write_lock:
+        for user in users:
+            user_clans = clans_by_user.get(user.id)
+            user_accounts = accounts_by_user.get(user.id)
+            if not user_clans or not user_accounts:
+                continue
             for account in user_accounts:
-                for tc in user_clans:
-                    clan_tag = tc.clan_tag
-                    events = clan_data_cache.get(clan_tag)
-                    if not events:
-                        continue
+                await process_account_clans(db, user, account, user_clans, clan_data)
 
-                    clan_name = events.get("clan_name", clan_tag)
-
-                    # Clan War
-                    if events["cw"]:
-                        process_account_cw(db, user, account, clan_tag, clan_name, events["cw"])
-
-                    # CWL
-                    if events["cwl"]:
-                        process_account_cwl(db, user, account, clan_tag, clan_name, events["cwl"])
-
-                    # Raid
-                    if events["raid"]:
-                        process_account_raid(db, user, account, clan_tag, clan_name, events["raid"],
-                                             clan_member_tags=events.get("member_tags"))
-
-                # Update account's current clan from player API
-                try:
-                    player_data = await coc_api.get_player(account.tag)
-                    if player_data:
-                        account.name = player_data.get("name", account.name)
-                        account.current_clan_tag = player_data.get("clan", {}).get("tag")
-                        account.current_clan_name = player_data.get("clan", {}).get("name")
-                        account.last_synced_at = datetime.now(timezone.utc)
-                except Exception as e:
-                    logger.error(f"Error updating player {account.tag}: {e}")
-
-        db.commit()
-        logger.info("Poll cycle completed successfully.")
+        await commit_snapshot_writes(db)
 
-    except Exception as e:
-        logger.error(f"Poll cycle failed: {e}", exc_info=True)
-        db.rollback()
+
+async def _run_in_batches(db: AsyncSession, make_statement, batch_size: int):
+    """Execute a set-based UPDATE/DELETE over id batches, yielding each batch's RETURNING rows.
+
+    `make_statement(limit)` returns the statement for one batch of at most `limit` rows,
+    RETURNING the affected rows' user_id first. The caller finishes and commits each batch
+    before the next one runs, so a transaction only locks one batch of rows and no rows are
+    kept across batches.
+    """
+    while True:
+        rows = (await db.execute(make_statement(batch_size))).all()
+        yield rows
+        if len(rows) < batch_size:
+            return
 
 
-async def cleanup_stale_snapshots(db: Session):
+# Snapshot columns a ChangeEvent is built from (user_id first, see _run_in_batches)
+_CHANGE_COLUMNS = [
+    models.EventSnapshot.user_id, models.EventSnapshot.id, models.EventSnapshot.event_type,
+    models.EventSnapshot.account_tag, models.EventSnapshot.clan_tag, models.EventSnapshot.attacks_used,
+    models.EventSnapshot.attacks_max, models.EventSnapshot.end_time,
+]
+
+
+async def cleanup_stale_snapshots(db: AsyncSession):
     """Mark expired events as inactive and delete old stale snapshots."""
     try:
         now = datetime.now(timezone.utc)
+        snap = models.EventSnapshot
+        batch_size = settings.CLEANUP_BATCH_SIZE
 
         # Mark expired events as inactive
-        expired = db.query(models.EventSnapshot).filter(
-            models.EventSnapshot.end_time < now,
-            models.EventSnapshot.is_active == True,
-        ).all()
-        for snap in expired:
-            snap.is_active = False
-
-        # Delete snapshots older than 48h that are inactive
+        def deactivate_expired(limit):
+            ids = select(snap.id).where(
+                snap.end_time < now,
+                snap.is_active == True,
+            ).limit(limit)
+            return (
+                update(snap).where(snap.id.in_(ids))
+                .values(is_active=False, version=None)
+                .returning(*_CHANGE_COLUMNS)
+            )
+
+        expired = 0
+        async for expired_rows in _run_in_batches(db, deactivate_expired, batch_size):
+            expired += len(expired_rows)
+            rows = await status_view.refresh_user_status(db, (), changed={row.user_id for row in expired_rows})
+            await db.commit()
+            publish_changes([(change_events.EVENT_ENDED, row) for row in expired_rows], rows)
+
+        # Delete snapshots older than 48h that are inactive (notification_logs cascade in the DB)
         cutoff = now - timedelta(hours=48)
-        stale = db.query(models.EventSnapshot).filter(
-            models.EventSnapshot.polled_at < cutoff,
-            models.EventSnapshot.is_active == False,
-        ).all()
-        for snap in stale:
-            db.delete(snap)
-
-        db.commit()
-        logger.info(f"Cleanup: {len(expired)} expired, {len(stale)} deleted.")
+
+        def delete_stale(limit):
+            ids = select(snap.id).where(
+                snap.polled_at < cutoff,
+                snap.is_active == False,
+            ).limit(limit)
+            return delete(snap).where(snap.id.in_(ids)).returning(*_CHANGE_COLUMNS)
+
+        stale = 0
+        async for stale_rows in _run_in_batches(db, delete_stale, batch_size):
+            stale += len(stale_rows)
+            rows = await status_view.refresh_user_status(db, (), removed={row.user_id for row in stale_rows})
+            await db.commit()
+            publish_changes([(change_events.SNAPSHOT_DELETED, row) for row in stale_rows], rows)
+
+        logger.info(f"Cleanup: {expired} expired, {stale} deleted.")
     except Exception as e:
         logger.error(f"Cleanup failed: {e}")
-        db.rollback()
+        await db.rollback()
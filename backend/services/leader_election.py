@@ -0,0 +1,165 @@
+"""
+Leader Election — makes sure background jobs (the poll/reminder scheduler) run in exactly one
+process when the API is served by several workers or hosts.
+
+PostgreSQL: a session-level advisory lock held on a dedicated connection. The server drops it
+as soon as that connection dies, so a standby gets it on its next attempt.
+SQLite: a lease row in scheduler_leases with an expiry that the holder keeps pushing forward;
+a standby takes over once it has expired.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, or_, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+import models
+from core.config import settings
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class AdvisoryLockElection:
+    """PostgreSQL: pg_try_advisory_lock on a connection kept open while leading."""
+
+    def __init__(self, engine: AsyncEngine, name: str):
+        self.engine = engine
+        self.name = name
+        self.key = int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "big", signed=True)
+        self._conn: AsyncConnection | None = None
+
+    async def try_acquire(self) -> bool:
+        """Acquire, or confirm we still hold, the leadership."""
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text("SELECT 1"))
+                await self._conn.commit()
+                return True
+            except Exception as e:
+                logger.warning(f"Lost leader connection for {self.name}: {e}")
+                await self._close()
+
+        conn = await self.engine.connect()
+        try:
+            acquired = await conn.scalar(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key})
+            await conn.commit()
+        except Exception:
+            await conn.close()
+            raise
+        if acquired:
+            self._conn = conn
+            return True
+        await conn.close()
+        return False
+
+    async def release(self):
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            await self._conn.commit()
+        except Exception as e:
+            logger.warning(f"Releasing leader lock {self.name} failed: {e}")
+        await self._close()
+
+    async def _close(self):
+        conn, self._conn = self._conn, None
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+
+class LeaseRowElection:
+    """Any database: a scheduler_leases row owned by the holder until expires_at."""
+
+    def __init__(self, engine: AsyncEngine, name: str, ttl_seconds: float, holder: str | None = None):
+        self.engine = engine
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.holder = holder or _holder_id()
+
+    async def try_acquire(self) -> bool:
+        """Take the lease if it is free or expired, or extend it if we hold it."""
+        table = models.SchedulerLease.__table__
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl_seconds)
+
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(table)
+                .where(table.c.name == self.name, or_(table.c.holder == self.holder, table.c.expires_at < now))
+                .values(holder=self.holder, expires_at=expires_at)
+            )
+            if result.rowcount:
+                return True
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(table.insert().values(name=self.name, holder=self.holder, expires_at=expires_at))
+            return True
+        except IntegrityError:
+            return False  # held by someone else
+
+    async def release(self):
+        table = models.SchedulerLease.__table__
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(table).where(table.c.name == self.name, table.c.holder == self.holder))
+
+
+def make_election(engine: AsyncEngine, name: str):
+    if engine.dialect.name == "postgresql":
+        return AdvisoryLockElection(engine, name)
+    return LeaseRowElection(engine, name, ttl_seconds=settings.LEADER_LEASE_TTL_SECONDS)
+
+
+async def run_while_leader(election, job, renew_seconds: float | None = None):
+    """Run `job()` as a task only while this process holds the leadership.
+
+    Tries to acquire (and, once leading, renews) every `renew_seconds`. The job is cancelled
+    when leadership is lost, and restarted if it crashes or leadership is regained.
+    """
+    renew_seconds = renew_seconds or settings.LEADER_RENEW_SECONDS
+    task: asyncio.Task | None = None
+    try:
+        while True:
+            try:
+                leading = await election.try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election for {election.name} failed: {e}")
+                leading = False
+
+            if leading and task is None:
+                logger.info(f"Acquired leadership for {election.name}, starting job.")
+                metrics.incr("leader.acquired")
+                task = asyncio.create_task(job())
+            elif not leading and task is not None:
+                logger.warning(f"Lost leadership for {election.name}, stopping job.")
+                metrics.incr("leader.lost")
+                task.cancel()
+                task = None
+            elif task is not None and task.done():
+                if not task.cancelled() and task.exception():
+                    logger.error(f"Leader job {election.name} crashed: {task.exception()}")
+                task = asyncio.create_task(job())
+
+            await asyncio.sleep(renew_seconds)
+    finally:
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        try:
+            await election.release()
+        except Exception as e:
+            logger.warning(f"Releasing leadership for {election.name} failed: {e}")
@@ -0,0 +1,84 @@
+"""
+Notification Log Retention — time-bucketed notification_logs with compaction into an archive.
+
+Each log row carries a bucket: the date ordinal of the day (or Monday of the week) it was
+sent in. Because buckets are start dates, day and week buckets stay comparable if the
+setting changes. Reminder dedupe only looks at the hot buckets; older buckets are
+aggregated into notification_log_archive and deleted, and archive rows expire after
+NOTIFICATION_ARCHIVE_RETENTION_DAYS.
+"""
+import logging
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, delete, distinct, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from services.data_poller import as_utc
+import models
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket_days() -> int:
+    return 7 if settings.NOTIFICATION_LOG_BUCKET == "week" else 1
+
+
+def bucket_for(dt: datetime) -> int:
+    """Bucket (start date ordinal) for a timestamp."""
+    day = as_utc(dt).date().toordinal()
+    if _bucket_days() == 7:
+        return day - (day - 1) % 7  # ordinal 1 (0001-01-01) is a Monday
+    return day
+
+
+def hot_bucket_floor(now: datetime) -> int:
+    """Oldest bucket that still lives in notification_logs."""
+    return bucket_for(now) - _bucket_days() * (settings.NOTIFICATION_LOG_HOT_BUCKETS - 1)
+
+
+async def compact_notification_logs(db: AsyncSession):
+    """Move buckets older than the hot window into the archive and enforce archive retention."""
+    try:
+        now = datetime.now(timezone.utc)
+        floor = hot_bucket_floor(now)
+        log = models.NotificationLog
+        archive = models.NotificationLogArchive
+
+        old_buckets = (await db.execute(
+            select(distinct(log.bucket)).where(log.bucket < floor)
+        )).scalars().all()
+
+        # One transaction per bucket: aggregate, merge into the archive, drop the rows
+        for bucket in sorted(old_buckets):
+            aggregated = (await db.execute(
+                select(log.user_id, log.status, func.count(), func.min(log.sent_at), func.max(log.sent_at))
+                .where(log.bucket == bucket)
+                .group_by(log.user_id, log.status)
+            )).all()
+            existing = {
+                (row.user_id, row.status): row
+                for row in (await db.execute(select(archive).where(archive.bucket == bucket))).scalars()
+            }
+            for user_id, status, count, first_sent, last_sent in aggregated:
+                row = existing.get((user_id, status))
+                if row is None:
+                    db.add(archive(bucket=bucket, user_id=user_id, status=status, count=count,
+                                   first_sent_at=first_sent, last_sent_at=last_sent))
+                else:
+                    row.count += count
+                    row.first_sent_at = min(row.first_sent_at, first_sent)
+                    row.last_sent_at = max(row.last_sent_at, last_sent)
+
+            await db.execute(delete(log).where(log.bucket == bucket))
+            await db.commit()
+
+        # Archive retention
+        cutoff = bucket_for(now - timedelta(days=settings.NOTIFICATION_ARCHIVE_RETENTION_DAYS))
+        expired = await db.execute(delete(archive).where(archive.bucket < cutoff))
+        await db.commit()
+
+        if old_buckets or expired.rowcount:
+            logger.info(f"Notification logs: {len(old_buckets)} bucket(s) archived, "
+                        f"{expired.rowcount} archive row(s) expired.")
+    except Exception as e:
+        logger.error(f"Notification log compaction failed: {e}")
+        await db.rollback()
@@ -0,0 +1,109 @@
+"""
+Player Refresh — keeps linked accounts' names and current clans up to date, apart from the poll.
+
+Runs as its own scheduler job. Each run picks the player tags whose accounts were synced
+longest ago (every tag once, however many users linked it), so that each tag comes up about
+once per PLAYER_REFRESH_INTERVAL_SECONDS, fetches them with at most
+PLAYER_REFRESH_CONCURRENCY requests in flight, and writes every result to all of that tag's
+player_accounts rows in one bulk UPDATE.
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from core.config import settings
+from core.metrics import metrics
+from services import coc_api
+
+logger = logging.getLogger(__name__)
+
+# Tags whose fetch failed -> monotonic time; skipped until the next interval instead of
+# being retried (as the oldest tags) every run
+_failed_at: dict[str, float] = {}
+
+
+async def stale_player_tags(db: AsyncSession, limit: int, cutoff: datetime) -> list[str]:
+    """Distinct tags with an account not synced since `cutoff`, least recently synced first."""
+    account = models.PlayerAccount
+    synced = func.min(account.last_synced_at)
+    result = await db.execute(
+        select(account.tag)
+        .group_by(account.tag)
+        # min() skips NULLs: a never synced account shows up as count() > count(last_synced_at)
+        .having(or_(synced < cutoff, func.count() > func.count(account.last_synced_at)))
+        .order_by(synced.asc().nulls_first())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def _fetch_players(tags: list[str]) -> dict[str, dict | None]:
+    semaphore = asyncio.Semaphore(settings.PLAYER_REFRESH_CONCURRENCY)
+
+    async def fetch(tag):
+        async with semaphore:
+            try:
+                return await coc_api.get_player(tag)
+            except Exception as e:
+                logger.error(f"Error fetching player {tag}: {e}")
+                return None
+
+    return dict(zip(tags, await asyncio.gather(*(fetch(tag) for tag in tags))))
+
+
+async def refresh_players(db: AsyncSession, run_interval: float):
+    """Refresh this run's share of the player tags (the job runs every `run_interval` seconds)."""
+    interval = settings.PLAYER_REFRESH_INTERVAL_SECONDS
+    now = time.monotonic()
+    for tag, failed_at in list(_failed_at.items()):
+        if now - failed_at > interval:
+            del _failed_at[tag]
+
+    try:
+        total = (await db.execute(select(func.count(func.distinct(models.PlayerAccount.tag))))).scalar_one()
+        # Spread the tags evenly over the interval
+        share = max(1, math.ceil(total * run_interval / interval))
+        cutoff = datetime.utcnow() - timedelta(seconds=interval)
+        tags = [
+            tag for tag in await stale_player_tags(db, share + len(_failed_at), cutoff)
+            if tag not in _failed_at
+        ][:share]
+        if not tags:
+            return
+
+        players = await _fetch_players(tags)
+        synced_at = datetime.utcnow()
+        rows = []
+        for tag, player in players.items():
+            if not player:
+                _failed_at[tag] = now
+                continue
+            rows.append({
+                "b_tag": tag,
+                "b_name": player.get("name"),
+                "b_clan_tag": player.get("clan", {}).get("tag"),
+                "b_clan_name": player.get("clan", {}).get("name"),
+            })
+
+        if rows:
+            account = models.PlayerAccount.__table__
+            await db.execute(
+                update(account).where(account.c.tag == bindparam("b_tag")).values(
+                    name=func.coalesce(bindparam("b_name"), account.c.name),
+                    current_clan_tag=bindparam("b_clan_tag"),
+                    current_clan_name=bindparam("b_clan_name"),
+                    last_synced_at=synced_at,
+                ),
+                rows,
+            )
+            await db.commit()
+        metrics.incr("player_refresh.refreshed", len(rows))
+        metrics.incr("player_refresh.failed", len(tags) - len(rows))
+        logger.info(f"Player refresh: {len(rows)} of {len(tags)} tag(s) refreshed.")
+    except Exception as e:
+        logger.error(f"Player refresh failed: {e}", exc_info=True)
+        await db.rollback()
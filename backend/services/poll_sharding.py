@@ -0,0 +1,117 @@
+"""
+Poll Sharding — splits the poll cycle across dedicated poller processes (POLL_SHARDED=true).
+
+Each clan belongs to shard `hash(clan_tag) % count`, with a hash that is stable across
+processes and restarts. Membership is coordinated through poller_members: every poller
+heartbeats its row, rows older than LEADER_LEASE_TTL_SECONDS are dropped, and a poller's
+shard is its position among the live members. When a poller starts or dies, the others pick
+up the new count at their next heartbeat, which rebalances the clans.
+
+Snapshots are keyed by clan, so each shard writes its own clans' rows, but targeted polls in
+the API workers write the same rows. Snapshots are therefore upserted (see
+data_poller.upsert_event_snapshot), and the user_status rows all writers share are created
+with ON CONFLICT DO NOTHING and locked while being refreshed (see
+status_view.refresh_user_status).
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+import models
+from core.config import settings
+from core.metrics import metrics
+from database import SessionLocal, engine
+from services import data_poller, scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(tag: str, count: int) -> int:
+    """Stable shard index of a clan (or any) tag — unlike hash(), the same in every process."""
+    digest = hashlib.blake2b(tag.upper().encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def in_shard(tag: str, shard: tuple[int, int]) -> bool:
+    index, count = shard
+    return shard_of(tag, count) == index
+
+
+class ShardMembership:
+    """This process's poller_members row and its current (index, count) assignment."""
+
+    def __init__(self, engine: AsyncEngine, ttl_seconds: float, member_id: str | None = None):
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.member_id = member_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._shard: tuple[int, int] | None = None
+        self._confirmed_at = 0.0
+
+    @property
+    def shard(self) -> tuple[int, int] | None:
+        """Current assignment; None once our heartbeat is older than the TTL (others took over)."""
+        if time.monotonic() - self._confirmed_at > self.ttl_seconds:
+            return None
+        return self._shard
+
+    async def heartbeat(self) -> tuple[int, int]:
+        table = models.PollerMember.__table__
+        now = datetime.utcnow()
+        async with self.engine.begin() as conn:
+            result = await conn.execute(
+                update(table).where(table.c.member_id == self.member_id).values(heartbeat_at=now)
+            )
+            if not result.rowcount:
+                await conn.execute(table.insert().values(member_id=self.member_id, heartbeat_at=now, started_at=now))
+            await conn.execute(delete(table).where(table.c.heartbeat_at < now - timedelta(seconds=self.ttl_seconds)))
+            members = (await conn.execute(select(table.c.member_id).order_by(table.c.member_id))).scalars().all()
+
+        shard = (members.index(self.member_id), len(members))
+        if shard != self._shard:
+            logger.info(f"Poller {self.member_id} now polls shard {shard[0]} of {shard[1]}")
+            metrics.incr("poller.rebalances")
+        self._shard = shard
+        self._confirmed_at = time.monotonic()
+        return shard
+
+    async def leave(self):
+        table = models.PollerMember.__table__
+        async with self.engine.begin() as conn:
+            await conn.execute(delete(table).where(table.c.member_id == self.member_id))
+
+
+async def _heartbeat_loop(membership: ShardMembership):
+    while True:
+        await asyncio.sleep(settings.LEADER_RENEW_SECONDS)
+        try:
+            await membership.heartbeat()
+        except Exception as e:
+            logger.error(f"Poller heartbeat failed: {e}")
+
+
+async def run_poller(membership: ShardMembership | None = None):
+    """Poll this process's shard every POLL_INTERVAL_SECONDS until cancelled."""
+    membership = membership or ShardMembership(engine, settings.LEADER_LEASE_TTL_SECONDS)
+    await membership.heartbeat()
+    heartbeat_task = asyncio.create_task(_heartbeat_loop(membership))
+
+    async def poll_shard(deadline: float):
+        shard = membership.shard
+        if shard is not None:
+            async with SessionLocal() as db:
+                await data_poller.poll_all_users(db, shard=shard, deadline=deadline)
+
+    try:
+        await scheduler.FixedRateJob("poll", settings.POLL_INTERVAL_SECONDS, poll_shard).run_forever()
+    finally:
+        heartbeat_task.cancel()
+        try:
+            await membership.leave()
+        except Exception as e:
+            logger.warning(f"Leaving the poller group failed: {e}")
@@ -1,12 +1,38 @@
 """
 Reminder Engine — Checks event_snapshots against user reminder configs and sends FCM pushes.
+
+Besides the scheduled check, triggers_changed() re-checks just the reminder times a user
+added or re-enabled, so a new trigger that is already due fires right away.
+
+Right before sending, the wars/raids of the due reminders are fetched again — one shared
+fetch per clan and event, each HTTP request charged to coc_api.freshness_budget (shared by
+all processes, reserved once per check) — and reminders whose attacks were
+used since the last poll are suppressed (logged as "suppressed").
+
+on_changes() follows the poller's change events: a newly started event is checked at once,
+and snapshots whose attacks were all used (or that ended) are remembered for a few minutes
+so a check that loaded them before that commit doesn't send a stale reminder.
+
+These checks run in several processes (the leader's scheduled check, triggers_changed() in
+API workers, on_changes() wherever snapshots are written), so each trigger is claimed with
+an INSERT ... ON CONFLICT DO NOTHING into notification_logs before its push is sent, and
+only the check that inserted the row sends it.
 """
+import asyncio
 import logging
+import time
 from datetime import datetime, timezone, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 import models
-from services import fcm_service
-from services.data_poller import format_duration
+from core.metrics import metrics
+from database import SessionLocal, upsert_insert
+from core.config import settings
+from services import coc_api, fcm_service
+from services import change_events
+from services.data_poller import format_duration, as_utc, WarRecord, RaidRecord
+from services.notification_retention import bucket_for, hot_bucket_floor
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +43,18 @@ EVENT_LABELS = {
 }
 
 
-async def check_reminders(db: Session):
+async def check_reminders(
+    db: AsyncSession,
+    user_id: str | None = None,
+    time_ids: set[str] | None = None,
+    snapshot_ids: set[str] | None = None,
+):
     """
     Check all active event snapshots against user reminder configurations.
     Send push notifications where appropriate.
+
+    `user_id` / `time_ids` restrict the check to one user's given reminder times,
+    `snapshot_ids` to the given snapshots.
     """
     logger.info("Starting reminder check cycle...")
 
@@ -28,11 +62,16 @@ async def check_reminders(db: Session):
         now = datetime.now(timezone.utc)
 
         # Get all active snapshots where attacks remain
-        active_snapshots = db.query(models.EventSnapshot).filter(
+        query = select(models.EventSnapshot).where(
             models.EventSnapshot.is_active == True,
             models.EventSnapshot.state.in_(["inWar", "ongoing"]),
             models.EventSnapshot.end_time.isnot(None),
-        ).all()
+        )
+        if user_id is not None:
+            query = query.where(models.EventSnapshot.user_id == user_id)
+        if snapshot_ids is not None:
+            query = query.where(models.EventSnapshot.id.in_(snapshot_ids))
+        active_snapshots = (await db.execute(query)).scalars().all()
 
         # Filter to those with remaining attacks
         active_snapshots = [s for s in active_snapshots if s.attacks_remaining > 0]
@@ -41,74 +80,313 @@ async def check_reminders(db: Session):
             logger.info("No active events with remaining attacks.")
             return
 
-        notifications_sent = 0
-
-        for snapshot in active_snapshots:
-            user = db.query(models.User).filter(models.User.id == snapshot.user_id).first()
-            if not user or not user.notification_enabled or not user.fcm_token:
-                continue
+        # Bulk-load users, configs (+ times) and sent logs — constant query count per cycle
+        user_ids = {s.user_id for s in active_snapshots}
+        users = {
+            u.id: u for u in (await db.execute(select(models.User).where(
+                models.User.id.in_(user_ids),
+                models.User.notification_enabled == True,
+                models.User.fcm_token.isnot(None),
+            ))).scalars()
+        }
+        if not users:
+            logger.info("No users with notifications enabled.")
+            return
 
-            # Find matching reminder config
-            config = db.query(models.ReminderConfig).filter(
-                models.ReminderConfig.user_id == user.id,
-                models.ReminderConfig.event_type == snapshot.event_type,
-                models.ReminderConfig.enabled == True,
-            ).first()
+        configs = (await db.execute(select(models.ReminderConfig).options(
+            selectinload(models.ReminderConfig.times)
+        ).where(
+            models.ReminderConfig.user_id.in_(users.keys()),
+            models.ReminderConfig.enabled == True,
+        ))).scalars().all()
+        config_by_key = {(c.user_id, c.event_type): c for c in configs}
 
-            if not config:
+        # Collect reminders whose trigger time falls into the 90 second window
+        due = []
+        for snapshot in active_snapshots:
+            user = users.get(snapshot.user_id)
+            config = config_by_key.get((snapshot.user_id, snapshot.event_type))
+            if not user or not config:
                 continue
 
-            # Get all enabled reminder times
-            times = db.query(models.ReminderTime).filter(
-                models.ReminderTime.reminder_config_id == config.id,
-                models.ReminderTime.enabled == True,
-            ).all()
-
-            for rt in times:
-                trigger_time = snapshot.end_time - timedelta(minutes=rt.minutes_before_end)
+            for rt in config.times:
+                if not rt.enabled or (time_ids is not None and rt.id not in time_ids):
+                    continue
+                trigger_time = as_utc(snapshot.end_time) - timedelta(minutes=rt.minutes_before_end)
 
                 # Check if it's time to fire (within 90 second window)
                 diff_seconds = abs((now - trigger_time).total_seconds())
                 if diff_seconds > 90:
                     continue
+                due.append((user, snapshot, rt))
 
-                # Check for duplicate
-                already_sent = db.query(models.NotificationLog).filter(
-                    models.NotificationLog.event_snapshot_id == snapshot.id,
-                    models.NotificationLog.reminder_time_id == rt.id,
-                ).first()
+        if not due:
+            logger.info("No reminders due.")
+            return
 
-                if already_sent:
-                    continue
+        # Check for duplicates (only the hot buckets can hold a log for a trigger in this window)
+        already_sent = set((await db.execute(select(
+            models.NotificationLog.event_snapshot_id,
+            models.NotificationLog.reminder_time_id,
+        ).where(
+            models.NotificationLog.bucket >= hot_bucket_floor(now),
+            models.NotificationLog.event_snapshot_id.in_({snap.id for _, snap, _ in due}),
+        ))).tuples())
 
-                # Send notification
-                success = await send_reminder_notification(user, snapshot, rt)
-
-                # Log it
-                log = models.NotificationLog(
-                    user_id=user.id,
-                    event_snapshot_id=snapshot.id,
-                    reminder_time_id=rt.id,
-                    status="sent" if success else "failed",
-                )
-                db.add(log)
+        pending = []
+        for user, snapshot, rt in due:
+            if (snapshot.id, rt.id) in already_sent:
+                continue
+            if snapshot.id in _settled:
+                # Attacked or ended since this check loaded it
+                metrics.incr("reminders.suppressed_by_change")
+                continue
+            pending.append((user, snapshot, rt))
+
+        fresh_remaining = await fresh_attacks_remaining({snap.id: snap for _, snap, _ in pending}.values())
+        to_send = []
+        logs = []
+        for user, snapshot, rt in pending:
+            attacks_remaining = fresh_remaining.get(snapshot.id)
+            if attacks_remaining == 0:
+                metrics.incr("reminders.suppressed_stale")
+                status = "suppressed"
+            else:
+                to_send.append((user, snapshot, rt, attacks_remaining))
+                status = "sent"
+            logs.append({
+                "user_id": user.id,
+                "event_snapshot_id": snapshot.id,
+                "reminder_time_id": rt.id,
+                "status": status,
+                "sent_at": now,
+                "bucket": bucket_for(now),
+            })
+
+        # Claim every trigger before sending: the scheduled check (leader), triggers_changed()
+        # (any API worker) and on_changes() (every snapshot writer) may evaluate the same
+        # trigger at once, and only the process whose log row got inserted sends it
+        claimed = await claim_notifications(db, logs)
+        await db.commit()
+
+        failed = []
+        notifications_sent = 0
+        for user, snapshot, rt, attacks_remaining in to_send:
+            log_id = claimed.get((snapshot.id, rt.id))
+            if log_id is None:
+                metrics.incr("reminders.claimed_elsewhere")
+                continue
+            if await send_reminder_notification(user, snapshot, rt, attacks_remaining):
                 notifications_sent += 1
+            else:
+                failed.append(log_id)
 
-        db.commit()
-        logger.info(f"Reminder check completed. {notifications_sent} notification(s) processed.")
+        if failed:
+            table = models.NotificationLog.__table__
+            await db.execute(update(table).where(table.c.id.in_(failed)).values(status="failed"))
+            await db.commit()
+        logger.info(f"Reminder check completed. {notifications_sent} notification(s) sent.")
 
     except Exception as e:
         logger.error(f"Reminder check failed: {e}", exc_info=True)
-        db.rollback()
+        await db.rollback()
+
+
+async def claim_notifications(db: AsyncSession, logs: list[dict]) -> dict[tuple[str, str], str]:
+    """Insert notification_logs rows unless the (snapshot, reminder time) is already logged.
+
+    Returns {(event_snapshot_id, reminder_time_id): log id} for the rows this call inserted.
+    Rows to send are claimed as "sent" and only updated if the push fails, so a successful
+    check costs one statement.
+    """
+    if not logs:
+        return {}
+    table = models.NotificationLog.__table__
+    stmt = upsert_insert(db)(table).on_conflict_do_nothing(
+        index_elements=[table.c.event_snapshot_id, table.c.reminder_time_id]
+    ).returning(table.c.id, table.c.event_snapshot_id, table.c.reminder_time_id)
+    rows = (await db.execute(stmt, logs)).all()
+    return {(row.event_snapshot_id, row.reminder_time_id): row.id for row in rows}
+
+
+# In-flight triggers_changed() checks (kept referenced until done)
+_trigger_checks: set[asyncio.Task] = set()
+
+
+def triggers_changed(user_id: str, added: set[str], removed: set[str]):
+    """A user's reminder times were edited: `added` are new or re-enabled trigger ids, `removed`
+    deleted or disabled ones. Checks the added triggers now instead of at the next cycle.
+
+    Runs in the API worker that served the edit, alongside the leader's scheduled check; the
+    notification_logs claim in check_reminders() keeps the two from both sending."""
+    metrics.incr("reminders.triggers_added", len(added))
+    metrics.incr("reminders.triggers_removed", len(removed))
+    if not added:
+        return
+    task = asyncio.get_running_loop().create_task(_check_triggers(user_id, set(added)))
+    _trigger_checks.add(task)
+    task.add_done_callback(_trigger_checks.discard)
+
+
+async def _check_triggers(user_id: str, time_ids: set[str]):
+    async with SessionLocal() as db:
+        await check_reminders(db, user_id=user_id, time_ids=time_ids)
+
+
+# ============ FRESHNESS CHECK ============
+
+async def _fetch_event(clan_tag: str, event_type: str, event_subtype: str | None) -> WarRecord | RaidRecord | None:
+    """The clan's current war (cw), CWL war of the round (cwl) or raid season (raid). Every
+    request (CWL: the group, then each war of the round) is charged to coc_api.freshness_budget."""
+    with coc_api.charged_to(coc_api.freshness_budget):
+        return await _fetch_event_records(clan_tag, event_type, event_subtype)
+
+
+async def _fetch_event_records(clan_tag: str, event_type: str, event_subtype: str | None):
+    if event_type == "cw":
+        war = await coc_api.get_current_war(clan_tag)
+        return WarRecord.from_api(war, clan_tag) if war else None
+    if event_type == "raid":
+        seasons = await coc_api.get_raid_seasons(clan_tag)
+        return RaidRecord.from_api(seasons["items"][0]) if seasons and seasons.get("items") else None
+    if event_type == "cwl" and event_subtype and event_subtype[4:].isdigit():
+        group = await coc_api.get_cwl_group(clan_tag)
+        rounds = (group or {}).get("rounds", [])
+        round_idx = int(event_subtype[4:])
+        if not 0 < round_idx <= len(rounds):
+            return None
+        for war_tag in rounds[round_idx - 1].get("warTags", []):
+            if war_tag == "#0":
+                continue
+            war = await coc_api.get_cwl_war(war_tag)
+            if war and clan_tag in (war.get("clan", {}).get("tag"), war.get("opponent", {}).get("tag")):
+                return WarRecord.from_api(war, clan_tag, round_idx)
+    return None
+
+
+# Wars fetched per CWL round at most (8 clans), on top of the group
+CWL_WARS_PER_ROUND = 4
+
+# (clan_tag, event_type, event_subtype) -> (monotonic start, fetch); shared by concurrent checks
+_fresh_fetches: dict[tuple, tuple[float, asyncio.Future]] = {}
+
+
+async def fetch_event_shared(key: tuple):
+    now = time.monotonic()
+    for other, (started, future) in list(_fresh_fetches.items()):
+        if future.done() and now - started > settings.REMINDER_FRESHNESS_MAX_AGE_SECONDS:
+            del _fresh_fetches[other]
+
+    entry = _fresh_fetches.get(key)
+    if entry is None:
+        entry = _fresh_fetches[key] = (now, asyncio.ensure_future(_fetch_event(*key)))
+        metrics.incr("reminders.freshness.fetches")
+    return await asyncio.shield(entry[1])
+
+
+def attacks_remaining_in(snapshot: models.EventSnapshot, record: WarRecord | RaidRecord | None) -> int | None:
+    """The snapshot's attacks left according to a freshly fetched war/raid (None if unknown)."""
+    if record is None:
+        return None
+    if isinstance(record, RaidRecord):
+        if record.state != "ongoing":
+            return 0
+        player = record.player(snapshot.account_tag)
+        if player is None:
+            return snapshot.attacks_remaining
+        _, attacks_used, attacks_max = player
+        return max(0, attacks_max - attacks_used)
+
+    if record.state != "inWar":
+        return 0
+    player = record.player(snapshot.account_tag)
+    if player is None:
+        return None
+    attacks_max = 1 if snapshot.event_type == "cwl" else record.attacks_per_member
+    return max(0, attacks_max - player[1])
+
+
+async def fresh_attacks_remaining(snapshots) -> dict[str, int | None]:
+    """Attacks left per snapshot id from one fresh fetch per clan and event; None where the
+    fetch failed or the budget ran out (the snapshot's own count is used then)."""
+    groups = {}
+    for snap in snapshots:
+        subtype = snap.event_subtype if snap.event_type == "cwl" else None
+        groups.setdefault((snap.clan_tag, snap.event_type, subtype), []).append(snap)
+    if not groups or settings.REMINDER_FRESHNESS_CALLS_PER_MINUTE <= 0:
+        return {}
+
+    # Reserve the pass's requests from the shared budget at once (CWL: the group and the wars of
+    # the round); fetches are charged against this process's reserve
+    try:
+        await coc_api.freshness_budget.reserve(sum(
+            1 + CWL_WARS_PER_ROUND if event_type == "cwl" else 1 for _, event_type, _ in groups
+        ))
+    except Exception as e:
+        logger.error(f"Reserving freshness requests failed: {e}")
+
+    results = await asyncio.gather(*(fetch_event_shared(key) for key in groups), return_exceptions=True)
+    remaining = {}
+    for (key, snaps), data in zip(groups.items(), results):
+        if isinstance(data, Exception):
+            if isinstance(data, coc_api.OverBudget):
+                metrics.incr("reminders.freshness.over_budget")
+            else:
+                logger.error(f"Freshness fetch for {key} failed: {data}")
+            data = None
+        for snap in snaps:
+            remaining[snap.id] = attacks_remaining_in(snap, data)
+    return remaining
+
+
+# ============ CHANGE EVENTS ============
+
+# Snapshot id -> monotonic time its attacks were all used or it ended
+_settled: dict[str, float] = {}
+SETTLED_TTL_SECONDS = 300
+
+# In-flight checks of newly started events (kept referenced until done)
+_started_checks: set[asyncio.Task] = set()
+
+
+def on_changes(events: list[change_events.ChangeEvent]):
+    now = time.monotonic()
+    started = set()
+    for event in events:
+        if event.kind == change_events.EVENT_ENDED or (
+            event.kind == change_events.ATTACK_MADE and event.attacks_remaining == 0
+        ):
+            _settled[event.snapshot_id] = now
+        elif event.kind == change_events.EVENT_STARTED and event.attacks_remaining > 0:
+            started.add(event.snapshot_id)
+            _settled.pop(event.snapshot_id, None)
+
+    for snapshot_id, settled_at in list(_settled.items()):
+        if now - settled_at > SETTLED_TTL_SECONDS:
+            del _settled[snapshot_id]
+
+    if started:
+        task = asyncio.get_running_loop().create_task(_check_snapshots(started))
+        _started_checks.add(task)
+        task.add_done_callback(_started_checks.discard)
+
+
+async def _check_snapshots(snapshot_ids: set[str]):
+    async with SessionLocal() as db:
+        await check_reminders(db, snapshot_ids=snapshot_ids)
+
+
+change_events.change_bus.subscribe(on_changes)
 
 
 async def send_reminder_notification(
     user: models.User,
     snapshot: models.EventSnapshot,
     reminder_time: models.ReminderTime,
+    attacks_remaining: int | None = None,
 ) -> bool:
-    """Build and send a reminder push notification."""
-    time_left_seconds = max(0, int((snapshot.end_time - datetime.now(timezone.utc)).total_seconds()))
+    """Build and send a reminder push notification (`attacks_remaining` overrides the snapshot's count)."""
+    time_left_seconds = max(0, int((as_utc(snapshot.end_time) - datetime.now(timezone.utc)).total_seconds()))
     time_left = format_duration(time_left_seconds)
 
     event_label = EVENT_LABELS.get(snapshot.event_type, snapshot.event_type)
@@ -117,7 +395,9 @@ async def send_reminder_notification(
         day_num = snapshot.event_subtype.replace("day_", "")
         subtype_label = f" Tag {day_num}"
 
-    title = f"⚔️ {event_label}{subtype_label} — {snapshot.attacks_remaining} Angriff(e) übrig!"
+    if attacks_remaining is None:
+        attacks_remaining = snapshot.attacks_remaining
+    title = f"⚔️ {event_label}{subtype_label} — {attacks_remaining} Angriff(e) übrig!"
 
     body_parts = [
         f"👤 {snapshot.account_name or snapshot.account_tag} ({snapshot.account_tag})",
@@ -0,0 +1,71 @@
+"""
+Scheduler — fixed-rate background jobs.
+
+Each job runs on its own cadence, so a slow poll no longer pushes back the reminder check
+and vice versa. Runs are scheduled at start + n * interval (not "interval after the last run
+finished"). A run that takes longer than its interval is an overrun: the ticks it covered are
+skipped rather than run back to back. Reported to /metrics per job:
+
+    scheduler.<job>.lag       — how late a run started relative to its tick
+    scheduler.<job>.duration  — run time
+    scheduler.<job>.overruns / scheduler.<job>.skipped_ticks
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable
+from core import query_counter
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class FixedRateJob:
+    """`run(deadline)` every `interval` seconds, first at `offset`; `deadline` is the monotonic
+    time the run should be done by (its next tick), for jobs that can shed work."""
+
+    def __init__(self, name: str, interval: float, run: Callable[[float], Awaitable[None]], offset: float = 0):
+        self.name = name
+        self.interval = interval
+        self.run = run
+        self.offset = offset
+
+    async def run_forever(self):
+        next_tick = time.monotonic() + self.offset
+        while True:
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+            started = time.monotonic()
+            metrics.observe(f"scheduler.{self.name}.lag", started - next_tick)
+
+            try:
+                with query_counter.track_queries(f"scheduler.{self.name}"):
+                    await self.run(next_tick + self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler job {self.name} failed: {e}", exc_info=True)
+
+            finished = time.monotonic()
+            metrics.observe(f"scheduler.{self.name}.duration", finished - started)
+            next_tick += self.interval
+            if finished > next_tick:
+                missed = math.ceil((finished - next_tick) / self.interval)
+                logger.warning(
+                    f"Scheduler job {self.name} overran its {self.interval}s interval "
+                    f"({finished - started:.1f}s), skipping {missed} tick(s)"
+                )
+                metrics.incr(f"scheduler.{self.name}.overruns")
+                metrics.incr(f"scheduler.{self.name}.skipped_ticks", missed)
+                next_tick += missed * self.interval
+
+
+async def run_jobs(jobs: list[FixedRateJob]):
+    """Run all jobs concurrently until cancelled."""
+    tasks = [asyncio.create_task(job.run_forever(), name=f"scheduler.{job.name}") for job in jobs]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
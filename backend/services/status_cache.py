@@ -0,0 +1,117 @@
+"""
+Status Cache — per-user cache of serialized /status, /status/summary and /bootstrap responses.
+
+Entries are invalidated when an endpoint writes a user's data or the poller publishes a
+change event for them (services.change_events), and expire after STATUS_CACHE_TTL_SECONDS
+so time-remaining fields, last_polled and other workers' writes are picked up within one
+poll interval. Each entry carries a strong ETag of its body.
+"""
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from core.config import settings
+from core.metrics import metrics
+from services.change_events import change_bus, ChangeEvent
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    created_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class _UserSlot:
+    """A user's cached responses and the generation they were built against."""
+    __slots__ = ("generation", "responses")
+
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.responses: dict[str, CachedResponse] = {}
+
+
+class StatusCache:
+    """LRU over users; each user holds one entry per response kind ('status', 'summary', ...).
+
+    A user's generation lives on their slot, so memory is bounded by max_users. Generations
+    come from one counter: a slot that was evicted and recreated never matches a stale one.
+    """
+
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _UserSlot] = OrderedDict()
+        self._next_generation = itertools.count(1)
+
+    def generation(self, user_id: str) -> int:
+        """Read before building a response; put() drops the result if the user was invalidated meanwhile."""
+        with self._lock:
+            slot = self._entries.get(user_id)
+            if slot is None:
+                slot = self._entries[user_id] = _UserSlot(next(self._next_generation))
+                self._evict()
+            return slot.generation
+
+    def get(self, user_id: str, kind: str) -> CachedResponse | None:
+        with self._lock:
+            slot = self._entries.get(user_id)
+            entry = slot.responses.get(kind) if slot is not None else None
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+                del slot.responses[kind]
+                entry = None
+            if entry is None:
+                metrics.incr("status_cache.miss")
+                return None
+            self._entries.move_to_end(user_id)
+            metrics.incr("status_cache.hit")
+            return entry
+
+    def put(self, user_id: str, kind: str, body: bytes, generation: int) -> CachedResponse:
+        entry = CachedResponse(body=body, etag=make_etag(body), created_at=time.monotonic())
+        with self._lock:
+            # Evicted, cleared or invalidated since generation() was read
+            slot = self._entries.get(user_id)
+            if slot is None or slot.generation != generation:
+                return entry
+            slot.responses[kind] = entry
+            self._entries.move_to_end(user_id)
+        return entry
+
+    def invalidate(self, *user_ids: str):
+        with self._lock:
+            for user_id in user_ids:
+                slot = self._entries.get(user_id)
+                if slot is not None:
+                    slot.generation = next(self._next_generation)
+                    slot.responses.clear()
+        metrics.incr("status_cache.invalidations", len(user_ids))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+
+status_cache = StatusCache(
+    max_users=settings.STATUS_CACHE_MAX_USERS,
+    ttl_seconds=settings.STATUS_CACHE_TTL_SECONDS,
+)
+
+
+def on_changes(events: list[ChangeEvent]):
+    status_cache.invalidate(*{event.user_id for event in events})
+
+
+change_bus.subscribe(on_changes)
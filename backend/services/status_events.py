@@ -0,0 +1,167 @@
+"""
+Status Events — pushes status changes to open /status/stream connections (server-sent events).
+
+Writers publish the user's new status version after they commit; the poller's snapshot
+changes arrive through the change event bus (services.change_events). Each connection holds one
+Subscriber that only remembers the newest version it was told about, so a burst of changes
+coalesces into a single wake-up and memory per idle connection stays constant. On wake-up the
+stream sends a /status/delta from its cursor, read through a short-lived session — no database
+connection is held while a stream is idle.
+
+Writers in other worker processes are picked up by sync_versions(), which checks the
+versions of all subscribed users in one query per heartbeat.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from core.config import settings
+from core.metrics import metrics
+from database import SessionLocal
+from services import status_view
+from services.change_events import change_bus, ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+SYNC_CHUNK_SIZE = 500
+RECONNECT_DELAY_MS = 5000
+
+
+class TooManySubscribers(Exception):
+    """The user already has the maximum number of open streams on this worker."""
+
+
+class Subscriber:
+    """One open stream: the newest known version and a wake-up flag."""
+    __slots__ = ("user_id", "version", "_event")
+
+    def __init__(self, user_id: str, version: int):
+        self.user_id = user_id
+        self.version = version
+        self._event = asyncio.Event()
+
+    def notify(self, version: int):
+        if version > self.version:
+            self.version = version
+            self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a newer version. False if the timeout (heartbeat) passed first."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class StatusBroker:
+    """Per-worker registry of open streams, keyed by user."""
+
+    def __init__(self, max_per_user: int):
+        self.max_per_user = max_per_user
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        self._count = 0
+
+    def subscribe(self, user_id: str, version: int) -> Subscriber:
+        """Reserve one of the user's stream slots; raises TooManySubscribers when they're all taken."""
+        subscribers = self._subscribers.setdefault(user_id, set())
+        if len(subscribers) >= self.max_per_user:
+            raise TooManySubscribers(user_id)
+        subscriber = Subscriber(user_id, version)
+        subscribers.add(subscriber)
+        self._count += 1
+        metrics.incr("status_stream.connections")
+        metrics.gauge("status_stream.open", self._count)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Release the subscriber's slot (safe to call more than once)."""
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.user_id]
+            self._count -= 1
+            metrics.gauge("status_stream.open", self._count)
+
+    def publish(self, versions: dict[str, int]):
+        """Wake the streams of these users ({user_id: committed status version})."""
+        for user_id, version in versions.items():
+            for subscriber in self._subscribers.get(user_id, ()):
+                subscriber.notify(version)
+
+    def connection_count(self) -> int:
+        return self._count
+
+    async def sync_versions(self, db: AsyncSession):
+        """Publish versions committed by other workers for all subscribed users."""
+        user_ids = list(self._subscribers)
+        for i in range(0, len(user_ids), SYNC_CHUNK_SIZE):
+            result = await db.execute(select(models.UserStatus.user_id, models.UserStatus.version).where(
+                models.UserStatus.user_id.in_(user_ids[i:i + SYNC_CHUNK_SIZE])
+            ))
+            self.publish({user_id: version for user_id, version in result.all()})
+
+
+# Singleton broker
+status_broker = StatusBroker(max_per_user=settings.STATUS_STREAM_MAX_PER_USER)
+
+
+def on_changes(events: list[ChangeEvent]):
+    versions = {}
+    for event in events:
+        versions[event.user_id] = max(event.version, versions.get(event.user_id, 0))
+    status_broker.publish(versions)
+
+
+change_bus.subscribe(on_changes)
+
+
+def format_event(delta) -> str:
+    """SSE frame; the id is the version cursor, sent back by the browser as Last-Event-ID."""
+    return f"id: {delta.version}\nevent: status\ndata: {delta.model_dump_json()}\n\n"
+
+
+async def status_stream(subscriber: Subscriber, since: int | None, broker: StatusBroker = status_broker):
+    """SSE body: a delta from `since`, then one delta per change and a comment per heartbeat.
+
+    The caller subscribes before the response starts (so a full broker is answered with an
+    error status, not a broken stream); the slot is released when the stream ends.
+    """
+    user_id = subscriber.user_id
+    heartbeat = settings.STATUS_STREAM_HEARTBEAT_SECONDS
+    cursor = since
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        while True:
+            async with SessionLocal() as db:
+                row = await db.get(models.UserStatus, user_id)
+                if row is None:
+                    return
+                delta = await status_view.build_status_delta(db, row, cursor, datetime.now(timezone.utc))
+
+            if delta.full or delta.events or delta.removed or delta.version != cursor:
+                cursor = delta.version
+                yield format_event(delta)
+            subscriber.version = max(subscriber.version, cursor)
+
+            while not await subscriber.wait(heartbeat):
+                yield ": heartbeat\n\n"
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+async def sync_loop():
+    """Background task: pick up status versions committed by other workers once per heartbeat."""
+    while True:
+        await asyncio.sleep(settings.STATUS_STREAM_HEARTBEAT_SECONDS)
+        if not status_broker.connection_count():
+            continue
+        try:
+            async with SessionLocal() as db:
+                await status_broker.sync_versions(db)
+        except Exception as e:
+            logger.error(f"Status stream sync failed: {e}")
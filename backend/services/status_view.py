@@ -0,0 +1,340 @@
+"""
+Status View — materialized per-user status rows (user_status) maintained by the poller.
+
+refresh_user_status() recomputes the aggregate from a user's active snapshots inside the
+writer's transaction; the status endpoints read the row by primary key and only fill in
+the time-dependent fields (time remaining) when rendering the payload dicts, which go
+straight to serializers.dumps() without building response models.
+
+Each row also carries a monotonic version. Writers leave changed snapshots with a NULL
+version; refresh_user_status() bumps the user's version and stamps them with it, so
+/status/delta can return everything with version > cursor.
+"""
+from datetime import datetime
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+import schemas
+from database import upsert_insert
+import serializers
+from services import data_poller
+
+EVENT_LABELS = {"cw": "Clan War", "cwl": "CWL", "raid": "Raid Weekend"}
+
+
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    """Store datetimes the way the database returns them (naive UTC)."""
+    return data_poller.as_utc(dt).replace(tzinfo=None) if dt is not None else None
+
+
+def _iso(dt: datetime | None) -> str | None:
+    return _naive_utc(dt).isoformat() if dt is not None else None
+
+
+def _parse(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def snapshot_item(snap: models.EventSnapshot) -> dict:
+    """Stored (time-independent) form of an active snapshot."""
+    return {
+        "id": snap.id,
+        "account_tag": snap.account_tag,
+        "account_name": snap.account_name,
+        "clan_tag": snap.clan_tag,
+        "clan_name": snap.clan_name,
+        "event_type": snap.event_type,
+        "event_subtype": snap.event_subtype,
+        "state": snap.state,
+        "attacks_used": snap.attacks_used,
+        "attacks_max": snap.attacks_max,
+        "end_time": _iso(snap.end_time),
+        "start_time": _iso(snap.start_time),
+        "opponent_name": snap.opponent_name,
+        "opponent_tag": snap.opponent_tag,
+        "war_size": snap.war_size,
+    }
+
+
+def build_status_values(snapshots: list[models.EventSnapshot]) -> dict:
+    """Aggregate a user's active snapshots (ordered by end_time) into user_status columns."""
+    last_polled = None
+    total_missing = 0
+    by_type = {}
+    next_deadline = None
+
+    for snap in snapshots:
+        if snap.polled_at:
+            polled_at = _naive_utc(snap.polled_at)
+            if last_polled is None or polled_at > last_polled:
+                last_polled = polled_at
+
+        remaining = snap.attacks_remaining
+        if remaining <= 0:
+            continue
+
+        total_missing += remaining
+        counts = by_type.setdefault(snap.event_type, {"count": 0, "account_tags": set()})
+        counts["count"] += remaining
+        counts["account_tags"].add(snap.account_tag)
+
+        end_time = _naive_utc(snap.end_time)
+        if end_time and (next_deadline is None or end_time < next_deadline):
+            next_deadline = end_time
+
+    return {
+        "last_polled": last_polled,
+        "total_missing": total_missing,
+        "by_event_type": {
+            et: {"count": c["count"], "accounts": len(c["account_tags"])} for et, c in by_type.items()
+        },
+        "next_deadline": next_deadline,
+        "items": [snapshot_item(snap) for snap in snapshots],
+    }
+
+
+async def _lock_status_rows(db: AsyncSession, user_ids) -> dict[str, models.UserStatus]:
+    return {
+        row.user_id: row for row in (await db.execute(
+            select(models.UserStatus).where(models.UserStatus.user_id.in_(user_ids))
+            .order_by(models.UserStatus.user_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )).scalars()
+    }
+
+
+async def refresh_user_status(
+    db: AsyncSession, user_ids, changed=(), removed=()
+) -> dict[str, models.UserStatus]:
+    """Recompute user_status rows for these users. Runs in (and is committed by) the caller's transaction.
+
+    `changed`: users with inserted/updated/deactivated snapshots (version NULL) — bump and stamp.
+    `removed`: users whose snapshots were hard-deleted — bump and move the delta floor, since
+    deletions can't be replayed and older cursors need a full resync.
+    """
+    changed, removed = set(changed), set(removed)
+    user_ids = set(user_ids) | changed | removed
+    if not user_ids:
+        return {}
+
+    # Pending snapshot changes must be visible to the query below
+    await db.flush()
+
+    # Lock the rows first (PostgreSQL; SQLite serializes writers anyway): poller shards may
+    # refresh the same user concurrently, and the snapshot read below must then include the
+    # other shard's committed writes and the version it bumped
+    existing = await _lock_status_rows(db, user_ids)
+
+    # populate_existing: snapshots are written with Core upserts, which don't refresh
+    # instances already in this session
+    result = await db.execute(select(models.EventSnapshot).where(
+        models.EventSnapshot.user_id.in_(user_ids),
+        models.EventSnapshot.is_active == True,
+    ).order_by(models.EventSnapshot.user_id, models.EventSnapshot.end_time.asc())
+     .execution_options(populate_existing=True))
+    snapshots_by_user = {user_id: [] for user_id in user_ids}
+    for snap in result.scalars():
+        snapshots_by_user[snap.user_id].append(snap)
+
+    now = datetime.utcnow()
+    new_rows = []
+    for user_id, snapshots in snapshots_by_user.items():
+        values = build_status_values(snapshots)
+        bump = user_id in changed or user_id in removed
+        row = existing.get(user_id)
+        if row is None:
+            new_rows.append(dict(values, user_id=user_id, updated_at=now, version=int(bump),
+                                 floor_version=int(bump) if user_id in removed else 0))
+            continue
+        for key, value in values.items():
+            setattr(row, key, value)
+        row.updated_at = now
+        if bump:
+            row.version += 1
+        if user_id in removed:
+            row.floor_version = row.version
+
+    if new_rows:
+        # Another process may be creating the same rows: rows it got to first are skipped
+        # here and redone against its committed row
+        inserted = await db.scalars(
+            upsert_insert(db)(models.UserStatus).on_conflict_do_nothing(index_elements=["user_id"])
+            .returning(models.UserStatus),
+            new_rows,
+        )
+        existing.update((row.user_id, row) for row in inserted)
+        raced = {values["user_id"] for values in new_rows} - existing.keys()
+        if raced:
+            existing.update(await refresh_user_status(db, raced, changed & raced, removed & raced))
+
+    if changed:
+        snap = models.EventSnapshot.__table__
+        await db.execute(
+            update(snap)
+            .where(snap.c.user_id == bindparam("row_user_id"), snap.c.version.is_(None))
+            .values(version=bindparam("row_version")),
+            [{"row_user_id": user_id, "row_version": existing[user_id].version} for user_id in changed],
+        )
+    return existing
+
+
+def _time_remaining(end_time: datetime | None, now: datetime) -> tuple[int, str]:
+    if not end_time:
+        return 0, ""
+    seconds = max(0, int((data_poller.as_utc(end_time) - now).total_seconds()))
+    return seconds, data_poller.format_duration(seconds)
+
+
+def event_payload(item: dict, now: datetime) -> dict:
+    """schemas.EventSnapshotResponse as a plain dict (same field order and formats)."""
+    remaining_secs, remaining_formatted = _time_remaining(_parse(item["end_time"]), now)
+    return {
+        "id": item["id"],
+        "account_tag": item["account_tag"],
+        "account_name": item["account_name"],
+        "clan_tag": item["clan_tag"],
+        "clan_name": item["clan_name"],
+        "event_type": item["event_type"],
+        "event_subtype": item["event_subtype"],
+        "state": item["state"],
+        "attacks_used": item["attacks_used"],
+        "attacks_max": item["attacks_max"],
+        "attacks_remaining": max(0, item["attacks_max"] - item["attacks_used"]),
+        "end_time": item["end_time"],
+        "start_time": item["start_time"],
+        "time_remaining_seconds": remaining_secs,
+        "time_remaining_formatted": remaining_formatted,
+        "opponent_name": item["opponent_name"],
+        "opponent_tag": item["opponent_tag"],
+        "war_size": item["war_size"],
+    }
+
+
+def status_payload(row: models.UserStatus, now: datetime) -> dict:
+    """schemas.StatusResponse as a plain dict, ready for serializers.dumps()."""
+    return {
+        "last_polled": serializers.isoformat(row.last_polled),
+        "events": [event_payload(item, now) for item in row.items],
+    }
+
+
+def render_event(item: dict, now: datetime) -> schemas.EventSnapshotResponse:
+    return schemas.EventSnapshotResponse(**event_payload(item, now))
+
+
+async def build_status_delta(
+    db: AsyncSession, row: models.UserStatus, since: int | None, now: datetime
+) -> schemas.StatusDeltaResponse:
+    """Changes after cursor `since`, or a full resync if the cursor is missing, too old or unknown."""
+    if since is None or since < row.floor_version or since > row.version:
+        return schemas.StatusDeltaResponse(
+            version=row.version,
+            full=True,
+            last_polled=row.last_polled,
+            events=[render_event(item, now) for item in row.items],
+        )
+
+    delta = schemas.StatusDeltaResponse(version=row.version, last_polled=row.last_polled)
+    if since == row.version:
+        return delta
+
+    result = await db.execute(select(models.EventSnapshot).where(
+        models.EventSnapshot.user_id == row.user_id,
+        models.EventSnapshot.version > since,
+    ).order_by(models.EventSnapshot.end_time.asc()))
+    for snap in result.scalars():
+        if snap.is_active:
+            delta.events.append(render_event(snapshot_item(snap), now))
+        else:
+            delta.removed.append(snap.id)
+    return delta
+
+
+def summary_payload(row: models.UserStatus, now: datetime) -> dict:
+    """schemas.StatusSummaryResponse as a plain dict, ready for serializers.dumps()."""
+    items = []
+    for item in row.items:
+        remaining = max(0, item["attacks_max"] - item["attacks_used"])
+        if remaining <= 0:
+            continue
+
+        end_time = _parse(item["end_time"])
+        _, remaining_formatted = _time_remaining(end_time, now)
+
+        label = EVENT_LABELS.get(item["event_type"], item["event_type"])
+        if item["event_subtype"]:
+            day = item["event_subtype"].replace("day_", "")
+            label = f"{label} Tag {day}"
+
+        items.append({
+            "account_display": f"{item['account_name'] or 'Unknown'} ({item['account_tag']})",
+            "clan_display": f"{item['clan_name'] or 'Unknown'} ({item['clan_tag']})",
+            "event_label": label,
+            "attacks_remaining": remaining,
+            "end_time_formatted": remaining_formatted,
+            "end_time_iso": item["end_time"],
+        })
+
+    return {
+        "last_polled": serializers.isoformat(row.last_polled),
+        "total_missing": row.total_missing,
+        "by_event_type": {
+            et: {"count": counts["count"], "accounts": counts["accounts"]}
+            for et, counts in row.by_event_type.items()
+        },
+        "items": items,
+    }
+
+
+# ============ COMPACT (MessagePack) FORMAT ============
+# No time-dependent fields: clients compute time remaining from the end timestamp.
+
+def _cwl_day(event_subtype: str | None) -> int:
+    if event_subtype and event_subtype.startswith("day_") and event_subtype[4:].isdigit():
+        return int(event_subtype[4:])
+    return 0
+
+
+def status_compact(row: models.UserStatus) -> dict:
+    """{"v", "p": last polled, "e": [[id, account_tag, account_name, clan_tag, clan_name, type,
+    cwl_day, state, attacks_used, attacks_max, end, start, opponent_name, opponent_tag, war_size]]}"""
+    return {
+        "v": 1,
+        "p": serializers.timestamp(row.last_polled),
+        "e": [
+            [
+                item["id"], item["account_tag"], item["account_name"], item["clan_tag"], item["clan_name"],
+                serializers.EVENT_TYPE_CODES.get(item["event_type"], 0), _cwl_day(item["event_subtype"]),
+                serializers.STATE_CODES.get(item["state"], 0), item["attacks_used"], item["attacks_max"],
+                serializers.timestamp(item["end_time"]), serializers.timestamp(item["start_time"]),
+                item["opponent_name"], item["opponent_tag"], item["war_size"],
+            ]
+            for item in row.items
+        ],
+    }
+
+
+def summary_compact(row: models.UserStatus) -> dict:
+    """{"v", "p": last polled, "n": total missing, "t": [[type, count, accounts]],
+    "i": [[account_tag, account_name, clan_tag, clan_name, type, cwl_day, attacks_remaining, end]]}"""
+    items = []
+    for item in row.items:
+        remaining = max(0, item["attacks_max"] - item["attacks_used"])
+        if remaining <= 0:
+            continue
+        items.append([
+            item["account_tag"], item["account_name"], item["clan_tag"], item["clan_name"],
+            serializers.EVENT_TYPE_CODES.get(item["event_type"], 0), _cwl_day(item["event_subtype"]),
+            remaining, serializers.timestamp(item["end_time"]),
+        ])
+    return {
+        "v": 1,
+        "p": serializers.timestamp(row.last_polled),
+        "n": row.total_missing,
+        "t": [
+            [serializers.EVENT_TYPE_CODES.get(et, 0), counts["count"], counts["accounts"]]
+            for et, counts in row.by_event_type.items()
+        ],
+        "i": items,
+    }
@@ -0,0 +1,125 @@
+"""
+Targeted Poll — fetches and processes a newly added clan or account right away instead of
+waiting up to a full POLL_INTERVAL_SECONDS for the next poll cycle.
+
+Endpoints enqueue a job after committing; one worker task per process drains the queue in
+priority order (new clans first, they usually produce the most events). Jobs reuse the
+poller's pieces: clans are fetched with fetch_clan_events_shared(), so a clan the cycle is
+fetching (or just fetched) costs no extra API requests, and snapshots are written with
+process_account_clans(). Targeted polls run in every API worker while the cycle runs in the
+leader (or the shard pollers): the snapshot upsert lets them write the same rows at once.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from core.config import settings
+from core.metrics import metrics
+from database import SessionLocal
+from services import data_poller
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLAN = 0
+PRIORITY_ACCOUNT = 1
+
+
+class TargetedPollQueue:
+    """Bounded priority queue of (kind, user_id, tag) jobs; a job already waiting isn't queued twice."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._queue: asyncio.PriorityQueue | None = None
+        self._pending: set[tuple[str, str, str]] = set()
+        self._sequence = itertools.count()
+
+    def _get_queue(self) -> asyncio.PriorityQueue:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        return self._queue
+
+    def enqueue(self, kind: str, user_id: str, tag: str) -> bool:
+        job = (kind, user_id, tag)
+        if job in self._pending:
+            return False
+        if len(self._pending) >= self.max_size:
+            metrics.incr("targeted_poll.dropped")
+            logger.warning(f"Targeted poll queue full, dropping {kind} {tag} (next poll cycle covers it)")
+            return False
+        priority = PRIORITY_CLAN if kind == "clan" else PRIORITY_ACCOUNT
+        self._pending.add(job)
+        self._get_queue().put_nowait((priority, next(self._sequence), time.monotonic(), job))
+        metrics.incr("targeted_poll.queued")
+        return True
+
+    async def get(self) -> tuple[tuple[str, str, str], float]:
+        """Next job and the monotonic time it was queued."""
+        _, _, queued_at, job = await self._get_queue().get()
+        self._pending.discard(job)
+        return job, queued_at
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+# Singleton queue
+targeted_polls = TargetedPollQueue(max_size=settings.TARGETED_POLL_QUEUE_SIZE)
+
+
+def poll_clan_soon(user_id: str, clan_tag: str):
+    targeted_polls.enqueue("clan", user_id, clan_tag)
+
+
+def poll_account_soon(user_id: str, account_tag: str):
+    targeted_polls.enqueue("account", user_id, account_tag)
+
+
+async def run_targeted_poll(db: AsyncSession, kind: str, user_id: str, tag: str) -> set[str]:
+    """Fetch and process one new clan (all of the user's accounts) or account (all of the user's clans)."""
+    user = await db.get(models.User, user_id)
+    if user is None:
+        return set()
+
+    clans = (await db.execute(select(models.TrackedClan).where(models.TrackedClan.user_id == user_id))).scalars().all()
+    accounts = (await db.execute(select(models.PlayerAccount).where(
+        models.PlayerAccount.user_id == user_id
+    ))).scalars().all()
+    if kind == "clan":
+        clans = [tc for tc in clans if tc.clan_tag == tag]
+    else:
+        accounts = [a for a in accounts if a.tag == tag]
+    if not clans or not accounts:
+        return set()
+
+    clan_data = {}
+    for tc in clans:
+        try:
+            clan_data[tc.clan_tag] = await data_poller.fetch_clan_events_shared(
+                tc.clan_tag, max_age=settings.TARGETED_POLL_REUSE_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Error fetching clan {tc.clan_tag}: {e}")
+            continue
+        name = clan_data[tc.clan_tag].clan_name
+        if name:
+            tc.clan_name = name
+
+    async with data_poller.write_lock:
+        for account in accounts:
+            await data_poller.process_account_clans(db, user, account, clans, clan_data)
+        return await data_poller.commit_snapshot_writes(db)
+
+
+async def worker():
+    """Background task: drain the targeted poll queue."""
+    while True:
+        (kind, user_id, tag), queued_at = await targeted_polls.get()
+        try:
+            async with SessionLocal() as db:
+                await run_targeted_poll(db, kind, user_id, tag)
+            metrics.observe("targeted_poll.latency", time.monotonic() - queued_at)
+        except Exception as e:
+            logger.error(f"Targeted poll for {kind} {tag} failed: {e}")
@@ -0,0 +1,69 @@
+"""
+Bootstrap tests — one response with the four startup payloads, query budget and conditional GET.
+"""
+import pytest
+
+import main
+import models
+from conftest import make_user, make_snapshot
+from core.query_counter import QUERY_COUNT_HEADER
+from services.status_cache import status_cache
+
+
+def _seed(db, count: int) -> str:
+    user = make_user(db)
+    main.create_default_reminders(db, user.id)
+    for i in range(count):
+        db.add(models.PlayerAccount(user_id=user.id, tag=f"#P{i}", name=f"Player {i}"))
+        db.add(models.TrackedClan(user_id=user.id, clan_tag=f"#C{i}", clan_name=f"Clan {i}"))
+        make_snapshot(db, user.id, account_tag=f"#P{i}", clan_tag=f"#C{i}")
+    db.commit()
+    status_cache.clear()
+    return user.id
+
+
+@pytest.mark.parametrize("count", [1, 20])
+def test_bootstrap_matches_individual_endpoints(client, db, count):
+    user_id = _seed(db, count)
+    base = f"/api/v1/users/{user_id}"
+
+    response = client.get(f"{base}/bootstrap")
+    status_cache.clear()
+
+    assert response.status_code == 200
+    # status row (+ materialization on first read), accounts, clans, reminder configs, times
+    assert int(response.headers[QUERY_COUNT_HEADER]) <= 10
+    body = response.json()
+    assert body["accounts"] == client.get(f"{base}/accounts").json()
+    assert body["clans"] == client.get(f"{base}/clans").json()
+    assert body["reminders"] == client.get(f"{base}/reminders").json()["reminders"]
+    status = client.get(f"{base}/status").json()
+    assert [e["id"] for e in body["status"]["events"]] == [e["id"] for e in status["events"]]
+
+
+def test_bootstrap_query_count_with_materialized_status(client, db):
+    user_id = _seed(db, 5)
+    client.get(f"/api/v1/users/{user_id}/status")
+    status_cache.clear()
+
+    response = client.get(f"/api/v1/users/{user_id}/bootstrap")
+
+    assert int(response.headers[QUERY_COUNT_HEADER]) == 5
+
+
+def test_bootstrap_conditional_get_and_invalidation(client, db):
+    user_id = _seed(db, 1)
+    url = f"/api/v1/users/{user_id}/bootstrap"
+
+    first = client.get(url)
+    not_modified = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+    client.patch(f"/api/v1/users/{user_id}/reminders/cw", json={"enabled": False})
+    changed = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+
+    assert not_modified.status_code == 304
+    assert changed.status_code == 200
+    assert next(r for r in changed.json()["reminders"] if r["event_type"] == "cw")["enabled"] is False
+
+
+def test_bootstrap_unknown_user(client):
+    assert client.get("/api/v1/users/nope/bootstrap").status_code == 404
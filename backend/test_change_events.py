@@ -0,0 +1,196 @@
+"""
+Change event tests — typed snapshot diffs from the poller and the consumers on the bus.
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.config import settings
+from database import create_db_engine
+from core.query_counter import QUERY_COUNT_HEADER
+from services import coc_api, data_poller, reminder_engine
+from services.change_events import (
+    change_bus, diff_snapshot, ATTACK_MADE, EVENT_STARTED, EVENT_ENDED, PLAYER_JOINED_RAID, SNAPSHOT_UPDATED,
+)
+from services.status_cache import status_cache
+
+
+@pytest.mark.parametrize("previous, values, event_type, kinds", [
+    (None, {"is_active": True, "attacks_used": 0}, "cw", [EVENT_STARTED]),
+    (None, {"is_active": True, "attacks_used": 2}, "raid", [EVENT_STARTED, PLAYER_JOINED_RAID]),
+    ({"is_active": True, "attacks_used": 0}, {"is_active": True, "attacks_used": 1}, "cw", [ATTACK_MADE]),
+    ({"is_active": True, "attacks_used": 1}, {"is_active": False, "attacks_used": 2}, "cw", [ATTACK_MADE, EVENT_ENDED]),
+    ({"is_active": True, "attacks_used": 0}, {"is_active": True, "attacks_used": 1}, "raid", [PLAYER_JOINED_RAID, ATTACK_MADE]),
+    ({"is_active": False, "attacks_used": 0}, {"is_active": True, "attacks_used": 0}, "cw", [EVENT_STARTED]),
+    ({"is_active": True, "attacks_used": 0}, {"is_active": True, "attacks_used": 0}, "cw", [SNAPSHOT_UPDATED]),
+])
+def test_diff_snapshot(previous, values, event_type, kinds):
+    assert diff_snapshot(previous, values, event_type) == kinds
+
+
+@pytest.fixture
+def clan(monkeypatch):
+    """Serves #CLAN's current events (mutable) to the poller."""
+    end = (datetime.now(timezone.utc) + timedelta(hours=2)).strftime("%Y%m%dT%H%M%S.000Z")
+    events = {
+        "cw": {
+            "state": "inWar", "attacksPerMember": 2, "teamSize": 5, "endTime": end,
+            "clan": {"tag": "#CLAN", "name": "Clan", "members": [{"tag": "#P1", "name": "P One", "attacks": []}]},
+            "opponent": {"tag": "#OPP", "name": "Opp", "members": []},
+        },
+        "raid": None,
+    }
+
+    async def fetch_clan_events(clan_tag):
+        return data_poller.ClanEvents(
+            cw=events["cw"] and data_poller.WarRecord.from_api(events["cw"], clan_tag),
+            raid=events["raid"] and data_poller.RaidRecord.from_api(events["raid"]),
+            clan_name="Clan",
+            member_tags={"#P1"},
+        )
+
+    async def get_player(tag):
+        return None
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    monkeypatch.setattr(data_poller, "_clan_fetches", {})
+    return events
+
+
+@pytest.fixture
+def published():
+    received = []
+    change_bus.subscribe(received.extend)
+    yield received
+    change_bus.unsubscribe(received.extend)
+
+
+def _seed(db) -> str:
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P One"))
+    db.add(models.TrackedClan(user_id=user.id, clan_tag="#CLAN", clan_name="Clan"))
+    db.commit()
+    return user.id
+
+
+def _poll(published) -> list[tuple[str, str]]:
+    published.clear()
+    run_async(data_poller.poll_all_users)
+    return [(event.kind, event.event_type) for event in published]
+
+
+def test_poll_publishes_attack_and_end_events(db, clan, published):
+    user_id = _seed(db)
+
+    assert _poll(published) == [(EVENT_STARTED, "cw")]
+    assert _poll(published) == []
+
+    clan["cw"]["clan"]["members"][0]["attacks"] = [{"stars": 3}]
+    assert _poll(published) == [(ATTACK_MADE, "cw")]
+    assert published[0].attacks_remaining == 1
+
+    clan["cw"]["clan"]["members"][0]["attacks"].append({"stars": 2})
+    assert _poll(published) == [(ATTACK_MADE, "cw"), (EVENT_ENDED, "cw")]
+    event = published[-1]
+    assert event.user_id == user_id
+    assert event.version == db.get(models.UserStatus, user_id).version
+
+
+def test_first_raid_attack_is_a_join(db, clan, published):
+    _seed(db)
+    end = clan["cw"]["endTime"]
+    clan["cw"] = None
+    clan["raid"] = {"state": "ongoing", "endTime": end, "members": []}
+
+    assert _poll(published) == [(EVENT_STARTED, "raid")]
+
+    clan["raid"]["members"] = [{"tag": "#P1", "name": "P One", "attacks": 1, "attackLimit": 5, "bonusAttackLimit": 1}]
+    assert _poll(published) == [(PLAYER_JOINED_RAID, "raid"), (ATTACK_MADE, "raid")]
+
+
+def test_status_cache_survives_polls_without_changes(client, db, clan, published):
+    user_id = _seed(db)
+    _poll(published)
+    client.get(f"/api/v1/users/{user_id}/status")
+
+    _poll(published)
+    assert int(client.get(f"/api/v1/users/{user_id}/status").headers[QUERY_COUNT_HEADER]) == 0
+
+    clan["cw"]["clan"]["members"][0]["attacks"] = [{"stars": 3}]
+    _poll(published)
+    response = client.get(f"/api/v1/users/{user_id}/status")
+    assert int(response.headers[QUERY_COUNT_HEADER]) > 0
+    assert response.json()["events"][0]["attacks_used"] == 1
+    status_cache.clear()
+
+
+def test_reminder_is_not_sent_after_the_attack_event(db, monkeypatch):
+    sent = []
+
+    async def send_push(token, title, body, data):
+        sent.append(data["account_tag"])
+        return True
+
+    monkeypatch.setattr(reminder_engine.fcm_service, "send_push", send_push)
+    monkeypatch.setattr(reminder_engine, "fetch_event_shared", lambda key: asyncio.sleep(0))
+    monkeypatch.setattr(reminder_engine, "_settled", {})
+    user = make_user(db)
+    config = models.ReminderConfig(user_id=user.id, event_type="cw", enabled=True)
+    db.add(config)
+    db.flush()
+    db.add(models.ReminderTime(reminder_config_id=config.id, minutes_before_end=60, enabled=True))
+    end_time = datetime.now(timezone.utc) + timedelta(minutes=60)
+    attacked = make_snapshot(db, user.id, account_tag="#ATTACKED", end_time=end_time)
+    make_snapshot(db, user.id, account_tag="#WAITING", end_time=end_time)
+    db.commit()
+
+    # The poller committed the attack after this check loaded the snapshot
+    reminder_engine.on_changes([reminder_engine.change_events.ChangeEvent(
+        kind=ATTACK_MADE, user_id=user.id, snapshot_id=attacked.id, version=1,
+        event_type="cw", attacks_used=2, attacks_max=2,
+    )])
+    run_async(reminder_engine.check_reminders)
+
+    assert sent == ["#WAITING"]
+
+
+def test_reminder_checked_by_two_processes_is_sent_once(db, monkeypatch):
+    """The leader's scheduled check and a snapshot writer's on_changes() check race for one trigger."""
+    sent = []
+
+    async def send_push(token, title, body, data):
+        sent.append(data["account_tag"])
+        await asyncio.sleep(0.05)
+        return True
+
+    monkeypatch.setattr(reminder_engine.fcm_service, "send_push", send_push)
+    monkeypatch.setattr(reminder_engine, "fetch_event_shared", lambda key: asyncio.sleep(0))
+    monkeypatch.setattr(reminder_engine, "_settled", {})
+    user = make_user(db)
+    config = models.ReminderConfig(user_id=user.id, event_type="cw", enabled=True)
+    db.add(config)
+    db.flush()
+    db.add(models.ReminderTime(reminder_config_id=config.id, minutes_before_end=60, enabled=True))
+    make_snapshot(db, user.id, account_tag="#DUE", end_time=datetime.now(timezone.utc) + timedelta(minutes=60))
+    db.commit()
+
+    async def scenario():
+        engines = [create_db_engine(settings.DATABASE_URL) for _ in range(2)]
+        try:
+            await asyncio.gather(*(
+                reminder_engine.check_reminders(AsyncSession(engine, expire_on_commit=False))
+                for engine in engines
+            ))
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    asyncio.run(scenario())
+
+    assert sent == ["#DUE"]
+    assert [status for status, in db.query(models.NotificationLog.status)] == ["sent"]
@@ -0,0 +1,70 @@
+"""
+CoC decode tests — projected responses keep every field the poller reads; fast timestamp parsing.
+"""
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from services import coc_decode
+from services.data_poller import RaidRecord, WarRecord, parse_coc_timestamp
+
+needs_msgspec = pytest.mark.skipif(coc_decode.msgspec is None, reason="msgspec not installed")
+
+WAR = json.dumps({
+    "state": "inWar", "teamSize": 2, "attacksPerMember": 2, "startTime": "20260208T143000.000Z",
+    "endTime": "20260209T143000.000Z", "preparationStartTime": "20260207T143000.000Z",
+    "clan": {"tag": "#CLAN", "name": "Clan", "badgeUrls": {"small": "s.png"}, "stars": 5, "members": [
+        {"tag": "#P1", "name": "P One", "mapPosition": 1, "townhallLevel": 15,
+         "attacks": [{"defenderTag": "#O1", "stars": 3, "destructionPercentage": 100, "order": 1}],
+         "bestOpponentAttack": {"attackerTag": "#O2", "stars": 1}},
+        {"tag": "#P2", "name": "P Two", "mapPosition": 2},
+    ]},
+    "opponent": {"tag": "#OPP", "name": "Opp", "badgeUrls": {"small": "s.png"}, "members": [
+        {"tag": "#O1", "name": "O One", "attacks": [{"defenderTag": "#P2", "stars": 2}]},
+    ]},
+}).encode()
+RAID = json.dumps({"items": [{
+    "state": "ongoing", "startTime": "20260206T070000.000Z", "endTime": "20260209T070000.000Z",
+    "capitalTotalLoot": 1000, "attackLog": [{"defender": {"tag": "#D"}, "attackCount": 3}],
+    "members": [{"tag": "#P1", "name": "P One", "attacks": 4, "attackLimit": 5, "bonusAttackLimit": 1,
+                 "capitalResourcesLooted": 900}],
+}]}).encode()
+
+
+def _records(war: dict, raid: dict) -> tuple:
+    war_record = WarRecord.from_api(war, "#CLAN")
+    raid_record = RaidRecord.from_api(raid["items"][0])
+    return tuple(getattr(war_record, f) for f in WarRecord.__slots__), tuple(getattr(raid_record, f) for f in RaidRecord.__slots__)
+
+
+@needs_msgspec
+def test_projection_yields_the_same_records_as_a_full_decode():
+    projected = coc_decode.decode("war", WAR)
+    assert "bestOpponentAttack" not in projected["clan"]["members"][0]
+    assert "badgeUrls" not in projected["opponent"]
+    assert _records(projected, coc_decode.decode("raid_seasons", RAID)) == _records(json.loads(WAR), json.loads(RAID))
+
+
+@needs_msgspec
+def test_unexpected_shape_falls_back_to_a_full_decode():
+    body = b'{"tag": "#P1", "name": null, "clan": {"tag": "#C", "name": "Clan"}, "expLevel": 200}'
+    assert coc_decode.decode("player", body) == json.loads(body)
+
+
+def test_fast_decode_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(coc_decode.settings, "COC_FAST_DECODE", False)
+    body = b'{"tag": "#C", "name": "Clan", "clanLevel": 20}'
+    assert coc_decode.decode("clan", body) == json.loads(body)
+
+
+@pytest.mark.parametrize("ts, expected", [
+    ("20260209T143000.000Z", datetime(2026, 2, 9, 14, 30, tzinfo=timezone.utc)),
+    ("20260209T143000.250Z", datetime(2026, 2, 9, 14, 30, 0, 250000, tzinfo=timezone.utc)),
+    ("20260209T143000Z", datetime(2026, 2, 9, 14, 30, tzinfo=timezone.utc)),
+    ("20260230T143000.000Z", None),
+    ("20260209T14 000.000Z", None),
+    ("", None),
+])
+def test_parse_coc_timestamp(ts, expected):
+    assert parse_coc_timestamp(ts) == expected
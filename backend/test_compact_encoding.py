@@ -0,0 +1,77 @@
+"""
+Compact encoding tests — MessagePack status bodies selected by the Accept header.
+"""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from conftest import make_user, make_snapshot
+from services.status_cache import status_cache
+
+msgpack = pytest.importorskip("msgpack")
+
+MSGPACK = {"Accept": "application/msgpack"}
+
+
+def _seed(db):
+    end_time = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(hours=3)
+    user = make_user(db)
+    make_snapshot(db, user.id, account_tag="#P1", account_name="Spieler", end_time=end_time, war_size=10)
+    make_snapshot(db, user.id, account_tag="#P2", event_type="cwl", event_subtype="day_4",
+                  attacks_max=1, end_time=end_time + timedelta(hours=1))
+    make_snapshot(db, user.id, account_tag="#P1", event_type="raid", state="ongoing", attacks_used=6, attacks_max=6)
+    db.commit()
+    status_cache.clear()
+    return user.id, int(end_time.timestamp())
+
+
+def test_summary_msgpack(client, db):
+    user_id, end_ts = _seed(db)
+    url = f"/api/v1/users/{user_id}/status/summary"
+
+    response = client.get(url, headers=MSGPACK)
+    json_response = client.get(url)
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert len(response.content) < len(json_response.content)
+    body = msgpack.unpackb(response.content)
+    assert body["v"] == 1
+    assert body["n"] == json_response.json()["total_missing"] == 3
+    assert body["t"] == [[1, 2, 1], [2, 1, 1]]
+    assert body["i"] == [
+        ["#P1", "Spieler", "#CLAN", "Clan", 1, 0, 2, end_ts],
+        ["#P2", "Player", "#CLAN", "Clan", 2, 4, 1, end_ts + 3600],
+    ]
+
+
+def test_status_msgpack(client, db):
+    user_id, end_ts = _seed(db)
+
+    body = msgpack.unpackb(client.get(f"/api/v1/users/{user_id}/status", headers=MSGPACK).content)
+    events = client.get(f"/api/v1/users/{user_id}/status").json()["events"]
+
+    assert [e[0] for e in body["e"]] == [e["id"] for e in events]
+    war = next(e for e in body["e"] if e[1] == "#P1" and e[5] == 1)
+    # type cw, no CWL day, state inWar, 0/2 attacks, end timestamp
+    assert war[5:11] == [1, 0, 2, 0, 2, end_ts]
+    assert war[14] == 10
+
+
+def test_msgpack_conditional_get(client, db):
+    user_id, _ = _seed(db)
+    url = f"/api/v1/users/{user_id}/status/summary"
+    etag = client.get(url, headers=MSGPACK).headers["etag"]
+
+    assert client.get(url, headers={**MSGPACK, "If-None-Match": etag}).status_code == 304
+    # The JSON representation has its own ETag
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_json_stays_default(client, db):
+    user_id, _ = _seed(db)
+
+    response = client.get(f"/api/v1/users/{user_id}/status/summary", headers={"Accept": "application/json, */*"})
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["total_missing"] == 3
@@ -0,0 +1,80 @@
+"""
+Entity cache tests — account/clan validation served from recently fetched CoC data, strict lookup timeout.
+"""
+import asyncio
+
+import pytest
+
+from conftest import make_user
+from core.config import settings
+from services import coc_api
+
+
+class FakeClient:
+    """Stands in for the CoCClient singleton; counts live calls."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.calls = []
+
+    async def get_player(self, tag):
+        self.calls.append(("player", tag))
+        await asyncio.sleep(self.delay)
+        return {"tag": tag, "name": "Chief", "clan": {"tag": "#CLAN", "name": "Clan"}}
+
+    async def get_clan_info(self, clan_tag):
+        self.calls.append(("clan", clan_tag))
+        await asyncio.sleep(self.delay)
+        return {"tag": clan_tag, "name": "Clan"}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(coc_api, "_coc_client", client)
+    coc_api.entity_cache.clear()
+    yield client
+    coc_api.entity_cache.clear()
+
+
+def test_add_clan_uses_poller_fetch(client, db, fake_client):
+    user = make_user(db)
+    db.commit()
+    asyncio.run(coc_api.get_clan_info("#CLAN"))  # as fetched by the poller
+
+    response = client.post(f"/api/v1/users/{user.id}/clans", json={"clan_tag": "#clan"})
+
+    assert response.status_code == 200
+    assert response.json()["clan_name"] == "Clan"
+    assert fake_client.calls == [("clan", "#CLAN")]
+
+
+def test_add_account_fetches_once_on_miss(client, db, fake_client):
+    first, second = make_user(db), make_user(db)
+    db.commit()
+
+    assert client.post(f"/api/v1/users/{first.id}/accounts", json={"tag": "#P1"}).status_code == 200
+    assert client.post(f"/api/v1/users/{second.id}/accounts", json={"tag": "#P1"}).status_code == 200
+
+    assert fake_client.calls == [("player", "#P1")]
+
+
+def test_slow_api_returns_503(client, db, fake_client, monkeypatch):
+    user = make_user(db)
+    db.commit()
+    fake_client.delay = 1
+    monkeypatch.setattr(settings, "COC_LOOKUP_TIMEOUT_SECONDS", 0.05)
+
+    response = client.post(f"/api/v1/users/{user.id}/accounts", json={"tag": "#P2"})
+
+    assert response.status_code == 503
+    assert coc_api.entity_cache.get("player", "#P2") is None
+
+
+def test_expired_entries_are_refetched(fake_client, monkeypatch):
+    asyncio.run(coc_api.get_player("#P3"))
+    monkeypatch.setattr(coc_api.entity_cache, "ttl_seconds", -1)
+
+    asyncio.run(coc_api.lookup_player("#P3"))
+
+    assert fake_client.calls == [("player", "#P3"), ("player", "#P3")]
@@ -0,0 +1,40 @@
+"""
+Event record tests — API responses reduced to the fields the poller's process_account_* passes read.
+"""
+from datetime import datetime, timezone
+
+from services.data_poller import WarRecord, RaidRecord
+
+
+def _war() -> dict:
+    return {
+        "state": "inWar", "attacksPerMember": 2, "teamSize": 15,
+        "startTime": "20260208T143000.000Z", "endTime": "20260209T143000.000Z",
+        "clan": {"tag": "#THEM", "name": "Them", "members": [{"tag": "#T1", "name": "T", "attacks": [{}]}]},
+        "opponent": {"tag": "#US", "name": "Us", "members": [
+            {"tag": "#P1", "name": "P One", "attacks": [{"stars": 3}, {"stars": 1}]},
+            {"tag": "#P2", "name": "P Two"},
+        ]},
+    }
+
+
+def test_war_record_is_taken_from_the_clans_own_side():
+    record = WarRecord.from_api(_war(), "#US", round_index=3)
+
+    assert record.player("#P1") == ("P One", 2)
+    assert record.player("#P2") == ("P Two", 0)
+    assert record.player("#T1") is None
+    assert (record.opponent_tag, record.opponent_name) == ("#THEM", "Them")
+    assert record.end_time == datetime(2026, 2, 9, 14, 30, tzinfo=timezone.utc)
+    assert (record.state, record.attacks_per_member, record.team_size, record.round_index) == ("inWar", 2, 15, 3)
+
+
+def test_raid_record_limits_include_the_bonus_attack():
+    record = RaidRecord.from_api({
+        "state": "ongoing", "endTime": "20260209T070000.000Z",
+        "members": [{"tag": "#P1", "name": "P One", "attacks": 5, "attackLimit": 5, "bonusAttackLimit": 1}],
+    })
+
+    assert record.player("#P1") == ("P One", 5, 6)
+    assert record.player("#P2") is None
+    assert record.state == "ongoing"
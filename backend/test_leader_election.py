@@ -0,0 +1,69 @@
+"""
+Leader election tests — one lease holder at a time, takeover after expiry, job stopped on loss.
+"""
+import asyncio
+
+from database import engine
+from services.leader_election import LeaseRowElection, run_while_leader
+
+
+def _election(holder: str, name: str, ttl: float = 30) -> LeaseRowElection:
+    return LeaseRowElection(engine, name, ttl_seconds=ttl, holder=holder)
+
+
+def test_only_one_holder():
+    async def scenario():
+        a, b = _election("a", "exclusive"), _election("b", "exclusive")
+        first = [await a.try_acquire(), await b.try_acquire(), await a.try_acquire()]
+        await a.release()
+        second = await b.try_acquire()
+        await b.release()
+        return first, second
+
+    assert asyncio.run(scenario()) == ([True, False, True], True)
+
+
+def test_standby_takes_over_expired_lease():
+    async def scenario():
+        a, b = _election("a", "takeover", ttl=0.2), _election("b", "takeover", ttl=0.2)
+        assert await a.try_acquire()
+        assert not await b.try_acquire()
+        await asyncio.sleep(0.3)  # leader died without renewing
+        taken = await b.try_acquire()
+        renewed = await a.try_acquire()
+        await b.release()
+        return taken, renewed
+
+    assert asyncio.run(scenario()) == (True, False)
+
+
+def test_job_runs_only_while_leading():
+    async def scenario():
+        runs = []
+
+        async def job():
+            runs.append("start")
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                runs.append("stop")
+                raise
+
+        election = _election("a", "job", ttl=30)
+        leader = asyncio.create_task(run_while_leader(election, job, renew_seconds=0.05))
+        await asyncio.sleep(0.1)
+        assert runs == ["start"]
+
+        # Another holder takes the lease (as if ours had expired)
+        thief = _election("b", "job", ttl=30)
+        await election.release()
+        assert await thief.try_acquire()
+        await asyncio.sleep(0.15)
+        assert runs == ["start", "stop"]
+
+        leader.cancel()
+        await asyncio.gather(leader, return_exceptions=True)
+        await thief.release()
+        return runs
+
+    assert asyncio.run(scenario()) == ["start", "stop"]
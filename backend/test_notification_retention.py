@@ -0,0 +1,54 @@
+"""
+Notification log retention tests — bucketing, compaction into the archive and archive expiry.
+"""
+from datetime import datetime, timezone, timedelta
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.config import settings
+from services.notification_retention import bucket_for, hot_bucket_floor, compact_notification_logs
+
+
+def _log(db, user_id, snapshot_id, sent_at, status="sent"):
+    db.add(models.NotificationLog(user_id=user_id, event_snapshot_id=snapshot_id,
+                                  reminder_time_id=f"rt-{sent_at.isoformat()}", status=status,
+                                  sent_at=sent_at, bucket=bucket_for(sent_at)))
+
+
+def test_week_buckets_start_on_monday(monkeypatch):
+    monkeypatch.setattr(settings, "NOTIFICATION_LOG_BUCKET", "week")
+    sunday = datetime(2026, 10, 18, 23, 0, tzinfo=timezone.utc)
+    monday = datetime(2026, 10, 19, 1, 0, tzinfo=timezone.utc)
+
+    assert datetime.fromordinal(bucket_for(sunday)).date().isoformat() == "2026-10-12"
+    assert datetime.fromordinal(bucket_for(monday)).date().isoformat() == "2026-10-19"
+    assert hot_bucket_floor(monday) == bucket_for(monday) - 7
+
+
+def test_compaction_archives_old_buckets_and_keeps_hot_ones(db):
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+    snap = make_snapshot(db, user.id)
+    db.flush()
+
+    _log(db, user.id, snap.id, now)
+    _log(db, user.id, snap.id, now - timedelta(days=1))
+    old_day = (now - timedelta(days=3)).replace(hour=12, minute=0)
+    _log(db, user.id, snap.id, old_day)
+    _log(db, user.id, snap.id, old_day + timedelta(minutes=5))
+    _log(db, user.id, snap.id, old_day + timedelta(minutes=10), status="failed")
+    # Archived long ago, past retention
+    db.add(models.NotificationLogArchive(bucket=bucket_for(now - timedelta(days=400)),
+                                         user_id=user.id, status="sent", count=4))
+    db.commit()
+
+    run_async(compact_notification_logs)
+
+    remaining = db.query(models.NotificationLog).all()
+    assert sorted(log.bucket for log in remaining) == [bucket_for(now - timedelta(days=1)), bucket_for(now)]
+
+    archived = {row.status: row for row in db.query(models.NotificationLogArchive).all()}
+    assert set(archived) == {"sent", "failed"}
+    assert archived["sent"].count == 2
+    assert archived["sent"].bucket == bucket_for(old_day)
+    assert archived["failed"].count == 1
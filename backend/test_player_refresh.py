@@ -0,0 +1,95 @@
+"""
+Player refresh tests — deduplicated by tag, spread over the interval, bounded concurrency, one bulk update.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import models
+from conftest import make_user, run_async
+from core.metrics import metrics
+from core.query_counter import assert_max_queries
+from services import coc_api, player_refresh
+
+
+@pytest.fixture
+def players(monkeypatch):
+    """Records fetched tags and the peak number of fetches in flight; #GONE is not found."""
+    fetched, in_flight = [], {"now": 0, "peak": 0}
+
+    async def get_player(tag):
+        fetched.append(tag)
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        if tag == "#GONE":
+            return None
+        return {"tag": tag, "name": f"New {tag}", "clan": {"tag": "#NEWCLAN", "name": "New Clan"}}
+
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    monkeypatch.setattr(player_refresh, "_failed_at", {})
+    monkeypatch.setattr(player_refresh.settings, "PLAYER_REFRESH_CONCURRENCY", 2)
+    monkeypatch.setattr(player_refresh.settings, "PLAYER_REFRESH_INTERVAL_SECONDS", 600)
+    return fetched, in_flight
+
+
+def _link(db, tag: str, users: int = 1, synced_minutes_ago: int | None = None):
+    synced = None if synced_minutes_ago is None else datetime.utcnow() - timedelta(minutes=synced_minutes_ago)
+    for _ in range(users):
+        user = make_user(db)
+        db.add(models.PlayerAccount(user_id=user.id, tag=tag, name="Old", last_synced_at=synced))
+
+
+def test_each_tag_is_fetched_once_and_fanned_out(db, players):
+    fetched, in_flight = players
+    _link(db, "#SHARED", users=3)
+    for i in range(4):
+        _link(db, f"#P{i}")
+    db.commit()
+
+    # Interval == run interval: every stale tag is due this run
+    # count, stale tags, bulk update
+    with assert_max_queries(3, scope="player_refresh"):
+        run_async(player_refresh.refresh_players, run_interval=600)
+
+    assert sorted(fetched) == ["#P0", "#P1", "#P2", "#P3", "#SHARED"]
+    assert in_flight["peak"] == 2
+    shared = db.query(models.PlayerAccount).filter_by(tag="#SHARED").all()
+    assert {(a.name, a.current_clan_tag, a.current_clan_name) for a in shared} == {("New #SHARED", "#NEWCLAN", "New Clan")}
+    assert all(a.last_synced_at is not None for a in shared)
+
+
+def test_refreshes_are_spread_over_the_interval_oldest_first(db, players):
+    fetched, _ = players
+    _link(db, "#FRESH", synced_minutes_ago=1)
+    _link(db, "#OLD", synced_minutes_ago=60)
+    _link(db, "#OLDER", synced_minutes_ago=120)
+    _link(db, "#NEVER")
+    db.commit()
+
+    # 4 tags, runs every 300 s of a 600 s interval: 2 per run, never synced first
+    run_async(player_refresh.refresh_players, run_interval=300)
+    assert fetched == ["#NEVER", "#OLDER"]
+
+    fetched.clear()
+    run_async(player_refresh.refresh_players, run_interval=300)
+    assert fetched == ["#OLD"]
+
+
+def test_missing_players_are_not_retried_every_run(db, players):
+    fetched, _ = players
+    _link(db, "#GONE")
+    _link(db, "#P1", synced_minutes_ago=60)
+    db.commit()
+    metrics.reset()
+
+    run_async(player_refresh.refresh_players, run_interval=300)
+    assert fetched == ["#GONE"]
+    assert db.query(models.PlayerAccount).filter_by(tag="#GONE").one().name == "Old"
+    assert metrics.snapshot()["counters"]["player_refresh.failed"] == 1
+
+    fetched.clear()
+    run_async(player_refresh.refresh_players, run_interval=300)
+    assert fetched == ["#P1"]
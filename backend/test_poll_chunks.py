@@ -0,0 +1,78 @@
+"""
+Poll chunk tests — users are processed and committed in bounded chunks; a failing chunk keeps the others' writes.
+"""
+import pytest
+
+import models
+from conftest import make_user, run_async
+from core.metrics import metrics
+from services import coc_api, data_poller
+
+
+@pytest.fixture
+def clans(monkeypatch):
+    async def fetch_clan_events(clan_tag):
+        war = {
+            "state": "inWar", "attacksPerMember": 2, "teamSize": 5, "endTime": "20990101T000000.000Z",
+            "clan": {"tag": clan_tag, "members": [{"tag": f"#P{i}", "name": f"P{i}", "attacks": []} for i in range(5)]},
+            "opponent": {"tag": "#OPP", "members": []},
+        }
+        return data_poller.ClanEvents(cw=data_poller.WarRecord.from_api(war, clan_tag), clan_name=clan_tag)
+
+    async def get_player(tag):
+        return None
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    monkeypatch.setattr(data_poller, "_clan_fetches", {})
+    monkeypatch.setattr(data_poller.settings, "POLL_CHUNK_SIZE", 2)
+
+
+def _seed(db, count: int) -> list[str]:
+    user_ids = []
+    for i in range(count):
+        user = make_user(db)
+        db.add(models.PlayerAccount(user_id=user.id, tag=f"#P{i}", name=f"P{i}"))
+        db.add(models.TrackedClan(user_id=user.id, clan_tag="#CLAN", clan_name="Clan"))
+        user_ids.append(user.id)
+    db.commit()
+    return sorted(user_ids)
+
+
+def _polled(db) -> set[str]:
+    return {user_id for user_id, in db.query(models.EventSnapshot.user_id)}
+
+
+def test_all_chunks_are_processed(db, clans):
+    user_ids = _seed(db, 5)
+
+    chunks = []
+
+    async def collect(session):
+        async for chunk in data_poller.iter_user_chunks(session, 2):
+            chunks.append(list(chunk))
+    run_async(collect)
+    assert chunks == [user_ids[0:2], user_ids[2:4], user_ids[4:]]
+
+    run_async(data_poller.poll_all_users)
+    assert _polled(db) == set(user_ids)
+
+
+def test_failing_chunk_keeps_other_chunks_writes(db, clans, monkeypatch):
+    user_ids = _seed(db, 5)
+    failing = user_ids[2]
+    process = data_poller.process_account_clans
+
+    async def process_account_clans(session, user, account, tracked_clans, clan_data):
+        await process(session, user, account, tracked_clans, clan_data)
+        if user.id == failing:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(data_poller, "process_account_clans", process_account_clans)
+    metrics.reset()
+
+    run_async(data_poller.poll_all_users)
+
+    # The chunk of user_ids[2:4] rolled back, everything else is committed
+    assert _polled(db) == set(user_ids) - {user_ids[2], user_ids[3]}
+    assert metrics.snapshot()["counters"]["poll.chunks_failed"] == 1
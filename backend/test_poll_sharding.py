@@ -0,0 +1,167 @@
+"""
+Sharded polling tests — stable clan partitioning, DB-coordinated membership, disjoint shard polls.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from conftest import make_user, make_snapshot, run_async, sync_engine
+from core.config import settings
+from core.metrics import metrics
+from database import create_db_engine, engine
+from services import coc_api, data_poller, status_view, targeted_poll
+from services.poll_sharding import ShardMembership, shard_of
+
+
+def test_shard_of_is_stable_and_balanced():
+    tags = [f"#C{i}" for i in range(3000)]
+    assert [shard_of(t, 4) for t in tags] == [shard_of(t, 4) for t in tags]
+    assert shard_of("#abc", 4) == shard_of("#ABC", 4)
+    counts = Counter(shard_of(t, 4) for t in tags)
+    assert min(counts.values()) > 600
+
+
+def test_membership_rebalances_when_members_join_and_leave():
+    async def scenario():
+        members = [ShardMembership(engine, ttl_seconds=30, member_id=f"m{i}") for i in range(3)]
+        for m in members:
+            await m.heartbeat()
+        full = [await m.heartbeat() for m in members]
+        await members[1].leave()
+        after_leave = [await members[0].heartbeat(), await members[2].heartbeat()]
+        await members[0].leave()
+        await members[2].leave()
+        return full, after_leave
+
+    full, after_leave = asyncio.run(scenario())
+    assert full == [(0, 3), (1, 3), (2, 3)]
+    assert after_leave == [(0, 2), (1, 2)]
+
+
+def test_dead_member_is_dropped_after_ttl():
+    async def scenario():
+        dead = ShardMembership(engine, ttl_seconds=0.2, member_id="dead")
+        alive = ShardMembership(engine, ttl_seconds=0.2, member_id="alive")
+        await dead.heartbeat()
+        assert (await alive.heartbeat())[1] == 2
+        await asyncio.sleep(0.3)
+        shard = await alive.heartbeat()
+        await alive.leave()
+        return shard, dead.shard
+
+    assert asyncio.run(scenario()) == ((0, 1), None)
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    fetched = []
+    end = (datetime.now(timezone.utc) + timedelta(hours=2)).strftime("%Y%m%dT%H%M%S.000Z")
+
+    async def fetch_clan_events(clan_tag):
+        fetched.append(clan_tag)
+        war = {
+            "state": "inWar", "attacksPerMember": 2, "teamSize": 5, "endTime": end,
+            "clan": {"tag": clan_tag, "name": clan_tag, "members": [{"tag": "#P1", "name": "P", "attacks": []}]},
+            "opponent": {"tag": "#OPP", "members": []},
+        }
+        return data_poller.ClanEvents(cw=data_poller.WarRecord.from_api(war, clan_tag), clan_name=clan_tag, member_tags={"#P1"})
+
+    async def get_player(tag):
+        return None
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    monkeypatch.setattr(data_poller, "_clan_fetches", {})
+    return fetched
+
+
+def test_shards_poll_disjoint_clans_covering_all(db, fetched):
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P"))
+    clan_tags = {f"#SHARD{i}" for i in range(12)}
+    for tag in clan_tags:
+        db.add(models.TrackedClan(user_id=user.id, clan_tag=tag, clan_name=tag))
+    db.commit()
+
+    per_shard = []
+    for index in range(3):
+        fetched.clear()
+        run_async(data_poller.poll_all_users, shard=(index, 3))
+        per_shard.append(set(fetched) & clan_tags)
+
+    assert set().union(*per_shard) == clan_tags
+    assert sum(len(s) for s in per_shard) == len(clan_tags)
+    snapshots = db.query(models.EventSnapshot).filter_by(user_id=user.id).all()
+    assert {s.clan_tag for s in snapshots} == clan_tags
+    assert db.get(models.UserStatus, user.id).total_missing == 2 * len(clan_tags)
+
+
+def test_writers_in_separate_processes_share_a_user(db, fetched):
+    """Two shard pollers and a targeted poll write the same user's snapshots and user_status at once."""
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P"))
+    clan_tags = {f"#SHARD{i}" for i in range(6)}
+    for tag in clan_tags:
+        db.add(models.TrackedClan(user_id=user.id, clan_tag=tag, clan_name=tag))
+    db.commit()
+    user_id = user.id
+    metrics.reset()
+
+    async def scenario():
+        engines = [create_db_engine(settings.DATABASE_URL) for _ in range(3)]
+        try:
+            shard_0, shard_1, api_worker = (AsyncSession(engine, expire_on_commit=False) for engine in engines)
+            await asyncio.gather(
+                data_poller.poll_all_users(shard_0, shard=(0, 2)),
+                data_poller.poll_all_users(shard_1, shard=(1, 2)),
+                targeted_poll.run_targeted_poll(api_worker, "account", user_id, "#P1"),
+            )
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    asyncio.run(scenario())
+
+    assert "poll.chunks_failed" not in metrics.snapshot()["counters"]
+    snapshots = db.query(models.EventSnapshot).filter_by(user_id=user_id).all()
+    assert sorted(s.clan_tag for s in snapshots) == sorted(clan_tags)
+    status = db.get(models.UserStatus, user_id)
+    assert {item["id"] for item in status.items} == {s.id for s in snapshots}
+    assert status.total_missing == 2 * len(clan_tags)
+    assert all(s.version is not None and s.version <= status.version for s in snapshots)
+
+
+def test_status_row_created_by_another_process_is_refreshed(db, monkeypatch):
+    """The user_status row appears between this writer's lookup and its insert."""
+    user = make_user(db)
+    snapshot = make_snapshot(db, user.id, version=None)
+    db.commit()
+    user_id, snapshot_id = user.id, snapshot.id
+    lock_status_rows = status_view._lock_status_rows
+
+    async def lock_racing(session, user_ids):
+        rows = await lock_status_rows(session, user_ids)
+        if user_id not in rows:
+            with sync_engine.begin() as conn:
+                conn.execute(models.UserStatus.__table__.insert().values(
+                    user_id=user_id, version=3, floor_version=0, items=[], by_event_type={},
+                ))
+        return rows
+
+    monkeypatch.setattr(status_view, "_lock_status_rows", lock_racing)
+
+    async def refresh(session):
+        rows = await status_view.refresh_user_status(session, (), changed=[user_id])
+        await session.commit()
+        return rows[user_id].version
+
+    assert run_async(refresh) == 4
+    db.expire_all()
+    status = db.get(models.UserStatus, user_id)
+    assert status.version == 4
+    assert [item["id"] for item in status.items] == [snapshot_id]
+    assert db.get(models.EventSnapshot, snapshot_id).version == 4
@@ -0,0 +1,55 @@
+"""
+Poller tests — snapshot processing and cleanup against the test database.
+"""
+from datetime import datetime, timezone, timedelta
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.config import settings
+from services.data_poller import cleanup_stale_snapshots
+
+
+def test_cleanup_deactivates_and_deletes_in_batches(db, monkeypatch):
+    monkeypatch.setattr(settings, "CLEANUP_BATCH_SIZE", 3)
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+
+    expired = [make_snapshot(db, user.id, end_time=now - timedelta(minutes=5)) for _ in range(7)]
+    running = make_snapshot(db, user.id, end_time=now + timedelta(hours=1))
+    stale = [make_snapshot(db, user.id, is_active=False, polled_at=now - timedelta(hours=49))
+             for _ in range(5)]
+    db.flush()
+    for snap in stale:
+        db.add(models.NotificationLog(user_id=user.id, event_snapshot_id=snap.id, reminder_time_id="rt"))
+    db.commit()
+
+    run_async(cleanup_stale_snapshots)
+    db.expire_all()
+
+    assert all(not db.get(models.EventSnapshot, s.id).is_active for s in expired)
+    assert db.get(models.EventSnapshot, running.id).is_active
+    assert db.query(models.EventSnapshot).count() == 8
+    # Logs of deleted snapshots are removed by the database cascade
+    assert db.query(models.NotificationLog).count() == 0
+
+
+def test_cleanup_publishes_ended_events_per_batch(db, monkeypatch):
+    from services.change_events import change_bus, EVENT_ENDED
+
+    monkeypatch.setattr(settings, "CLEANUP_BATCH_SIZE", 3)
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+    expired = [make_snapshot(db, user.id, end_time=now - timedelta(minutes=5)) for _ in range(7)]
+    db.commit()
+    expired_ids = {snap.id for snap in expired}
+
+    batches = []
+    change_bus.subscribe(batches.append)
+    try:
+        run_async(cleanup_stale_snapshots)
+    finally:
+        change_bus.unsubscribe(batches.append)
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert {event.snapshot_id for batch in batches for event in batch} == expired_ids
+    assert {event.kind for batch in batches for event in batch} == {EVENT_ENDED}
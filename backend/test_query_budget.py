@@ -0,0 +1,99 @@
+"""
+Query budget tests — endpoint and scheduler query counts must not grow with the data (N+1 guard).
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.query_counter import QUERY_COUNT_HEADER, assert_max_queries
+from services import reminder_engine
+from services.reminder_engine import check_reminders
+from services.status_view import refresh_user_status
+
+
+def _seed_status(db, snapshot_count: int) -> str:
+    user = make_user(db)
+    for i in range(snapshot_count):
+        make_snapshot(db, user.id, event_type=("cw", "cwl", "raid")[i % 3],
+                      event_subtype=f"day_{i}" if i % 3 == 1 else None)
+    db.commit()
+    return user.id
+
+
+async def _materialize(session, user_id):
+    await refresh_user_status(session, [user_id])
+    await session.commit()
+
+
+@pytest.mark.parametrize("path", ["/status", "/status/summary"])
+@pytest.mark.parametrize("snapshot_count", [1, 60])
+def test_status_endpoints_are_a_single_pk_read(client, db, path, snapshot_count):
+    user_id = _seed_status(db, snapshot_count)
+    run_async(_materialize, user_id)
+
+    response = client.get(f"/api/v1/users/{user_id}{path}")
+
+    assert response.status_code == 200
+    assert int(response.headers[QUERY_COUNT_HEADER]) == 1
+
+
+@pytest.mark.parametrize("snapshot_count", [1, 60])
+def test_status_first_read_materializes_with_constant_query_count(client, db, snapshot_count):
+    user_id = _seed_status(db, snapshot_count)
+
+    response = client.get(f"/api/v1/users/{user_id}/status")
+
+    assert response.status_code == 200
+    # status row, user, snapshots, existing rows, insert, version stamp
+    assert int(response.headers[QUERY_COUNT_HEADER]) <= 6
+    assert db.get(models.UserStatus, user_id) is not None
+
+
+def test_query_count_reported_in_metrics(client, db):
+    user_id = _seed_status(db, 3)
+    client.get(f"/api/v1/users/{user_id}/status")
+
+    counters = client.get("/metrics").json()["counters"]
+    assert counters["db.queries.http.GET /api/v1/users/{user_id}/status"] >= 1
+
+
+@pytest.mark.parametrize("user_count", [1, 25])
+def test_check_reminders_query_budget(db, monkeypatch, user_count):
+    # Freshness check: the war can't be fetched, reminders go out from the snapshots
+    monkeypatch.setattr(reminder_engine, "fetch_event_shared", lambda key: asyncio.sleep(0))
+    now = datetime.now(timezone.utc)
+    for _ in range(user_count):
+        user = make_user(db)
+        config = models.ReminderConfig(user_id=user.id, event_type="cw", enabled=True)
+        db.add(config)
+        db.flush()
+        db.add(models.ReminderTime(reminder_config_id=config.id, minutes_before_end=60, enabled=True))
+        # Two accounts per user, both due for the 60 minute reminder right now
+        make_snapshot(db, user.id, end_time=now + timedelta(minutes=60))
+        make_snapshot(db, user.id, end_time=now + timedelta(minutes=60))
+    db.commit()
+
+    # snapshots, users, configs, times, sent logs, log claim, status of the failed pushes
+    # (FCM isn't configured here)
+    with assert_max_queries(7, scope="check_reminders"):
+        run_async(check_reminders)
+
+    assert db.query(models.NotificationLog).count() == user_count * 2
+
+
+def test_failed_statement_leaves_no_timing_state():
+    from sqlalchemy import create_engine, exc, text
+    from core import query_counter
+
+    engine = create_engine("sqlite://")
+    query_counter.install(engine)
+    with engine.connect() as conn:
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.connection.info.get("query_start_time") == []
+        with assert_max_queries(1) as stats:
+            conn.execute(text("SELECT 1"))
+        assert stats.count == 1
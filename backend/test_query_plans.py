@@ -0,0 +1,182 @@
+"""
+Query plan tests — every hot query must be served by an index, never a full table scan.
+
+Runs against the test SQLite database. Set TEST_POSTGRES_URL to also check the plans on
+PostgreSQL (sequential scans are disabled there so the planner has to show an index path).
+"""
+import asyncio
+import os
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import Column, MetaData, Table, UniqueConstraint, func, select
+
+import models
+from database import create_db_engine, engine as sqlite_engine
+from migrations import MIGRATIONS, run_migrations
+
+NOW = datetime.now(timezone.utc)
+
+HOT_QUERIES = {
+    "status": select(models.EventSnapshot).where(
+        models.EventSnapshot.user_id == "u",
+        models.EventSnapshot.is_active == True,
+    ).order_by(models.EventSnapshot.end_time.asc()),
+    "reminders_active": select(models.EventSnapshot).where(
+        models.EventSnapshot.is_active == True,
+        models.EventSnapshot.state.in_(["inWar", "ongoing"]),
+        models.EventSnapshot.end_time.isnot(None),
+    ),
+    "cleanup_expired": select(models.EventSnapshot).where(
+        models.EventSnapshot.end_time < NOW,
+        models.EventSnapshot.is_active == True,
+    ),
+    "cleanup_stale": select(models.EventSnapshot).where(
+        models.EventSnapshot.polled_at < NOW - timedelta(hours=48),
+        models.EventSnapshot.is_active == False,
+    ),
+    "snapshot_upsert_lookup": select(models.EventSnapshot).where(
+        models.EventSnapshot.user_id == "u",
+        models.EventSnapshot.account_tag == "#A",
+        models.EventSnapshot.clan_tag == "#C",
+        models.EventSnapshot.event_type == "cw",
+        models.EventSnapshot.event_subtype.is_(None),
+    ),
+    "poll_clan_priority": select(models.EventSnapshot.clan_tag, func.min(models.EventSnapshot.end_time)).where(
+        models.EventSnapshot.end_time > NOW,
+    ).group_by(models.EventSnapshot.clan_tag),
+    "tracked_clans_by_tag": select(models.TrackedClan).where(models.TrackedClan.clan_tag == "#C"),
+    "tracked_clans_by_user": select(models.TrackedClan).where(models.TrackedClan.user_id == "u"),
+    "player_accounts_by_user": select(models.PlayerAccount).where(models.PlayerAccount.user_id == "u"),
+    "reminder_configs_by_user": select(models.ReminderConfig).where(
+        models.ReminderConfig.user_id.in_(["u", "v"]),
+        models.ReminderConfig.enabled == True,
+    ),
+    "reminder_times_by_config": select(models.ReminderTime).where(
+        models.ReminderTime.reminder_config_id.in_(["c", "d"]),
+    ),
+    "notification_logs_dedupe": select(models.NotificationLog).where(
+        models.NotificationLog.bucket >= 739000,
+        models.NotificationLog.event_snapshot_id.in_(["s", "t"]),
+    ),
+    "notification_logs_by_bucket": select(models.NotificationLog).where(
+        models.NotificationLog.bucket == 739000,
+    ),
+}
+
+
+def _explain(conn, stmt) -> list[str]:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+
+
+def _full_scans(dialect: str, plan: list[str]) -> list[str]:
+    if dialect == "sqlite":
+        # "SEARCH t USING INDEX ..." is an index lookup; "SCAN t [USING INDEX ...]" walks everything
+        return [line for line in plan if line.startswith("SCAN ")]
+    return [line for line in plan if "Seq Scan" in line]
+
+
+def _check_plans_sync(conn):
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET enable_seqscan = off")
+    for name, stmt in HOT_QUERIES.items():
+        plan = _explain(conn, stmt)
+        scans = _full_scans(conn.dialect.name, plan)
+        assert not scans, f"{name} does a full table scan: {plan}"
+
+
+async def _check_plans(engine):
+    async with engine.connect() as conn:
+        await conn.run_sync(_check_plans_sync)
+
+
+async def _create_schema(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    await run_migrations(engine)
+
+
+def test_hot_queries_use_indexes_on_sqlite():
+    asyncio.run(_check_plans(sqlite_engine))
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_hot_queries_use_indexes_on_postgres():
+    async def run():
+        pg_engine = create_db_engine(os.environ["TEST_POSTGRES_URL"])
+        await _create_schema(pg_engine)
+        await _check_plans(pg_engine)
+        await pg_engine.dispose()
+    asyncio.run(run())
+
+
+def test_migration_adds_indexes_to_existing_database(tmp_path):
+    def drop_indexes(conn):
+        for table in models.Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn)
+
+    async def run():
+        legacy = create_db_engine(f"sqlite:///{tmp_path}/legacy.db")
+        # Simulate a database created before the indexes existed
+        async with legacy.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+            await conn.run_sync(drop_indexes)
+
+        await run_migrations(legacy)
+
+        await _check_plans(legacy)
+        await legacy.dispose()
+    asyncio.run(run())
+
+
+def _baseline_metadata() -> MetaData:
+    """The schema before this migration series: its tables and unique constraints, no indexes or later columns."""
+    later_columns = {"event_snapshots": {"version"}, "notification_logs": {"bucket"}}
+    metadata = MetaData()
+    for name in ("users", "player_accounts", "tracked_clans", "event_snapshots",
+                 "reminder_configs", "reminder_times", "notification_logs"):
+        current = models.Base.metadata.tables[name]
+        Table(name, metadata, *(
+            Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+            for c in current.columns if c.name not in later_columns.get(name, ())
+        ), *(
+            UniqueConstraint(*c.columns.keys(), name=c.name)
+            for c in current.constraints if isinstance(c, UniqueConstraint)
+        ))
+    return metadata
+
+
+def test_migrations_upgrade_the_baseline_schema(tmp_path):
+    async def run():
+        legacy = create_db_engine(f"sqlite:///{tmp_path}/baseline.db")
+        baseline = _baseline_metadata()
+        async with legacy.begin() as conn:
+            await conn.run_sync(baseline.create_all)
+            # Duplicate cw rows (NULL subtype) that uq_event_snapshot let through
+            await conn.execute(baseline.tables["users"].insert().values(id="u"))
+            await conn.execute(baseline.tables["event_snapshots"].insert(), [
+                dict(id=snapshot_id, user_id="u", account_tag="#A", clan_tag="#C", event_type="cw",
+                     state="inWar", polled_at=NOW - timedelta(minutes=minutes))
+                for snapshot_id, minutes in (("old", 5), ("new", 1))
+            ])
+
+        # What init_db() does on startup
+        await _create_schema(legacy)
+
+        async with legacy.connect() as conn:
+            applied = (await conn.execute(select(models.SchemaMigration.version))).scalars().all()
+            await conn.execute(select(models.EventSnapshot).where(
+                models.EventSnapshot.user_id == "u", models.EventSnapshot.version > 0,
+            ))
+            await conn.execute(select(models.UserStatus.version, models.UserStatus.floor_version))
+            await conn.execute(select(models.NotificationLog.bucket))
+            snapshot_ids = (await conn.execute(select(models.EventSnapshot.id))).scalars().all()
+        assert snapshot_ids == ["new"]
+        assert sorted(applied) == sorted(version for version, _ in MIGRATIONS)
+        await _check_plans(legacy)
+        await legacy.dispose()
+    asyncio.run(run())
@@ -0,0 +1,158 @@
+"""
+Reminder freshness tests — due reminders are re-checked against one fresh fetch per clan and event before sending.
+"""
+import urllib.parse
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.metrics import metrics
+from services import coc_api, reminder_engine
+from services.data_poller import RaidRecord
+
+
+def _war(members: dict[str, int], clan_tag: str = "#CLAN", **extra) -> dict:
+    return {
+        "state": "inWar", "attacksPerMember": 2,
+        "clan": {"tag": clan_tag, "members": [
+            {"tag": tag, "attacks": [{"stars": 3}] * used} for tag, used in members.items()
+        ]},
+        "opponent": {"tag": "#OPP", "members": []},
+        **extra,
+    }
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Answers CoC requests from `responses` (path -> body) and records the requested paths and
+    the pushes; #P1 used both war attacks since the last poll, #P2 one."""
+    calls, sent = [], []
+    responses = {"/clans/#CLAN/currentwar": _war({"#P1": 2, "#P2": 1})}
+
+    async def get(client, url, **kwargs):
+        path = urllib.parse.unquote(url.split("/v1", 1)[1])
+        calls.append(path)
+        return httpx.Response(200, json=responses[path])
+
+    async def send_push(token, title, body, data):
+        sent.append((data["account_tag"], title))
+        return True
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", get)
+    monkeypatch.setattr(coc_api, "freshness_budget", coc_api.SharedRateBudget("test_freshness", per_minute=120))
+    monkeypatch.setattr(reminder_engine.fcm_service, "send_push", send_push)
+    monkeypatch.setattr(reminder_engine, "_fresh_fetches", {})
+    return calls, sent, responses
+
+
+def _due(db, user, account_tag, event_type="cw", **kwargs):
+    config = db.query(models.ReminderConfig).filter_by(user_id=user.id, event_type=event_type).first()
+    if config is None:
+        config = models.ReminderConfig(user_id=user.id, event_type=event_type, enabled=True)
+        db.add(config)
+        db.flush()
+        db.add(models.ReminderTime(reminder_config_id=config.id, minutes_before_end=60, enabled=True))
+    end_time = datetime.now(timezone.utc) + timedelta(minutes=60)
+    return make_snapshot(db, user.id, account_tag=account_tag, event_type=event_type, end_time=end_time, **kwargs)
+
+
+def test_stale_reminders_are_suppressed_with_one_fetch_per_clan(db, api):
+    calls, sent, _ = api
+    for _ in range(2):
+        user = make_user(db)
+        _due(db, user, "#P1")
+        _due(db, user, "#P2")
+    db.commit()
+    metrics.reset()
+
+    run_async(reminder_engine.check_reminders)
+
+    assert calls == ["/clans/#CLAN/currentwar"]
+    assert [tag for tag, _ in sent] == ["#P2", "#P2"]
+    assert all("— 1 Angriff(e)" in title for _, title in sent)
+    statuses = sorted(status for status, in db.query(models.NotificationLog.status))
+    assert statuses == ["sent", "sent", "suppressed", "suppressed"]
+    assert metrics.snapshot()["counters"]["reminders.suppressed_stale"] == 2
+
+    # Suppressed triggers are logged and not re-checked
+    run_async(reminder_engine.check_reminders)
+    assert len(sent) == 2
+
+
+def test_exhausted_budget_sends_from_the_snapshot(db, api, monkeypatch):
+    calls, sent, _ = api
+    monkeypatch.setattr(coc_api, "freshness_budget", coc_api.SharedRateBudget("test_freshness", per_minute=0))
+    user = make_user(db)
+    _due(db, user, "#P1")
+    db.commit()
+    metrics.reset()
+
+    run_async(reminder_engine.check_reminders)
+
+    assert calls == []
+    assert [tag for tag, _ in sent] == ["#P1"]
+    assert metrics.snapshot()["counters"]["reminders.freshness.over_budget"] == 1
+
+
+def _cwl(responses):
+    responses["/clans/#CLAN/currentwar/leaguegroup"] = {"rounds": [{"warTags": ["#W1"]}, {"warTags": ["#W2", "#W3"]}]}
+    responses["/clanwarleagues/wars/#W2"] = _war({"#P1": 1}, clan_tag="#OTHER", attacksPerMember=1)
+    responses["/clanwarleagues/wars/#W3"] = _war({"#P1": 1}, attacksPerMember=1)
+
+
+def test_cwl_checks_the_war_of_the_snapshots_round(db, api):
+    calls, sent, responses = api
+    _cwl(responses)
+    user = make_user(db)
+    _due(db, user, "#P1", event_type="cwl", event_subtype="day_2", attacks_max=1)
+    db.commit()
+
+    run_async(reminder_engine.check_reminders)
+
+    assert calls == ["/clans/#CLAN/currentwar/leaguegroup", "/clanwarleagues/wars/#W2", "/clanwarleagues/wars/#W3"]
+    assert sent == []
+
+
+def test_every_cwl_request_is_charged_to_the_budget(db, api, monkeypatch):
+    calls, sent, responses = api
+    _cwl(responses)
+    # Room for the group and the first war only
+    monkeypatch.setattr(coc_api, "freshness_budget", coc_api.SharedRateBudget("test_freshness", per_minute=2))
+    user = make_user(db)
+    _due(db, user, "#P1", event_type="cwl", event_subtype="day_2", attacks_max=1)
+    db.commit()
+    metrics.reset()
+
+    run_async(reminder_engine.check_reminders)
+
+    assert calls == ["/clans/#CLAN/currentwar/leaguegroup", "/clanwarleagues/wars/#W2"]
+    assert [tag for tag, _ in sent] == ["#P1"]
+    assert metrics.snapshot()["counters"]["reminders.freshness.over_budget"] == 1
+
+
+def test_budget_is_shared_by_all_processes(db):
+    # Each process builds its own budget object; they draw from the same row
+    budgets = [coc_api.SharedRateBudget("test_shared", per_minute=3) for _ in range(2)]
+
+    async def reserve_all(session):
+        return [await budget.reserve(2) for budget in budgets]
+
+    assert run_async(reserve_all) == [2, 1]
+    assert [budgets[1].try_acquire(), budgets[1].try_acquire()] == [True, False]
+    # The first reserve is still full and isn't added to; the bucket is empty for the second
+    assert run_async(reserve_all) == [2, 0]
+
+
+def test_raid_player_not_yet_attacking_keeps_the_snapshot_count():
+    snapshot = models.EventSnapshot(event_type="raid", account_tag="#P1", clan_tag="#CLAN",
+                                    attacks_used=0, attacks_max=6)
+    raid = {"state": "ongoing", "members": [{"tag": "#P2", "attacks": 6}]}
+    assert reminder_engine.attacks_remaining_in(snapshot, RaidRecord.from_api(raid)) == 6
+
+    raid["members"].append({"tag": "#P1", "attacks": 4, "attackLimit": 5, "bonusAttackLimit": 1})
+    assert reminder_engine.attacks_remaining_in(snapshot, RaidRecord.from_api(raid)) == 2
+    assert reminder_engine.attacks_remaining_in(snapshot, RaidRecord.from_api({"state": "ended"})) == 0
+    assert reminder_engine.attacks_remaining_in(snapshot, None) is None
@@ -0,0 +1,127 @@
+"""
+Reminder reconcile tests — PUT /reminders updates in place, keeps ids and reports changed triggers.
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import main
+import models
+from conftest import make_user, make_snapshot
+from core.config import settings
+from core.query_counter import QUERY_COUNT_HEADER
+from database import create_db_engine
+from services import reminder_engine
+
+
+@pytest.fixture
+def changes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(reminder_engine, "triggers_changed", lambda user_id, added, removed: calls.append((added, removed)))
+    return calls
+
+
+@pytest.fixture
+def user_id(db):
+    user = make_user(db)
+    main.create_default_reminders(db, user.id)
+    db.commit()
+    return user.id
+
+
+def _put(client, user_id, reminders):
+    response = client.put(f"/api/v1/users/{user_id}/reminders", json={"reminders": reminders})
+    assert response.status_code == 200, response.text
+    return {r["event_type"]: r for r in response.json()["reminders"]}
+
+
+def _time_ids(config):
+    return {t["minutes_before_end"]: t["id"] for t in config["times"]}
+
+
+def test_unchanged_triggers_keep_their_ids(client, user_id, changes):
+    before = {r["event_type"]: r for r in client.get(f"/api/v1/users/{user_id}/reminders").json()["reminders"]}
+
+    after = _put(client, user_id, [
+        {"event_type": "cw", "enabled": True, "times": [{"minutes_before_end": 60}, {"minutes_before_end": 30}]},
+        {"event_type": "cwl", "enabled": False, "times": [{"minutes_before_end": 60}]},
+        {"event_type": "raid", "enabled": True, "times": [{"minutes_before_end": 120}, {"minutes_before_end": 480}]},
+    ])
+
+    assert {et: c["id"] for et, c in after.items()} == {et: c["id"] for et, c in before.items()}
+    assert _time_ids(after["raid"]) == _time_ids(before["raid"])
+    assert _time_ids(after["cw"])[60] == _time_ids(before["cw"])[60]
+    assert 240 not in _time_ids(after["cw"])
+    assert after["cwl"]["enabled"] is False
+
+    [(added, removed)] = changes
+    assert added == {_time_ids(after["cw"])[30]}
+    assert removed == {_time_ids(before["cw"])[240], _time_ids(before["cwl"])[60]}
+
+
+def test_sent_reminders_are_not_resent_after_an_edit(client, db, user_id, changes):
+    config = db.query(models.ReminderConfig).filter_by(user_id=user_id, event_type="raid").one()
+    time_id = next(t.id for t in config.times if t.minutes_before_end == 120)
+
+    after = _put(client, user_id, [
+        {"event_type": "raid", "enabled": True, "times": [{"minutes_before_end": 120, "label": "2 hours"}]},
+    ])
+
+    assert after["raid"]["times"] == [{"id": time_id, "minutes_before_end": 120, "label": "2 hours", "enabled": True}]
+    assert set(after) == {"raid"}
+
+
+@pytest.mark.parametrize("time_count", [1, 40])
+def test_statement_count_is_constant(client, user_id, changes, time_count):
+    reminders = [
+        {"event_type": et, "enabled": et != "cwl",
+         "times": [{"minutes_before_end": m, "label": f"{m} min"} for m in range(5, 5 + time_count * 5, 5)]}
+        for et in ("cw", "cwl", "raid")
+    ]
+    response = client.put(f"/api/v1/users/{user_id}/reminders", json={"reminders": reminders})
+
+    assert response.status_code == 200
+    # user, configs, times, delete times, update config, insert times, update times, reload (2)
+    assert int(response.headers[QUERY_COUNT_HEADER]) <= 9
+
+
+def test_duplicate_event_type_is_rejected(client, user_id, changes):
+    response = client.put(f"/api/v1/users/{user_id}/reminders", json={"reminders": [
+        {"event_type": "cw", "times": []}, {"event_type": "cw", "times": []},
+    ]})
+    assert response.status_code == 400
+
+
+def test_added_trigger_checked_by_api_worker_and_leader_is_sent_once(db, user_id, monkeypatch):
+    """triggers_changed() runs in the API worker that served the PUT, the scheduled check in the leader."""
+    sent = []
+
+    async def send_push(token, title, body, data):
+        sent.append(data["account_tag"])
+        await asyncio.sleep(0.05)
+        return True
+
+    monkeypatch.setattr(reminder_engine.fcm_service, "send_push", send_push)
+    monkeypatch.setattr(reminder_engine, "fetch_event_shared", lambda key: asyncio.sleep(0))
+    monkeypatch.setattr(reminder_engine, "_settled", {})
+    config = db.query(models.ReminderConfig).filter_by(user_id=user_id, event_type="cw").one()
+    time_id = next(t.id for t in config.times if t.minutes_before_end == 60)
+    make_snapshot(db, user_id, account_tag="#DUE", end_time=datetime.now(timezone.utc) + timedelta(minutes=60))
+    db.commit()
+
+    async def scenario():
+        leader = create_db_engine(settings.DATABASE_URL)
+        try:
+            await asyncio.gather(
+                reminder_engine._check_triggers(user_id, {time_id}),
+                reminder_engine.check_reminders(AsyncSession(leader, expire_on_commit=False)),
+            )
+        finally:
+            await leader.dispose()
+
+    asyncio.run(scenario())
+
+    assert sent == ["#DUE"]
+    assert db.query(models.NotificationLog).count() == 1
@@ -0,0 +1,115 @@
+"""
+Scheduler tests — fixed-rate jobs with overrun detection, and load shedding in an over-budget poll.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from core.metrics import metrics
+from services import data_poller
+from services.scheduler import FixedRateJob
+
+
+def _run_for(job: FixedRateJob, seconds: float):
+    async def run():
+        task = asyncio.create_task(job.run_forever())
+        await asyncio.sleep(seconds)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(run())
+
+
+def test_runs_at_a_fixed_rate():
+    metrics.reset()
+    starts = []
+
+    async def work(deadline):
+        starts.append(time.monotonic())
+        await asyncio.sleep(0.03)
+
+    _run_for(FixedRateJob("fast", 0.1, work), 0.45)
+
+    # Period is the interval, not interval + run time
+    assert len(starts) == 5
+    assert all(0.08 < b - a < 0.12 for a, b in zip(starts, starts[1:]))
+    assert "scheduler.fast.overruns" not in metrics.snapshot()["counters"]
+
+
+def test_overrun_skips_ticks_and_is_reported():
+    metrics.reset()
+    starts = []
+
+    async def slow(deadline):
+        starts.append(time.monotonic())
+        await asyncio.sleep(0.25)
+
+    _run_for(FixedRateJob("slow", 0.1, slow), 0.6)
+
+    counters = metrics.snapshot()["counters"]
+    assert len(starts) == 2
+    assert counters["scheduler.slow.overruns"] >= 1
+    assert counters["scheduler.slow.skipped_ticks"] >= 2
+    assert "scheduler.slow.lag" in metrics.snapshot()["timings"]
+
+
+def test_failing_job_keeps_its_schedule():
+    runs = []
+
+    async def failing(deadline):
+        runs.append(deadline)
+        raise RuntimeError("boom")
+
+    _run_for(FixedRateJob("failing", 0.05, failing), 0.18)
+    assert len(runs) >= 3
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    fetched = []
+
+    async def fetch_clan_events(clan_tag):
+        fetched.append(clan_tag)
+        return data_poller.ClanEvents(clan_name=clan_tag)
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(data_poller, "_clan_fetches", {})
+    monkeypatch.setattr(data_poller, "_idle_fetched_at", {})
+    return fetched
+
+
+def _seed(db):
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#SHEDP", name="P"))
+    for tag in ("#SHEDBUSY", "#SHEDIDLE1", "#SHEDIDLE2"):
+        db.add(models.TrackedClan(user_id=user.id, clan_tag=tag, clan_name=tag))
+    make_snapshot(db, user.id, clan_tag="#SHEDBUSY", end_time=datetime.now(timezone.utc) + timedelta(hours=1))
+    db.commit()
+
+
+def test_over_budget_poll_sheds_idle_clans(db, fetched):
+    clans = fetched
+    _seed(db)
+    metrics.reset()
+
+    # The next cycle is already due: everything but clans with a running event is shed
+    run_async(data_poller.poll_all_users, deadline=time.monotonic())
+
+    assert "#SHEDBUSY" in clans
+    assert not {"#SHEDIDLE1", "#SHEDIDLE2"} & set(clans)
+    assert metrics.snapshot()["counters"]["poll.shed.idle_clans"] >= 2
+
+
+def test_poll_within_budget_sheds_nothing(db, fetched):
+    clans = fetched
+    _seed(db)
+    metrics.reset()
+
+    run_async(data_poller.poll_all_users, deadline=time.monotonic() + 60)
+
+    assert {"#SHEDBUSY", "#SHEDIDLE1", "#SHEDIDLE2"} <= set(clans)
+    assert clans.index("#SHEDBUSY") < clans.index("#SHEDIDLE1")
+    assert not any(name.startswith("poll.shed") for name in metrics.snapshot()["counters"])
@@ -0,0 +1,87 @@
+"""
+Serialization golden tests — fast-path bodies must be byte-identical to response-model output.
+"""
+from datetime import datetime, timezone, timedelta
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+import main
+import models
+import schemas
+import serializers
+from conftest import make_user, make_snapshot
+from services.status_cache import status_cache
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serializers, "orjson", None)
+    status_cache.clear()
+    return request.param
+
+
+def _seed(db) -> str:
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+    main.create_default_reminders(db, user.id)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="Spieler ü 🐉",
+                                current_clan_tag="#C1", last_synced_at=now.replace(microsecond=123456)))
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P2", name=None))
+    db.add(models.TrackedClan(user_id=user.id, clan_tag="#C1", clan_name="Clän \"Quoted\""))
+    make_snapshot(db, user.id, account_tag="#P1", account_name="Spieler ü 🐉", opponent_name="Gegner",
+                  end_time=now + timedelta(hours=5, microseconds=500), war_size=15)
+    make_snapshot(db, user.id, account_tag="#P2", account_name=None, clan_name=None, event_type="cwl",
+                  event_subtype="day_3", attacks_max=1, end_time=None, start_time=None)
+    make_snapshot(db, user.id, account_tag="#P1", event_type="raid", attacks_used=6, attacks_max=6)
+    db.commit()
+    return user.id
+
+
+def _model_json(adapter: TypeAdapter, value) -> bytes:
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def test_accounts_and_clans_match_response_models(client, db, encoder):
+    user_id = _seed(db)
+    accounts = db.query(models.PlayerAccount).filter_by(user_id=user_id).all()
+    clans = db.query(models.TrackedClan).filter_by(user_id=user_id).all()
+
+    assert client.get(f"/api/v1/users/{user_id}/accounts").content == \
+        _model_json(TypeAdapter(List[schemas.PlayerAccountResponse]), accounts)
+    assert client.get(f"/api/v1/users/{user_id}/clans").content == \
+        _model_json(TypeAdapter(List[schemas.TrackedClanResponse]), clans)
+
+
+def test_reminders_match_response_model(client, db, encoder):
+    user_id = _seed(db)
+    configs = db.query(models.ReminderConfig).filter_by(user_id=user_id).all()
+
+    response = client.get(f"/api/v1/users/{user_id}/reminders")
+
+    assert response.content == _model_json(TypeAdapter(schemas.RemindersResponse), {"reminders": configs})
+
+
+@pytest.mark.parametrize("path, model", [
+    ("status", schemas.StatusResponse),
+    ("status/summary", schemas.StatusSummaryResponse),
+    ("bootstrap", schemas.BootstrapResponse),
+])
+def test_status_bodies_match_response_models(client, db, encoder, path, model):
+    user_id = _seed(db)
+
+    content = client.get(f"/api/v1/users/{user_id}/{path}").content
+
+    assert content == model.model_validate_json(content).model_dump_json().encode()
+
+
+def test_isoformat_matches_pydantic():
+    adapter = TypeAdapter(datetime)
+    for value in (datetime(2026, 1, 2, 3, 4, 5), datetime(2026, 1, 2, 3, 4, 5, 600),
+                  datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+                  datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2)))):
+        assert serializers.isoformat(value) == adapter.dump_python(value, mode="json")
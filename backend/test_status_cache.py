@@ -0,0 +1,109 @@
+"""
+Status cache tests — cached bodies, ETag / If-None-Match and invalidation on snapshot writes.
+"""
+import json
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+import main
+from conftest import make_user, make_snapshot, run_async
+from core.query_counter import QUERY_COUNT_HEADER
+from services import status_view
+from services.data_poller import cleanup_stale_snapshots
+from services.status_cache import status_cache
+
+
+def _seed(db) -> str:
+    user = make_user(db)
+    make_snapshot(db, user.id)
+    make_snapshot(db, user.id, event_type="raid", state="ongoing", attacks_used=2, attacks_max=6)
+    db.commit()
+    status_cache.clear()
+    return user.id
+
+
+def test_second_request_is_served_from_cache(client, db):
+    user_id = _seed(db)
+
+    first = client.get(f"/api/v1/users/{user_id}/status")
+    second = client.get(f"/api/v1/users/{user_id}/status")
+
+    assert first.status_code == second.status_code == 200
+    assert int(first.headers[QUERY_COUNT_HEADER]) > 0
+    assert int(second.headers[QUERY_COUNT_HEADER]) == 0
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+
+
+def test_cached_body_matches_uncached_serialization(client, db):
+    user_id = _seed(db)
+
+    async def build(session):
+        row = await main.get_user_status(session, user_id)
+        return status_view.summary_payload(row, datetime.now(timezone.utc))
+
+    response = client.get(f"/api/v1/users/{user_id}/status/summary")
+    expected = jsonable_encoder(run_async(build))
+    assert json.loads(response.content) == expected
+
+
+def test_if_none_match_returns_304(client, db):
+    user_id = _seed(db)
+    etag = client.get(f"/api/v1/users/{user_id}/status/summary").headers["etag"]
+
+    response = client.get(f"/api/v1/users/{user_id}/status/summary", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert int(response.headers[QUERY_COUNT_HEADER]) == 0
+
+
+def test_snapshot_writes_invalidate_the_cache(client, db):
+    user_id = _seed(db)
+    etag = client.get(f"/api/v1/users/{user_id}/status").headers["etag"]
+
+    # End every event, then let cleanup deactivate them
+    db.execute(main.models.EventSnapshot.__table__.update().values(end_time=datetime(2000, 1, 1)))
+    db.commit()
+    run_async(cleanup_stale_snapshots)
+
+    response = client.get(f"/api/v1/users/{user_id}/status", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["events"] == []
+
+
+def test_unknown_user_is_not_cached(client, db):
+    assert client.get("/api/v1/users/missing/status").status_code == 404
+    assert client.get("/api/v1/users/missing/status").status_code == 404
+
+
+def test_cache_memory_is_bounded_by_max_users():
+    from services.status_cache import StatusCache
+
+    cache = StatusCache(max_users=2, ttl_seconds=60)
+    for i in range(100):
+        user_id = f"u{i}"
+        cache.put(user_id, "status", b"{}", cache.generation(user_id))
+        cache.invalidate(user_id, f"never-cached-{i}")
+    assert len(cache._entries) <= 2
+
+
+def test_put_is_dropped_after_invalidation_or_eviction():
+    from services.status_cache import StatusCache
+
+    cache = StatusCache(max_users=1, ttl_seconds=60)
+    generation = cache.generation("a")
+    cache.invalidate("a")
+    cache.put("a", "status", b"stale", generation)
+    assert cache.get("a", "status") is None
+
+    generation = cache.generation("a")
+    cache.generation("b")  # evicts a
+    cache.generation("a")  # a's slot comes back with a new generation
+    cache.put("a", "status", b"stale", generation)
+    assert cache.get("a", "status") is None
+
+    cache.put("a", "status", b"fresh", cache.generation("a"))
+    assert cache.get("a", "status").body == b"fresh"
@@ -0,0 +1,122 @@
+"""
+Delta sync tests — version cursors on /status/delta across poll cycles, cleanup and removals.
+"""
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import models
+from conftest import make_user, run_async
+from services import coc_api, data_poller
+
+
+def _ts(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S.000Z")
+
+
+@pytest.fixture
+def war(monkeypatch):
+    """Current war of #CLAN served to the poller instead of the CoC API."""
+    now = datetime.now(timezone.utc)
+    war = {
+        "state": "inWar", "attacksPerMember": 2, "teamSize": 5,
+        "endTime": _ts(now + timedelta(hours=2)), "startTime": _ts(now - timedelta(hours=22)),
+        "clan": {"tag": "#CLAN", "name": "Clan", "members": [{"tag": "#P1", "name": "P One", "attacks": []}]},
+        "opponent": {"tag": "#OPP", "name": "Opp", "members": []},
+    }
+
+    async def fetch_clan_events(clan_tag):
+        return data_poller.ClanEvents(cw=data_poller.WarRecord.from_api(war, clan_tag), clan_name="Clan", member_tags={"#P1"})
+
+    async def get_player(tag):
+        return None
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    return war
+
+
+@pytest.fixture
+def user_id(db):
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P One"))
+    db.add(models.TrackedClan(user_id=user.id, clan_tag="#CLAN", clan_name="Clan"))
+    db.commit()
+    return user.id
+
+
+def _delta(client, user_id, since=None):
+    params = {} if since is None else {"since": since}
+    response = client.get(f"/api/v1/users/{user_id}/status/delta", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_returns_only_changes_since_cursor(client, war, user_id):
+    run_async(data_poller.poll_all_users)
+    full = _delta(client, user_id)
+    assert full["full"] is True
+    assert [e["attacks_used"] for e in full["events"]] == [0]
+
+    # Same data again: polled_at moves, the version does not
+    run_async(data_poller.poll_all_users)
+    unchanged = _delta(client, user_id, since=full["version"])
+    assert unchanged["version"] == full["version"]
+    assert unchanged["full"] is False
+    assert unchanged["events"] == unchanged["removed"] == []
+
+    war["clan"]["members"][0]["attacks"] = [{"stars": 3}]
+    run_async(data_poller.poll_all_users)
+    changed = _delta(client, user_id, since=full["version"])
+    assert changed["version"] == full["version"] + 1
+    assert [e["attacks_used"] for e in changed["events"]] == [1]
+
+    # Last attack made: the event is deactivated and reported as removed
+    war["clan"]["members"][0]["attacks"] = [{"stars": 3}, {"stars": 2}]
+    run_async(data_poller.poll_all_users)
+    finished = _delta(client, user_id, since=changed["version"])
+    assert finished["events"] == []
+    assert finished["removed"] == [full["events"][0]["id"]]
+
+
+def test_delta_single_query_when_up_to_date(client, war, user_id):
+    run_async(data_poller.poll_all_users)
+    version = _delta(client, user_id)["version"]
+
+    response = client.get(f"/api/v1/users/{user_id}/status/delta", params={"since": version})
+
+    assert response.headers["X-DB-Query-Count"] == "1"
+
+
+def test_cleanup_deactivation_is_a_delta(client, db, war, user_id):
+    run_async(data_poller.poll_all_users)
+    full = _delta(client, user_id)
+    db.query(models.EventSnapshot).update({"end_time": datetime.now(timezone.utc) - timedelta(minutes=1)})
+    db.commit()
+
+    run_async(data_poller.cleanup_stale_snapshots)
+
+    delta = _delta(client, user_id, since=full["version"])
+    assert delta["full"] is False
+    assert delta["removed"] == [full["events"][0]["id"]]
+
+
+def test_hard_delete_forces_full_resync(client, war, user_id):
+    run_async(data_poller.poll_all_users)
+    version = _delta(client, user_id)["version"]
+
+    client.delete(f"/api/v1/users/{user_id}/accounts/%23P1")
+    delta = _delta(client, user_id, since=version)
+
+    assert delta["full"] is True
+    assert delta["events"] == []
+    assert delta["version"] > version
+
+
+def test_unknown_cursor_falls_back_to_full(client, war, user_id):
+    run_async(data_poller.poll_all_users)
+
+    delta = _delta(client, user_id, since=10_000)
+
+    assert delta["full"] is True
+    assert len(delta["events"]) == 1
@@ -0,0 +1,137 @@
+"""
+Status stream tests — SSE frames, resume from a cursor, coalescing and the per-user bound.
+"""
+import asyncio
+import json
+
+import pytest
+
+from conftest import make_user, make_snapshot, run_async
+from core.config import settings
+from core.metrics import metrics
+from database import SessionLocal
+from services import status_events, status_view
+from services.status_events import StatusBroker, TooManySubscribers, status_stream
+
+
+@pytest.fixture(autouse=True)
+def fast_heartbeat(monkeypatch):
+    monkeypatch.setattr(settings, "STATUS_STREAM_HEARTBEAT_SECONDS", 0.05)
+
+
+async def _materialize(session, user_id, **kwargs):
+    rows = await status_view.refresh_user_status(session, [user_id], **kwargs)
+    await session.commit()
+    return rows[user_id].version
+
+
+def _seed(db) -> str:
+    user = make_user(db)
+    make_snapshot(db, user.id)
+    db.commit()
+    return user.id
+
+
+def _data(frame: str) -> dict:
+    return json.loads(frame.split("data: ", 1)[1])
+
+
+def test_stream_sends_full_state_then_changes(db):
+    user_id = _seed(db)
+    version = run_async(_materialize, user_id, changed=[user_id])
+    broker = StatusBroker(max_per_user=2)
+
+    async def scenario():
+        stream = status_stream(broker.subscribe(user_id, -1), None, broker)
+        assert (await anext(stream)).startswith("retry:")
+        first = await anext(stream)
+        assert first.startswith(f"id: {version}\n")
+        assert _data(first)["full"] is True
+
+        assert await anext(stream) == ": heartbeat\n\n"
+
+        # A writer commits a change and publishes the new version
+        async with SessionLocal() as session:
+            make_snapshot(session, user_id, account_tag="#NEW")
+            new_version = await _materialize(session, user_id, changed=[user_id])
+        broker.publish({user_id: new_version})
+
+        frame = await anext(stream)
+        while frame.startswith(":"):
+            frame = await anext(stream)
+        delta = _data(frame)
+        await stream.aclose()
+        return new_version, delta
+
+    new_version, delta = asyncio.run(scenario())
+    assert delta["version"] == new_version
+    assert delta["full"] is False
+    assert [e["account_tag"] for e in delta["events"]] == ["#NEW"]
+    assert broker.connection_count() == 0
+
+
+def test_stream_resumes_from_cursor_without_resending(db):
+    user_id = _seed(db)
+    version = run_async(_materialize, user_id, changed=[user_id])
+
+    async def scenario():
+        broker = StatusBroker(max_per_user=1)
+        stream = status_stream(broker.subscribe(user_id, -1), version, broker)
+        frames = [await anext(stream) for _ in range(3)]
+        await stream.aclose()
+        return frames
+
+    assert asyncio.run(scenario())[1:] == [": heartbeat\n\n", ": heartbeat\n\n"]
+
+
+def test_broker_coalesces_and_bounds_subscribers():
+    broker = StatusBroker(max_per_user=1)
+
+    async def scenario():
+        subscriber = broker.subscribe("u1", 0)
+        with pytest.raises(TooManySubscribers):
+            broker.subscribe("u1", 0)
+        for version in (1, 2, 3):
+            broker.publish({"u1": version})
+        woke = await subscriber.wait(0.01)
+        woke_again = await subscriber.wait(0.01)
+        return subscriber.version, woke, woke_again
+
+    assert asyncio.run(scenario()) == (3, True, False)
+
+
+def test_sync_versions_wakes_streams_for_other_workers(db):
+    user_id = _seed(db)
+    version = run_async(_materialize, user_id, changed=[user_id])
+    broker = StatusBroker(max_per_user=1)
+
+    async def scenario():
+        subscriber = broker.subscribe(user_id, version - 1)
+        async with SessionLocal() as session:
+            await broker.sync_versions(session)
+        return subscriber.version
+
+    assert asyncio.run(scenario()) == version
+
+
+def test_stream_endpoint_rejects_unknown_user(client):
+    assert client.get("/api/v1/users/nope/status/stream").status_code == 404
+
+
+def test_stream_endpoint_reserves_the_slot_before_responding(client, db, monkeypatch):
+    user_id = _seed(db)
+    run_async(_materialize, user_id, changed=[user_id])
+    broker = StatusBroker(max_per_user=1)
+    monkeypatch.setattr(status_events, "status_broker", broker)
+    metrics.reset()
+
+    # Another connect took the user's only slot between the status read and the response
+    taken = broker.subscribe(user_id, -1)
+    response = client.get(f"/api/v1/users/{user_id}/status/stream")
+    assert response.status_code == 503
+    assert metrics.snapshot()["gauges"]["status_stream.open"] == 1
+
+    broker.unsubscribe(taken)
+    broker.unsubscribe(taken)
+    assert metrics.snapshot()["gauges"]["status_stream.open"] == 0
+    assert broker.connection_count() == 0
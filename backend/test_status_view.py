@@ -0,0 +1,90 @@
+"""
+Status view tests — the materialized user_status row and the responses rendered from it.
+"""
+from datetime import datetime, timezone, timedelta
+
+import models
+from conftest import make_user, make_snapshot, run_async
+from services.data_poller import cleanup_stale_snapshots
+from services.status_cache import status_cache
+from services.status_view import refresh_user_status
+
+
+async def _materialize(session, user_id):
+    await refresh_user_status(session, [user_id])
+    await session.commit()
+
+
+def test_refresh_aggregates_active_snapshots(db):
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+    make_snapshot(db, user.id, account_tag="#A", end_time=now + timedelta(hours=3))
+    make_snapshot(db, user.id, account_tag="#B", event_type="cwl", event_subtype="day_2",
+                  attacks_used=0, attacks_max=1, end_time=now + timedelta(hours=1))
+    make_snapshot(db, user.id, account_tag="#A", event_type="raid", attacks_used=6, attacks_max=6)
+    make_snapshot(db, user.id, account_tag="#C", is_active=False)
+    db.commit()
+
+    run_async(_materialize, user.id)
+    row = db.get(models.UserStatus, user.id)
+
+    assert row.total_missing == 3
+    assert row.by_event_type == {"cwl": {"count": 1, "accounts": 1}, "cw": {"count": 2, "accounts": 1}}
+    assert row.next_deadline == (now + timedelta(hours=1)).replace(tzinfo=None)
+    assert [item["account_tag"] for item in row.items] == ["#B", "#A", "#A"]
+
+
+def test_endpoints_render_from_status_row(client, db):
+    end_time = datetime.now(timezone.utc) + timedelta(hours=1, minutes=30, seconds=30)
+    user = make_user(db)
+    make_snapshot(db, user.id, account_tag="#B", account_name=None, event_type="cwl",
+                  event_subtype="day_2", attacks_max=1, end_time=end_time)
+    db.commit()
+    run_async(_materialize, user.id)
+    status_cache.clear()
+
+    status = client.get(f"/api/v1/users/{user.id}/status").json()
+    summary = client.get(f"/api/v1/users/{user.id}/status/summary").json()
+
+    event = status["events"][0]
+    assert event["attacks_remaining"] == 1
+    assert event["end_time"] == end_time.replace(tzinfo=None).isoformat()
+    assert event["time_remaining_formatted"] == "1h 30m"
+    assert summary["total_missing"] == 1
+    assert summary["items"] == [{
+        "account_display": "Unknown (#B)",
+        "clan_display": "Clan (#CLAN)",
+        "event_label": "CWL Tag 2",
+        "attacks_remaining": 1,
+        "end_time_formatted": "1h 30m",
+        "end_time_iso": end_time.replace(tzinfo=None).isoformat(),
+    }]
+
+
+def test_cleanup_refreshes_status_rows(db):
+    now = datetime.now(timezone.utc)
+    user = make_user(db)
+    make_snapshot(db, user.id, end_time=now - timedelta(minutes=1))
+    db.commit()
+    run_async(_materialize, user.id)
+
+    run_async(cleanup_stale_snapshots)
+    db.expire_all()
+
+    row = db.get(models.UserStatus, user.id)
+    assert row.items == []
+    assert row.total_missing == 0
+
+
+def test_removing_account_refreshes_status_row(client, db):
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="Player"))
+    make_snapshot(db, user.id, account_tag="#P1")
+    db.commit()
+    run_async(_materialize, user.id)
+
+    response = client.delete(f"/api/v1/users/{user.id}/accounts/%23P1")
+    db.expire_all()
+
+    assert response.status_code == 200
+    assert db.get(models.UserStatus, user.id).items == []
@@ -0,0 +1,85 @@
+"""
+Storage tests — SQLite runs in WAL mode so readers are never blocked by a large poll commit.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+import models
+from database import create_db_engine
+
+
+async def _engine(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/storage.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    return engine
+
+
+def _snapshot_rows(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        dict(id=str(uuid.uuid4()), user_id="u", account_tag=f"#A{i}", clan_tag="#C",
+             event_type="cw", state="inWar", attacks_used=0, attacks_max=2,
+             end_time=now, is_active=True, polled_at=now)
+        for i in range(count)
+    ]
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    async def run():
+        engine = await _engine(tmp_path)
+        async with engine.connect() as conn:
+            assert (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar() == "wal"
+            assert (await conn.exec_driver_sql("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar() > 0
+        await engine.dispose()
+    asyncio.run(run())
+
+
+def test_readers_not_blocked_during_large_poll_commit(tmp_path):
+    count_query = select(func.count()).select_from(models.EventSnapshot)
+
+    async def run():
+        engine = await _engine(tmp_path)
+        async with engine.begin() as conn:
+            await conn.execute(models.User.__table__.insert().values(id="u"))
+
+        written = asyncio.Event()
+        release = asyncio.Event()
+
+        async def poll_writer():
+            async with engine.begin() as conn:
+                await conn.execute(models.EventSnapshot.__table__.insert(), _snapshot_rows(20_000))
+                written.set()
+                await release.wait()
+            # leaving the block commits the whole batch
+
+        writer = asyncio.create_task(poll_writer())
+        await asyncio.wait_for(written.wait(), timeout=30)
+
+        # Read while the write transaction is open, then keep reading through the commit
+        latencies = []
+        async with engine.connect() as reader:
+            started = time.perf_counter()
+            assert (await reader.execute(count_query)).scalar() == 0
+            latencies.append(time.perf_counter() - started)
+            await reader.rollback()
+
+            release.set()
+            while not writer.done():
+                started = time.perf_counter()
+                (await reader.execute(count_query)).scalar()
+                latencies.append(time.perf_counter() - started)
+                await reader.rollback()
+        await writer
+
+        assert max(latencies) < 0.5, f"reader blocked for {max(latencies):.3f}s"
+        async with engine.connect() as reader:
+            assert (await reader.execute(count_query)).scalar() == 20_000
+        await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,146 @@
+"""
+Targeted poll tests — newly added clans/accounts are processed right away, sharing the poll cycle's fetches.
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from conftest import make_user, run_async
+from core.config import settings
+from database import create_db_engine
+from services import coc_api, data_poller, targeted_poll
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Serves an in-war #CLAN with #P1 to the poller; records the clans fetched."""
+    fetched = []
+    end = (datetime.now(timezone.utc) + timedelta(hours=2)).strftime("%Y%m%dT%H%M%S.000Z")
+    war = {
+        "state": "inWar", "attacksPerMember": 2, "teamSize": 5, "endTime": end,
+        "clan": {"tag": "#CLAN", "name": "Clan", "members": [{"tag": "#P1", "name": "P One", "attacks": []}]},
+        "opponent": {"tag": "#OPP", "name": "Opp", "members": []},
+    }
+
+    async def fetch_clan_events(clan_tag):
+        fetched.append(clan_tag)
+        return data_poller.ClanEvents(cw=data_poller.WarRecord.from_api(war, clan_tag), clan_name="Clan", member_tags={"#P1"})
+
+    async def lookup_clan(clan_tag):
+        return {"tag": clan_tag, "name": "Clan"}
+
+    async def get_player(tag):
+        return None
+
+    monkeypatch.setattr(data_poller, "fetch_clan_events", fetch_clan_events)
+    monkeypatch.setattr(coc_api, "lookup_clan", lookup_clan)
+    monkeypatch.setattr(coc_api, "get_player", get_player)
+    monkeypatch.setattr(data_poller, "_clan_fetches", {})
+    monkeypatch.setattr(targeted_poll, "targeted_polls", targeted_poll.TargetedPollQueue(max_size=10))
+    return fetched
+
+
+def _drain():
+    async def drain(session):
+        while len(targeted_poll.targeted_polls):
+            (kind, user_id, tag), _ = await targeted_poll.targeted_polls.get()
+            await targeted_poll.run_targeted_poll(session, kind, user_id, tag)
+    run_async(drain)
+
+
+def test_added_clan_is_polled_right_away(client, db, fetches):
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P One"))
+    db.commit()
+
+    assert client.post(f"/api/v1/users/{user.id}/clans", json={"clan_tag": "#CLAN"}).status_code == 200
+    _drain()
+
+    events = client.get(f"/api/v1/users/{user.id}/status").json()["events"]
+    assert [(e["account_tag"], e["event_type"]) for e in events] == [("#P1", "cw")]
+    assert fetches == ["#CLAN"]
+
+
+def test_targeted_poll_reuses_the_cycles_fetch(db, fetches):
+    other = make_user(db)
+    db.add(models.PlayerAccount(user_id=other.id, tag="#P1", name="P One"))
+    db.add(models.TrackedClan(user_id=other.id, clan_tag="#CLAN", clan_name="Clan"))
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P One"))
+    db.add(models.TrackedClan(user_id=user.id, clan_tag="#CLAN", clan_name="Clan"))
+    db.commit()
+
+    run_async(data_poller.poll_all_users)
+    targeted_poll.poll_clan_soon(user.id, "#CLAN")
+    _drain()
+
+    assert fetches == ["#CLAN"]
+
+
+def test_concurrent_fetches_of_a_clan_are_shared(fetches):
+    async def both():
+        return await asyncio.gather(
+            data_poller.fetch_clan_events_shared("#CLAN"),
+            data_poller.fetch_clan_events_shared("#CLAN", max_age=30),
+        )
+
+    first, second = asyncio.run(both())
+    assert first is second
+    assert fetches == ["#CLAN"]
+
+
+def test_queue_dedups_and_orders_clans_first():
+    queue = targeted_poll.TargetedPollQueue(max_size=2)
+    assert queue.enqueue("account", "u", "#P1")
+    assert queue.enqueue("clan", "u", "#C1")
+    assert not queue.enqueue("clan", "u", "#C1")
+    assert not queue.enqueue("clan", "u", "#C2")  # full
+
+    async def take():
+        return [(await queue.get())[0] for _ in range(2)]
+
+    assert asyncio.run(take()) == [("clan", "u", "#C1"), ("account", "u", "#P1")]
+
+
+def test_cycle_and_targeted_poll_in_other_processes_write_one_snapshot(db, fetches):
+    """A targeted poll (API worker) and the cycle (leader) write the same new snapshot concurrently."""
+    user = make_user(db)
+    db.add(models.PlayerAccount(user_id=user.id, tag="#P1", name="P One"))
+    db.add(models.TrackedClan(user_id=user.id, clan_tag="#CLAN", clan_name="Clan"))
+    db.commit()
+    user_id = user.id
+
+    async def write(session, started: asyncio.Event | None = None):
+        user = await session.get(models.User, user_id)
+        account = (await session.execute(select(models.PlayerAccount))).scalars().one()
+        clans = (await session.execute(select(models.TrackedClan))).scalars().all()
+        clan_data = {"#CLAN": await data_poller.fetch_clan_events("#CLAN")}
+        await data_poller.process_account_clans(session, user, account, clans, clan_data)
+        if started is not None:
+            started.set()
+            # Commit only once the other writer has looked the snapshot up and is writing it too
+            await asyncio.sleep(0.2)
+        await data_poller.commit_snapshot_writes(session)
+
+    async def scenario():
+        engines = [create_db_engine(settings.DATABASE_URL) for _ in range(2)]
+        try:
+            cycle, targeted = (AsyncSession(engine, expire_on_commit=False) for engine in engines)
+            started = asyncio.Event()
+            first = asyncio.ensure_future(write(cycle, started))
+            await started.wait()
+            await write(targeted)
+            await first
+        finally:
+            for engine in engines:
+                await engine.dispose()
+
+    asyncio.run(scenario())
+
+    snapshots = db.query(models.EventSnapshot).all()
+    assert [(s.account_tag, s.event_type) for s in snapshots] == [("#P1", "cw")]
+    assert db.get(models.UserStatus, user_id).items[0]["id"] == snapshots[0].id